@@ -16,6 +16,7 @@ from flasgger import Swagger
 from  flask_socketio import SocketIO
 
 from app.models import db, User,register_models,models
+from app.dbpool import engine_options, replica_binds, instrument_pool
 from app.model_utils import *
 
 from dotenv import load_dotenv
@@ -36,6 +37,8 @@ app.config['WTF_CSRF_ENABLED'] = True
 
 db_uri = os.getenv('DB_URI')
 app.config['SQLALCHEMY_DATABASE_URI'] =db_uri
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(db_uri)
+app.config['SQLALCHEMY_BINDS'] = replica_binds()
 
 
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=3)
@@ -51,6 +54,9 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=3)
 celery = make_celery(app)
 
 db.init_app(app)
+with app.app_context():
+    for bind_key, engine in db.engines.items():
+        instrument_pool(engine, bind_key or 'primary')
 migrate = Migrate(app, db)
 CORS(app)
 CSRFProtect(app)
@@ -80,6 +86,10 @@ from app.api.sharedplaylist.sharedplaylist import shared_playlist
 from app.api.subscription.subscription import subscription
 from app.api.azureops.azureapi import azure_api
 from app.api.users.users import users
+from app.api.uploads.uploads import uploads
+from app.api.ingest.ingest import ingest
+from app.api.metrics.metrics import metrics
+from app.api.search.search import search_api
 from app.livepodcast.views import live_podcast
 # Register Blueprints
 app.register_blueprint(views_bp)
@@ -96,6 +106,10 @@ app.register_blueprint(rating)
 app.register_blueprint(shared_playlist)
 app.register_blueprint(subscription)
 app.register_blueprint(users)
+app.register_blueprint(uploads)
+app.register_blueprint(ingest)
+app.register_blueprint(metrics)
+app.register_blueprint(search_api)
 app.register_blueprint(playlist_item_bp)
 app.register_blueprint(live_podcast)
 
@@ -1,12 +1,41 @@
 from abc import ABC,abstractmethod
 from typing import Optional, List
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient,generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient,generate_blob_sas, BlobSasPermissions, \
+    BlobBlock, ContentSettings
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from azure.core.pipeline.transport import RequestsTransport
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict
 import os
+import base64
+from datetime import datetime, timedelta, timezone
 import logging
+import mimetypes
+import threading
+import requests
+from app.api.azureops.blobmeta import BlobPropertiesCache
+from app.api.azureops.redisclass import redis_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Size of each ranged GET issued while streaming a blob. It bounds how many bytes of a
+# single stream are held in worker memory at any time.
+STREAM_CHUNK_SIZE = int(os.getenv('AZURE_STREAM_CHUNK_SIZE', 1024 * 1024))
+
+# Connection pool shared by every container and blob client of an AzureBlobStorage instance.
+AZURE_POOL_MAXSIZE = int(os.getenv('AZURE_POOL_MAXSIZE', 32))
+AZURE_CONNECTION_TIMEOUT = int(os.getenv('AZURE_CONNECTION_TIMEOUT', 10))
+AZURE_READ_TIMEOUT = int(os.getenv('AZURE_READ_TIMEOUT', 60))
+AZURE_CLIENT_CACHE_SIZE = int(os.getenv('AZURE_CLIENT_CACHE_SIZE', 512))
+
+# Uploads larger than one block are staged as blocks in parallel and committed as a block list.
+UPLOAD_BLOCK_SIZE = int(os.getenv('AZURE_UPLOAD_BLOCK_SIZE', 4 * 1024 * 1024))
+UPLOAD_MAX_CONCURRENCY = int(os.getenv('AZURE_UPLOAD_MAX_CONCURRENCY', 4))
+
+# Lifetime of the write-only SAS handed to browsers for direct uploads.
+UPLOAD_SAS_TTL = int(os.getenv('AZURE_UPLOAD_SAS_TTL', 15 * 60))
+
 class ColoredFormatter(logging.Formatter):
     COLORS = {
         'DEBUG': '\033[94m',  # Blue
@@ -28,6 +57,47 @@ logger.addHandler(console_handler)
 
 
 
+def build_transport() -> RequestsTransport:
+    """
+    Build an HTTP transport whose keep-alive connection pool is sized for concurrent streams,
+    so parallel requests reuse TLS connections to Azure instead of opening new ones.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=AZURE_POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return RequestsTransport(session=session, session_owner=False,
+                             connection_timeout=AZURE_CONNECTION_TIMEOUT, read_timeout=AZURE_READ_TIMEOUT)
+
+
+class BlobReader:
+    """
+    Read-only file-like view over a stream of blob chunks. Chunks are fetched only as they are
+    read, and len() reports the total byte count so HTTP clients can send a Content-Length
+    instead of buffering the whole blob.
+    """
+
+    def __init__(self, chunks, size: int):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def read(self, size: int = -1) -> bytes:
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer.extend(chunk)
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
 class AzureStorage(ABC):
     @abstractmethod
     def __init__(self,connection_string:str):
@@ -69,91 +139,184 @@ class AzureStorage(ABC):
         ...
 
     @abstractmethod
-    def stream_blob_part(self,container_name:str,blob_name:str,start_byte:int,end_byte:int):
-        ...
-
-    @abstractmethod
-    def stream_blob_full(self, container_name: str, blob_name: str):
+    def stream_blob_chunks(self, container_name: str, blob_name: str, start_byte: int = None, end_byte: int = None):
         ...
 
 
 class AzureBlobStorage(AzureStorage):
     def __init__(self, connection_string: str):
         super().__init__(connection_string)
+        self.properties_cache = BlobPropertiesCache(redis_client)
         self.configure_clients()
 
     def configure_clients(self):
-        self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
-        self.container_client = None
-        self.blob_client = None
+        self.blob_service_client = BlobServiceClient.from_connection_string(
+            self.connection_string,
+            transport=build_transport(),
+            max_single_get_size=STREAM_CHUNK_SIZE,
+            max_chunk_get_size=STREAM_CHUNK_SIZE
+        )
+        # LRU cache of container and blob clients keyed by (container, blob); blob is None for
+        # container clients. Clients share the service client's transport and are thread safe.
+        self._clients = OrderedDict()
+        self._clients_lock = threading.Lock()
+
+    def _cached_client(self, key: tuple, factory):
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+        client = factory()
+        with self._clients_lock:
+            client = self._clients.setdefault(key, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > AZURE_CLIENT_CACHE_SIZE:
+                self._clients.popitem(last=False)
+        return client
+
+    def get_container_client(self, container: str) -> ContainerClient:
+        return self._cached_client((container, None),
+                                   lambda: self.blob_service_client.get_container_client(container))
+
+    def get_blob_client(self, container: str, blob: str) -> BlobClient:
+        return self._cached_client((container, blob),
+                                   lambda: self.get_container_client(container).get_blob_client(blob))
 
     def create_container(self, container_name: str):
         container_client = self.blob_service_client.create_container(container_name)
         logger.info(f"Container '{container_name}' created successfully.")
 
     def delete_container(self, container_name: str):
-        container_client = self.blob_service_client.get_container_client(container_name)
+        container_client = self.get_container_client(container_name)
         container_client.delete_container()
+        with self._clients_lock:
+            for key in [key for key in self._clients if key[0] == container_name]:
+                del self._clients[key]
         logger.info(f"Container '{container_name}' deleted successfully.")
 
-    def upload_blob(self, container_name: str, blob_name: str,file_path:str):
-        os.chdir('../../')
-        path_object = os.path.join(file_path)
-        path_object_abs = os.path.abspath(path_object)
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
-        with open(path_object_abs, "rb") as data:
-            self.blob_client.upload_blob(data)
+    def upload_blob(self, container_name: str, blob_name: str, source, block_size: int = None,
+                    max_concurrency: int = None):
+        """
+        Upload a file path or a readable binary stream to a blob and return the blob url.
+
+        Sources larger than block_size are uploaded as blocks staged by up to max_concurrency
+        threads and then committed as one block list.
+        """
+        block_size = block_size or UPLOAD_BLOCK_SIZE
+        max_concurrency = max_concurrency or UPLOAD_MAX_CONCURRENCY
+        blob_client = self.get_blob_client(container_name, blob_name)
+        content_type, _ = mimetypes.guess_type(blob_name)
+        content_settings = ContentSettings(content_type=content_type) if content_type else None
+
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as data:
+                self._upload_stream(blob_client, data, block_size, max_concurrency, content_settings)
+        else:
+            self._upload_stream(blob_client, source, block_size, max_concurrency, content_settings)
+
+        self.properties_cache.invalidate(container_name, blob_name)
         logger.info(f"Blob '{blob_name}' uploaded successfully to container '{container_name}'.")
-        return self.blob_client.url
+        return blob_client.url
+
+    @staticmethod
+    def _upload_stream(blob_client: BlobClient, stream, block_size: int, max_concurrency: int,
+                       content_settings: Optional[ContentSettings]):
+        first_block = stream.read(block_size)
+        next_block = stream.read(block_size)
+        if not next_block:
+            blob_client.upload_blob(first_block, content_settings=content_settings)
+            return
+
+        block_list = []
+        pending = set()
+        data = first_block
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while data:
+                # block ids must all have the same length within a blob
+                block_id = base64.b64encode(f"{len(block_list):08d}".encode()).decode()
+                block_list.append(BlobBlock(block_id=block_id))
+                pending.add(executor.submit(blob_client.stage_block, block_id, data))
+                # keep at most max_concurrency blocks in memory
+                if len(pending) >= max_concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                data, next_block = next_block, stream.read(block_size) if next_block else b''
+            for future in pending:
+                future.result()
+
+        blob_client.commit_block_list(block_list, content_settings=content_settings)
+
     def download_blob(self, container_name: str, blob_name: str, download_path: str,**kwargs):
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
+        blob_client = self.get_blob_client(container_name, blob_name)
         with open(download_path, "wb") as download_file:
-            download_file.write(self.blob_client.download_blob().readall())
+            download_file.write(blob_client.download_blob().readall())
         logger.info(f"Blob '{blob_name}' downloaded successfully from container '{container_name}'.")
 
     def list_blobs(self, container_name: str) -> List[str]:
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        blob_list = self.container_client.list_blobs()
+        blob_list = self.get_container_client(container_name).list_blobs()
         return [blob.name for blob in blob_list]
 
     def delete_blob(self, container_name: str, blob_name: str):
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
-        self.blob_client.delete_blob()
+        blob_client = self.get_blob_client(container_name, blob_name)
+        blob_client.delete_blob()
+        self.properties_cache.invalidate(container_name, blob_name)
         logger.info(f"Blob '{blob_name}' deleted successfully from container '{container_name}'.")
 
     def blob_exists(self, container_name: str, blob_name: str) -> bool:
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
-        return self.blob_client.exists()
+        blob_client = self.get_blob_client(container_name, blob_name)
+        return blob_client.exists()
 
     def get_blob_properties(self, container_name: str, blob_name: str):
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
-        return self.blob_client.get_blob_properties()
+        blob_client = self.get_blob_client(container_name, blob_name)
+        return blob_client.get_blob_properties()
+
+    def get_blob_metadata(self, container_name: str, blob_name: str) -> dict:
+        """Return size, etag, content_type and last_modified for a blob, served from cache when possible."""
+        return self.properties_cache.get(container_name, blob_name,
+                                         lambda: self.get_blob_properties(container_name, blob_name))
+
+    def generate_upload_sas(self, container_name: str, blob_name: str, ttl: int = UPLOAD_SAS_TTL) -> str:
+        """
+        Return a blob url carrying a SAS token that only allows creating and writing this one blob
+        for ttl seconds, so a client can upload straight to storage.
+        """
+        credential = self.blob_service_client.credential
+        sas_token = generate_blob_sas(
+            account_name=credential.account_name,
+            container_name=container_name,
+            blob_name=blob_name,
+            account_key=credential.account_key,
+            permission=BlobSasPermissions(create=True, write=True),
+            expiry=datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        )
+        return f"{self.get_blob_client(container_name, blob_name).url}?{sas_token}"
 
     def set_blob_metadata(self, container_name: str, blob_name: str, metadata: dict):
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
-        self.blob_client.set_blob_metadata(metadata)
+        blob_client = self.get_blob_client(container_name, blob_name)
+        blob_client.set_blob_metadata(metadata)
         logger.info(f"Metadata for blob '{blob_name}' updated successfully.")
 
-    def stream_blob_part(self,container_name:str,blob_name:str,start_byte:int,end_byte:int):
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
-        byte_data = self.blob_client.download_blob(offset=start_byte, length=end_byte - start_byte + 1)
-        data = byte_data.readall()
-        logger.info(f'Blob streaming part')
-        return data
-    def stream_blob_full(self, container_name: str, blob_name: str):
-        self.container_client = self.blob_service_client.get_container_client(container_name)
-        self.blob_client = self.container_client.get_blob_client(blob_name)
-        byte_data = self.blob_client.download_blob()
-        data = byte_data.readall()
-        logger.info(f'Blob streaming full')
-        return data
+    def open_blob(self, container_name: str, blob_name: str) -> BlobReader:
+        """Return a BlobReader over the whole blob, streamed in STREAM_CHUNK_SIZE chunks."""
+        size = self.get_blob_metadata(container_name, blob_name).get('size')
+        return BlobReader(self.stream_blob_chunks(container_name, blob_name), size)
+
+    def stream_blob_chunks(self, container_name: str, blob_name: str, start_byte: int = None, end_byte: int = None):
+        """
+        Yield the blob (or the inclusive byte range start_byte..end_byte) in chunks of at most
+        STREAM_CHUNK_SIZE bytes, fetching each chunk from Azure only when the previous one is consumed.
+        """
+        blob_client = self.get_blob_client(container_name, blob_name)
+        if start_byte is None:
+            downloader = blob_client.download_blob()
+        else:
+            length = end_byte - start_byte + 1 if end_byte is not None else None
+            downloader = blob_client.download_blob(offset=start_byte, length=length)
+        logger.info(f'Blob streaming chunks')
+        for chunk in downloader.chunks():
+            yield chunk
 
 
 
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import redis
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BLOB_META_TTL = int(os.getenv('BLOB_META_TTL', 3600))
+BLOB_META_LOCAL_TTL = int(os.getenv('BLOB_META_LOCAL_TTL', 30))
+BLOB_META_LOCAL_SIZE = int(os.getenv('BLOB_META_LOCAL_SIZE', 1024))
+
+
+def properties_to_dict(properties) -> dict:
+    """Reduce an Azure BlobProperties object to the fields the streaming endpoint needs."""
+    content_settings = properties.get('content_settings')
+    last_modified = properties.get('last_modified')
+    return {
+        'size': properties.get('size'),
+        'etag': properties.get('etag'),
+        'content_type': content_settings.content_type if content_settings else None,
+        'last_modified': last_modified.isoformat() if last_modified else None
+    }
+
+
+class BlobPropertiesCache:
+    """
+    Two-level cache of blob metadata (size, etag, content type, last modified).
+
+    Redis is shared by every gunicorn worker; the small in-process LRU in front of it saves the
+    Redis round trip for hot episodes. Local entries expire after BLOB_META_LOCAL_TTL seconds, so
+    an invalidation issued by another worker is picked up within that window.
+    """
+
+    def __init__(self, redis_client, ttl: int = BLOB_META_TTL, local_ttl: int = BLOB_META_LOCAL_TTL,
+                 local_size: int = BLOB_META_LOCAL_SIZE):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(container_name: str, blob_name: str) -> str:
+        return f"blobmeta:{container_name}:{blob_name}"
+
+    def get(self, container_name: str, blob_name: str, loader) -> dict:
+        """
+        Return the metadata for a blob, calling loader() (which must return BlobProperties)
+        only when neither cache level has it.
+        """
+        key = self.cache_key(container_name, blob_name)
+
+        metadata = self._get_local(key)
+        if metadata is not None:
+            return metadata
+
+        try:
+            cached = self.redis_client.get(key)
+        except redis.RedisError as e:
+            logger.warning(f'Blob metadata cache unavailable: {e}')
+            cached = None
+        if cached:
+            metadata = json.loads(cached)
+            self._set_local(key, metadata)
+            return metadata
+
+        metadata = properties_to_dict(loader())
+        try:
+            self.redis_client.set(key, json.dumps(metadata), ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f'Failed to cache blob metadata: {e}')
+        self._set_local(key, metadata)
+        return metadata
+
+    def invalidate(self, container_name: str, blob_name: str):
+        key = self.cache_key(container_name, blob_name)
+        with self._lock:
+            self._local.pop(key, None)
+        try:
+            self.redis_client.delete(key)
+        except redis.RedisError as e:
+            logger.warning(f'Failed to invalidate blob metadata: {e}')
+
+    def _get_local(self, key: str):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, metadata = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return metadata
+
+    def _set_local(self, key: str, metadata: dict):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, metadata)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
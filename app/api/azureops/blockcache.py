@@ -0,0 +1,98 @@
+import os
+import logging
+
+import redis
+
+from app.api.azureops.azureclass import STREAM_CHUNK_SIZE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = int(os.getenv('AUDIO_BLOCK_SIZE', 256 * 1024))
+BLOCK_TTL = int(os.getenv('AUDIO_BLOCK_TTL', 3600))
+
+
+class BlobBlockCache:
+    """
+    Caches blobs in Redis as fixed-size, aligned blocks.
+
+    A byte range is served by stitching together the blocks that cover it, so players that
+    seek to slightly different offsets share the same cache entries. Only blocks missing from
+    Redis are fetched from Azure, one ranged GET per contiguous run of missing blocks.
+    """
+
+    def __init__(self, redis_client, storage, block_size: int = BLOCK_SIZE, ttl: int = BLOCK_TTL):
+        self.redis_client = redis_client
+        self.storage = storage
+        self.block_size = block_size
+        self.ttl = ttl
+        # number of blocks held in memory at once while serving a range
+        self.window = max(1, STREAM_CHUNK_SIZE // block_size)
+
+    def block_key(self, container_name: str, blob_name: str, index: int, version: str = '') -> str:
+        return f"{container_name}:{blob_name}:{version}:block:{self.block_size}:{index}"
+
+    def block_range(self, start_byte: int, end_byte: int):
+        """Return the first and last block indices covering the inclusive byte range."""
+        return start_byte // self.block_size, end_byte // self.block_size
+
+    def read_range(self, container_name: str, blob_name: str, start_byte: int, end_byte: int, blob_size: int,
+                   version: str = ''):
+        """
+        Yield the bytes of the inclusive range start_byte..end_byte, one block slice at a time.
+        version (the blob etag) is part of every block key, so a re-uploaded blob never serves stale blocks.
+        """
+        first, last = self.block_range(start_byte, end_byte)
+        for window_start in range(first, last + 1, self.window):
+            indices = list(range(window_start, min(window_start + self.window, last + 1)))
+            blocks = self._get_blocks(container_name, blob_name, indices, blob_size, version)
+            for index in indices:
+                block = blocks[index]
+                block_offset = index * self.block_size
+                lo = start_byte - block_offset if index == first else 0
+                hi = end_byte - block_offset + 1 if index == last else len(block)
+                yield block[lo:hi]
+
+    def _get_blocks(self, container_name: str, blob_name: str, indices: list, blob_size: int, version: str) -> dict:
+        keys = [self.block_key(container_name, blob_name, index, version) for index in indices]
+        try:
+            cached = self.redis_client.mget(keys)
+        except redis.RedisError as e:
+            logger.warning(f'Block cache unavailable, reading from Azure: {e}')
+            cached = [None] * len(keys)
+
+        blocks = {index: block for index, block in zip(indices, cached) if block is not None}
+        missing = [index for index in indices if index not in blocks]
+        if not missing:
+            return blocks
+
+        fetched = {}
+        for run_first, run_last in self._contiguous_runs(missing):
+            run_start = run_first * self.block_size
+            run_end = min((run_last + 1) * self.block_size, blob_size) - 1
+            data = b''.join(self.storage.stream_blob_chunks(container_name, blob_name, run_start, run_end))
+            for index in range(run_first, run_last + 1):
+                offset = (index - run_first) * self.block_size
+                fetched[index] = data[offset:offset + self.block_size]
+
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for index, block in fetched.items():
+                pipeline.set(self.block_key(container_name, blob_name, index, version), block, ex=self.ttl)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Failed to cache audio blocks: {e}')
+
+        blocks.update(fetched)
+        return blocks
+
+    @staticmethod
+    def _contiguous_runs(indices: list):
+        """Group sorted block indices into (first, last) runs of consecutive blocks."""
+        runs = []
+        for index in indices:
+            if runs and runs[-1][1] == index - 1:
+                runs[-1][1] = index
+            else:
+                runs.append([index, index])
+        return [tuple(run) for run in runs]
@@ -0,0 +1,198 @@
+import os
+import logging
+
+from flask import request
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Podcast, Episode
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.getenv('API_MAX_BATCH_SIZE', 500))
+
+
+class BatchError(ValueError):
+    pass
+
+
+def batch_items() -> list:
+    """The items array of a batch body, {"items": [...]} or a bare array. Raises BatchError if unusable."""
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise BatchError('items must be a non-empty array')
+    if len(items) > MAX_BATCH_SIZE:
+        raise BatchError(f'at most {MAX_BATCH_SIZE} items per batch')
+    return items
+
+
+def positive_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+TARGET_COLUMNS = ('podcast_id', 'episode_id')
+# Postgres SQLSTATE and SQLite extended codes for a duplicate key
+UNIQUE_VIOLATIONS = {'23505', 'SQLITE_CONSTRAINT_UNIQUE', 'SQLITE_CONSTRAINT_PRIMARYKEY'}
+
+
+def target_key(item) -> dict:
+    """{'podcast_id': id} or {'episode_id': id} from an item naming exactly one of them, else None."""
+    if not isinstance(item, dict):
+        return None
+    targets = {column: item.get(column) for column in ('podcast_id', 'episode_id') if item.get(column) is not None}
+    if len(targets) != 1 or not all(positive_int(value) for value in targets.values()):
+        return None
+    return targets
+
+
+def existing_ids(session, column, ids) -> set:
+    """The ids among ids that column holds, in one query."""
+    ids = set(ids)
+    return set(session.scalars(select(column).where(column.in_(ids)))) if ids else set()
+
+
+def load_targets(session, items: list) -> dict:
+    """{'podcast_id': ids, 'episode_id': ids} that exist among the targets the items name, in two queries."""
+    keys = [key for key in map(target_key, items) if key]
+    return {
+        'podcast_id': existing_ids(session, Podcast.id, [key['podcast_id'] for key in keys if 'podcast_id' in key]),
+        'episode_id': existing_ids(session, Episode.id, [key['episode_id'] for key in keys if 'episode_id' in key]),
+    }
+
+
+def parse_target(item, targets: dict, columns: tuple = TARGET_COLUMNS) -> dict:
+    """
+    The podcast or episode key of an item, checked against load_targets. columns are the targets
+    the model can store. Raises BatchError.
+    """
+    key = target_key(item)
+    if key is None:
+        raise BatchError('give exactly one of podcast_id or episode_id as a positive integer')
+    (column, value), = key.items()
+    if column not in columns:
+        raise BatchError(f"{column} is not supported here, give {' or '.join(columns)}")
+    if value not in targets[column]:
+        raise BatchError(f"{column.split('_')[0]} {value} not found")
+    return key
+
+
+def _find_existing(session, model, keys: list) -> dict:
+    """{key tuple: row} for the keys that already have a row, one IN query per key shape."""
+    shapes = {}
+    for key in keys:
+        shapes.setdefault(tuple(sorted(key)), []).append(key)
+    found = {}
+    for columns, shape_keys in shapes.items():
+        attributes = [getattr(model, column) for column in columns]
+        condition = tuple_(*attributes).in_([tuple(key[column] for column in columns) for key in shape_keys]) \
+            if len(columns) > 1 else attributes[0].in_([key[columns[0]] for key in shape_keys])
+        for row in session.scalars(select(model).where(condition)):
+            found[tuple(sorted((column, getattr(row, column)) for column in columns))] = row
+    return found
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    orig = error.orig
+    code = next(filter(None, (getattr(orig, name, None) for name in ('sqlstate', 'pgcode', 'sqlite_errorname'))), None)
+    return code in UNIQUE_VIOLATIONS if code else 'unique' in str(orig).lower()
+
+
+def _identities(entries: list) -> list:
+    """The identity of each entry's key, None where the key was already seen earlier in the batch."""
+    seen, identities = set(), []
+    for key, _ in entries:
+        identity = tuple(sorted(key.items()))
+        identities.append(None if identity in seen else identity)
+        seen.add(identity)
+    return identities
+
+
+def _stage(session, model, key: dict, values: dict, row, update_columns: tuple) -> str:
+    if row is None:
+        session.add(model(**key, **values))
+        return 'created'
+    if any(getattr(row, column) != values.get(column) for column in update_columns):
+        for column in update_columns:
+            setattr(row, column, values.get(column))
+        return 'updated'
+    return 'unchanged'
+
+
+def _upsert_each(session, model, entries: list, identities: list, update_columns: tuple) -> list:
+    """upsert_batch one savepoint per entry, so only the entries that break a constraint fail."""
+    existing = _find_existing(session, model, [key for key, _ in entries])
+    results = []
+    for (key, values), identity in zip(entries, identities):
+        if identity is None:
+            results.append('duplicate')
+            continue
+        savepoint = session.begin_nested()
+        status = _stage(session, model, key, values, existing.get(identity), update_columns)
+        try:
+            savepoint.commit()
+        except IntegrityError as e:
+            savepoint.rollback()
+            logger.info(f'{model.__name__} {key} rejected: {e.orig}')
+            status = 'failed'
+        results.append(status)
+    return results
+
+
+def upsert_batch(session, model, entries: list, update_columns: tuple = ()) -> list:
+    """
+    Insert or update many rows of model in one flush. entries are (key, values) pairs in request
+    order, key being the columns that identify a row. A row that exists is left alone, or has
+    update_columns overwritten. Returns a status per entry: 'created', 'updated', 'unchanged',
+    'duplicate' for a key already seen earlier in the batch, or 'failed' for an entry the
+    database rejected.
+
+    All writes go through the unit of work, so counters and caches follow as they do for single
+    writes. If a concurrent request inserts one of the keys first, the batch is retried once; any
+    other constraint violation sends the batch through again one entry at a time.
+    """
+    identities = _identities(entries)
+    for attempt in (1, 2):
+        existing = _find_existing(session, model, [key for key, _ in entries])
+        savepoint = session.begin_nested()
+        results = ['duplicate' if identity is None else
+                   _stage(session, model, key, values, existing.get(identity), update_columns)
+                   for (key, values), identity in zip(entries, identities)]
+        try:
+            savepoint.commit()
+            return results
+        except IntegrityError as e:
+            savepoint.rollback()
+            if not is_unique_violation(e):
+                logger.info(f'Batch of {model.__name__} broke a constraint, writing it entry by entry: {e.orig}')
+                return _upsert_each(session, model, entries, identities, update_columns)
+            if attempt == 2:
+                raise
+            logger.info(f'Batch of {model.__name__} raced another writer, retrying: {e.orig}')
+
+
+def run_batch(session, model, items: list, parse, update_columns: tuple = ()) -> dict:
+    """
+    Validate every item with parse, which returns (key, values) or raises BatchError, write the
+    valid ones with upsert_batch and commit once. The response lists each item's key and status
+    in request order; invalid items get status 'invalid' and failed ones 'failed', with an error.
+    """
+    results, entries, positions = [], [], []
+    for index, item in enumerate(items):
+        try:
+            key, values = parse(item)
+        except BatchError as e:
+            results.append({'index': index, 'status': 'invalid', 'error': str(e)})
+            continue
+        results.append(dict(key, index=index))
+        entries.append((key, values))
+        positions.append(index)
+    statuses = upsert_batch(session, model, entries, update_columns) if entries else []
+    session.commit()
+    for index, status in zip(positions, statuses):
+        results[index]['status'] = status
+        if status == 'failed':
+            results[index]['error'] = 'rejected by the database'
+    changed = sum(1 for result in results if result['status'] in ('created', 'updated'))
+    return {'status': 'success', 'message': f'{changed} of {len(results)} items changed', 'data': results}
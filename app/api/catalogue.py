@@ -0,0 +1,110 @@
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.cache import ReadThroughCache
+from app.dbrouting import primary_reads
+from app.models import db, Podcast, Episode, Playlist, Rating, Favourite, Subscription
+from app.api.azureops.redisclass import redis_client
+
+catalogue_cache = ReadThroughCache('catalogue', redis_client)
+
+
+def _row_entry(row):
+    """What the single-row endpoints need: the serialized row and its updated_at for the ETag."""
+    if row is None:
+        return None
+    return {'data': row.to_dict(), 'updated_at': row.updated_at.isoformat()}
+
+
+def _cached(namespace: str, key, loader):
+    """
+    catalogue_cache.get with loader reading from the primary: entries live for CACHE_TTL, so one
+    filled from a lagging replica right after an invalidation would serve the old row long after
+    the replica caught up. populate_existing keeps rows this session already read from a replica
+    from standing in for the primary's.
+    """
+    def load():
+        with primary_reads(db.session):
+            return loader()
+    return catalogue_cache.get(namespace, key, load)
+
+
+def get_podcast_entry(podcast_id: int):
+    return _cached('podcast', podcast_id,
+                   lambda: _row_entry(db.session.get(Podcast, podcast_id, populate_existing=True)))
+
+
+def get_episode_entry(episode_id: int):
+    return _cached('episode', episode_id,
+                   lambda: _row_entry(db.session.get(Episode, episode_id, populate_existing=True)))
+
+
+def get_playlist_entry(playlist_id: int):
+    return _cached('playlist', playlist_id,
+                   lambda: _row_entry(db.session.get(Playlist, playlist_id, populate_existing=True)))
+
+
+def get_podcast_ratings(podcast_id: int) -> list:
+    return _cached('ratings', f'podcast:{podcast_id}',
+                   lambda: [item.to_dict() for item in Rating.query.filter_by(podcast_id=podcast_id).populate_existing()])
+
+
+def get_user_ratings(user_id: int) -> list:
+    return _cached('ratings', f'user:{user_id}',
+                   lambda: [item.to_dict() for item in Rating.query.filter_by(user_id=user_id).populate_existing()])
+
+
+def get_user_favourites(user_id: int) -> list:
+    return _cached('favourites', f'user:{user_id}', lambda: [
+        item.to_dict() for item in Favourite.query.filter_by(user_id=user_id).populate_existing()])
+
+
+def get_user_subscriptions(user_id: int) -> list:
+    """Podcast ids the user subscribes to; the podcasts themselves come from their own entries."""
+    return _cached('subscriptions', f'user:{user_id}',
+                   lambda: [item.podcast_id for item in Subscription.query.filter_by(user_id=user_id)])
+
+
+def _cache_keys(instance) -> list:
+    if isinstance(instance, Podcast):
+        return [('podcast', instance.id)]
+    if isinstance(instance, Episode):
+        return [('episode', instance.id)]
+    if isinstance(instance, Playlist):
+        return [('playlist', instance.id)]
+    if isinstance(instance, Rating):
+        return [('ratings', f'podcast:{instance.podcast_id}'), ('ratings', f'user:{instance.user_id}')]
+    if isinstance(instance, Favourite):
+        return [('favourites', f'user:{instance.user_id}')]
+    if isinstance(instance, Subscription):
+        # the podcast entry carries the subscriber count
+        return [('subscriptions', f'user:{instance.user_id}'), ('podcast', instance.podcast_id)]
+    return []
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_catalogue_invalidations(session, flush_context):
+    keys = session.info.setdefault('catalogue_invalidations', set())
+    for instance in chain(session.new, session.dirty, session.deleted):
+        keys.update(_cache_keys(instance))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_catalogue(session):
+    # also fired when a savepoint is released; wait for the transaction itself to commit
+    if session.in_nested_transaction():
+        return
+    keys = session.info.pop('catalogue_invalidations', None)
+    if keys:
+        catalogue_cache.invalidate(keys)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_catalogue_invalidations(session, previous_transaction):
+    # a failed flush or savepoint inside the transaction collected nothing; what earlier flushes
+    # collected still commits, so only the outermost rollback discards
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop('catalogue_invalidations', None)
@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime, timezone
+
+from flask import current_app, request
+from sqlalchemy import func
+
+
+def weak_etag(*parts) -> str:
+    """Opaque validator for whatever the parts identify, e.g. ('podcast', id, updated_at)."""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return digest[:32]
+
+
+def not_modified(etag: str, last_modified: datetime = None, weak: bool = True):
+    """
+    The 304 response when the client's copy is current, else None. If-None-Match wins over
+    If-Modified-Since, as RFC 9110 requires.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        if last_modified.tzinfo:
+            last_modified = last_modified.astimezone(timezone.utc).replace(tzinfo=None)
+        # HTTP dates carry whole seconds
+        fresh = last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return add_validators(current_app.response_class(status=304), etag, last_modified, weak=weak)
+
+
+def add_validators(response, etag: str, last_modified: datetime = None, weak: bool = True):
+    """Attach ETag and Last-Modified and ask clients to revalidate before reusing the response."""
+    response.set_etag(etag, weak=weak)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def collection_version(query, model, *parts):
+    """
+    (etag, last_modified) for the rows a query matches, from one aggregate: an insert or update moves
+    max(updated_at) and a delete changes the count. parts identify the page, e.g. limit and cursor.
+    """
+    count, last_modified = query.with_entities(func.count(model.id), func.max(model.updated_at)).one()
+    return weak_etag(model.__tablename__, count, last_modified, *parts), last_modified
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 import logging
 from app.models import db, Download
+from app.api.pagination import CursorError, page_params, paginate
 from flask_login import current_user
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -135,18 +136,37 @@ def list_downloads():
     tags:
         - Download
     get:
-        description: Retrieve a list of all downloads.
+        description: Retrieve downloads one page at a time.
+        parameters:
+            - name: limit
+              in: query
+              type: integer
+              description: Page size (default 50, at most 200).
+              required: false
+            - name: after
+              in: query
+              type: string
+              description: next_cursor from the previous page.
+              required: false
         responses:
             200:
-                description: A list of all downloads.
+                description: A page of downloads and the next_cursor, null on the last page.
                 schema:
                     type: array
                     items:
                         $ref: '#/definitions/Download'
+            400:
+                description: Invalid limit or cursor.
     """
     if not current_user.is_authenticated or current_user.role != 'admin':
         return jsonify({'status': 'error', 'message': 'Forbidden access','data':None}), 403
 
-    download_list: list[Download] = Download.query.all()
+    try:
+        limit, after = page_params()
+    except CursorError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+
+    download_list, next_cursor = paginate(Download.query, (Download.user_id, Download.episode_id), limit, after)
     download_list_dict = [item.to_dict() for item in download_list]
-    return jsonify({'status': 'success', 'message': 'got downloads', 'data': download_list_dict}), 201
+    return jsonify({'status': 'success', 'message': 'got downloads', 'data': download_list_dict,
+                    'next_cursor': next_cursor}), 201
@@ -5,6 +5,11 @@ from flask_login import current_user,login_required
 import logging
 from app.models import db,Episode,Podcast
 from app.api.webhook_security import verify_signature
+from app.api.streaming import ndjson_response, wants_ndjson
+from app.api.conditional import add_validators, collection_version, not_modified, weak_etag
+from app.api.catalogue import get_episode_entry
+from datetime import datetime
+from sqlalchemy import select
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 episode = Blueprint("episode", __name__)
@@ -18,13 +23,20 @@ def list_episodes():
     tags:
         - Episode
     get:
-        description: Retrieve a list of all episodes in a podcast.
+        description: Retrieve a list of all episodes in a podcast. With stream=1 or Accept application/x-ndjson
+                     the episodes are streamed one JSON object per line, and podcast_id may be left out to
+                     export every episode.
         parameters:
             - name: podcast_id
               in: body
               type: integer
               description: podcast id.
               required: true
+            - name: stream
+              in: query
+              type: integer
+              description: 1 to stream the episodes as NDJSON.
+              required: false
         responses:
             200:
                 description: A list of all episodes.
@@ -32,22 +44,36 @@ def list_episodes():
                     type: array
                     items:
                         $ref: '#/definitions/Episode'
+            304:
+                description: Not modified since the ETag in If-None-Match.
     """
 
-    data = request.json
-    podcast_id = data.get('podcast_id')
+    data = request.get_json(silent=True) or {}
+    podcast_id = data.get('podcast_id', request.args.get('podcast_id', type=int))
     if not current_user.is_authenticated:
         return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
 
-    episode_list: list[Episode] = Episode.query.filter_by(podcast_id=podcast_id).all()
+    if wants_ndjson():
+        statement = select(Episode).order_by(Episode.id)
+        if podcast_id is not None:
+            statement = statement.where(Episode.podcast_id == podcast_id)
+        return ndjson_response(statement)
+
+    query = Episode.query.filter_by(podcast_id=podcast_id)
+    etag, last_modified = collection_version(query, Episode, podcast_id)
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+    episode_list: list[Episode] = query.all()
     if episode_list:
         episode_list_dict = [item.to_dict() for item in episode_list]
-        return jsonify({'status': 'success', 'message': 'list of episodes', 'data': episode_list_dict}), 200
+        response = jsonify({'status': 'success', 'message': 'list of episodes', 'data': episode_list_dict})
+        return add_validators(response, etag, last_modified), 200
     else:
         return jsonify({'status': 'error', 'message': 'episode is empty', 'data': None}), 404
 
 @login_required
-@episode.get('/api/v1/episodes/<episode_id>')
+@episode.get('/api/v1/episodes/<int:episode_id>')
 def get_episode(episode_id):
     """
     Get a specific episode by ID.
@@ -67,13 +93,20 @@ def get_episode(episode_id):
                 description: Episode found.
                 schema:
                     $ref: '#/definitions/Episode'
+            304:
+                description: Not modified since the ETag in If-None-Match.
             404:
                 description: Episode not found.
     """
-    episode_ = Episode.query.filter_by(id=episode_id).first()
-    if episode_:
-        episode_list_dict = [item.to_dict() for item in episode_]
-        return jsonify({'status': 'success', 'message': 'fetched episode', 'data': episode_list_dict}), 200
+    entry = get_episode_entry(episode_id)
+    if entry:
+        updated_at = datetime.fromisoformat(entry['updated_at'])
+        etag = weak_etag('episode', episode_id, updated_at)
+        cached = not_modified(etag, updated_at)
+        if cached:
+            return cached
+        response = jsonify({'status': 'success', 'message': 'fetched episode', 'data': entry['data']})
+        return add_validators(response, etag, updated_at), 200
     else:
         return jsonify({'status': 'error', 'message': 'episode not found', 'data':None}), 400
 
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 import logging
-from app.models import db, Favourite
+from app.models import db, Favourite, Podcast
+from app.api.catalogue import get_user_favourites
+from app.api.batch import BatchError, batch_items, load_targets, parse_target, run_batch
 from flask_login import current_user,login_required
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,8 +30,7 @@ def list_favourites():
     if not current_user.is_authenticated:
         return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
 
-    favourite_list: list[Favourite] = Favourite.query.filter_by(user_id=current_user.id).all()
-    favourite_list_dict = [item.to_dict() for item in favourite_list]
+    favourite_list_dict = get_user_favourites(current_user.id)
     return jsonify({'status': 'success', 'message': 'got downloads', 'data': favourite_list_dict}), 201
 
 @login_required
@@ -38,9 +39,7 @@ def favourites_podcast_count():
     data = request.json
     podcast_id = data.get('podcast_id')
     try:
-        count = 0
-        favourite_list = Favourite.query.filter_by(podcast_id=podcast_id).all()
-        count = len(favourite_list)
+        count = db.session.query(Podcast.favourite_count).filter_by(id=podcast_id).scalar() or 0
         return jsonify({'status': 'success', 'message': 'Retrieved number of likes', 'data': count}), 200
     except Exception as e:
         logger.error(f"Error retrieving numeber of likes: {str(e)}")
@@ -95,6 +94,51 @@ def add_podcast_to_favourite():
         return jsonify({'status': 'error', 'message': 'favourite action failed', 'error_code': 'SERVER ERROR',
                         'data': None}), 500
 
+@login_required
+@favourite.post('/api/v1/favourites/batch')
+def add_favourites_batch():
+    """
+    Add many episodes to favourites at once.
+    ---
+    tags:
+        - Favourite
+    post:
+        description: Add up to 500 favourites in one transaction. Each item names an episode_id; items
+                     naming a podcast_id are invalid, as favourites are stored per episode. Favourites
+                     that already exist are left as they are.
+        parameters:
+            - name: items
+              in: body
+              type: array
+              description: '[{"episode_id": 1}, {"episode_id": 2}, ...]'
+              required: true
+        responses:
+            200:
+                description: The status of each item in request order, created, unchanged, duplicate, invalid or failed.
+            400:
+                description: Missing, empty or oversized items array.
+            403:
+                description: User not authenticated.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
+
+    try:
+        items = batch_items()
+    except BatchError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    def parse(item):
+        return dict(parse_target(item, targets, ('episode_id',)), user_id=current_user.id), {}
+
+    try:
+        targets = load_targets(db.session, items)
+        return jsonify(run_batch(db.session, Favourite, items, parse)), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(str(e))
+        return jsonify({'status': 'error', 'message': 'favourite action failed', 'error_code': 'SERVER ERROR',
+                        'data': None}), 500
+
 @login_required
 @favourite.delete('/api/v1/favourites')
 def remove_from_favourite():
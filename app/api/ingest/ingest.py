@@ -0,0 +1,59 @@
+from flask import Blueprint, jsonify
+from flask_login import current_user, login_required
+import logging
+
+from tasks.ingestservice import get_ingestion_state
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ingest = Blueprint("ingest", __name__)
+
+# Spool paths and blob names are internal to the ingestion tasks
+PUBLIC_FIELDS = ('status', 'podcast_id', 'episode_id', 'title', 'duration', 'image_url', 'audio_url', 'error',
+                 'updated_at')
+
+
+@login_required
+@ingest.get('/api/v1/ingestions/<ingestion_id>')
+def get_ingestion(ingestion_id):
+    """
+    Get the progress of an episode or podcast image ingestion.
+    ---
+    tags:
+        - Ingestion
+    get:
+        description: Report the status of an upload queued by the create episode or create podcast pages.
+                     status is one of queued, uploading, probing, saving, retrying, done or failed.
+        parameters:
+            - name: ingestion_id
+              in: path
+              type: string
+              description: ID of the ingestion.
+              required: true
+        responses:
+            200:
+                description: Current ingestion status.
+            403:
+                description: User not authenticated.
+            404:
+                description: Ingestion not found or expired.
+            500:
+                description: Internal server error.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
+
+    try:
+        state = get_ingestion_state(ingestion_id)
+    except Exception as e:
+        logger.error(str(e))
+        return jsonify({'status': 'error', 'message': 'Internal Server error', 'error_code': 'SERVER ERROR',
+                        'data': None}), 500
+
+    if state is None or state.get('user_id') != current_user.id:
+        return jsonify({'status': 'error', 'message': 'ingestion not found', 'data': None}), 404
+
+    data = {field: state.get(field) for field in PUBLIC_FIELDS}
+    data['ingestion_id'] = ingestion_id
+    return jsonify({'status': 'success', 'message': 'ingestion status', 'data': data}), 200
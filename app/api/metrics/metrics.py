@@ -0,0 +1,37 @@
+import os
+import hmac
+
+from flask import Blueprint, request, jsonify
+
+from app.metrics import metrics_response
+
+metrics = Blueprint("metrics", __name__)
+
+# Bearer token Prometheus sends to scrape /metrics; the endpoint is disabled while it is unset
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+
+@metrics.get('/metrics')
+def get_metrics():
+    """
+    Prometheus metrics.
+    ---
+    tags:
+        - Metrics
+    get:
+        description: Application metrics in the Prometheus text format, including cache hits and misses.
+                     Requires an "Authorization: Bearer <METRICS_TOKEN>" header.
+        responses:
+            200:
+                description: Current metric samples.
+            403:
+                description: Missing or wrong bearer token.
+            404:
+                description: METRICS_TOKEN is not set.
+    """
+    if not METRICS_TOKEN:
+        return jsonify({'status': 'error', 'message': 'not found', 'data': None}), 404
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return jsonify({'status': 'error', 'message': 'invalid metrics token', 'data': None}), 403
+    return metrics_response()
@@ -0,0 +1,61 @@
+import os
+import json
+import base64
+import binascii
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_LIMIT = int(os.getenv('API_PAGE_LIMIT', 50))
+MAX_PAGE_LIMIT = int(os.getenv('API_MAX_PAGE_LIMIT', 200))
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(values) -> str:
+    """Opaque url-safe token for the sort key of the last row on a page."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise CursorError('invalid cursor')
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            decoded.append(datetime.fromisoformat(value) if python_type is datetime else python_type(value))
+        return decoded
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise CursorError('invalid cursor') from e
+
+
+def page_params():
+    """Read limit and after from the query string. Raises CursorError on bad values."""
+    limit = request.args.get('limit', DEFAULT_PAGE_LIMIT, type=int)
+    if limit is None or limit < 1:
+        raise CursorError('limit must be a positive integer')
+    return min(limit, MAX_PAGE_LIMIT), request.args.get('after') or None
+
+
+def paginate(query, columns, limit: int = DEFAULT_PAGE_LIMIT, after: str = None, descending: bool = False):
+    """
+    Keyset pagination: order by columns, which must identify a row uniquely, and continue strictly
+    after the cursor, so every page is an index range scan no matter how deep it is.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    key = tuple_(*columns)
+    if after:
+        values = decode_cursor(after, columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    query = query.order_by(*(column.desc() if descending else column for column in columns))
+    items = query.limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(getattr(items[-1], column.key) for column in columns)
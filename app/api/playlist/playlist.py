@@ -1,6 +1,9 @@
 from flask import Blueprint, request,jsonify
 import logging
 from app.models import db,Playlist
+from app.api.conditional import add_validators, collection_version, not_modified, weak_etag
+from app.api.catalogue import get_playlist_entry
+from datetime import datetime
 from flask_login import current_user,login_required
 
 
@@ -27,17 +30,25 @@ def list_playlists():
                     type: array
                     items:
                         $ref: '#/definitions/Playlist'
+            304:
+                description: Not modified since the ETag in If-None-Match.
     """
-    playlist_list: list[Playlist] = Playlist.query.filter_by(user_id=current_user.id).all()
+    query = Playlist.query.filter_by(user_id=current_user.id)
+    etag, last_modified = collection_version(query, Playlist, current_user.id)
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+    playlist_list: list[Playlist] = query.all()
 
     if playlist_list:
         playlist_list_dict = [item.to_dict() for item in playlist_list]
-        return jsonify({'status': 'success', 'message': 'got user private playlists', 'data': playlist_list_dict}), 200
+        response = jsonify({'status': 'success', 'message': 'got user private playlists', 'data': playlist_list_dict})
+        return add_validators(response, etag, last_modified), 200
     else:
         return jsonify({'status': 'error', 'message': 'playlist is empty', 'data': None}), 404
 
 @login_required
-@playlist.get('/api/v1/playlists/<playlist_id>')
+@playlist.get('/api/v1/playlists/<int:playlist_id>')
 def get_playlist(playlist_id):
     """
     Get a specific playlist by ID.
@@ -57,12 +68,20 @@ def get_playlist(playlist_id):
                 description: The playlist details.
                 schema:
                     $ref: '#/definitions/Playlist'
+            304:
+                description: Not modified since the ETag in If-None-Match.
             404:
                 description: Playlist not found.
     """
-    playlist_ = Playlist.query.filter_by(id=playlist_id).first()
-    if playlist_:
-        return jsonify({'status': 'success', 'message': 'got downloads', 'data': playlist_}), 201
+    entry = get_playlist_entry(playlist_id)
+    if entry:
+        updated_at = datetime.fromisoformat(entry['updated_at'])
+        etag = weak_etag('playlist', playlist_id, updated_at)
+        cached = not_modified(etag, updated_at)
+        if cached:
+            return cached
+        response = jsonify({'status': 'success', 'message': 'got playlist', 'data': entry['data']})
+        return add_validators(response, etag, updated_at), 200
     else:
         return jsonify({'status': 'error', 'message': 'playlist not found','data':None}), 404
 
@@ -1,7 +1,9 @@
 from flask import request,jsonify,Blueprint
 from app.models import db,Playlist,PlaylistItem,PlaylistPlaylistitem
 import logging
-from  flask_login import login_required
+from  flask_login import login_required, current_user
+from app.api.playlistcontents import load_playlist_contents, playlist_contents_to_dict
+from app.api.batch import BatchError, batch_items, existing_ids, positive_int, run_batch
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -66,6 +68,69 @@ def add_playlist_item_to_playlist(playlist_id):
         logger.error(f"Error adding PlaylistItem to Playlist {playlist_id}: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to add PlaylistItem to Playlist', 'error_code': 'SERVER_ERROR', 'data': None}), 500
 
+@login_required
+@playlist_item_bp.post('/api/v1/playlists/<int:playlist_id>/playlist_items/batch')
+def add_playlist_items_to_playlist_batch(playlist_id):
+    """
+    Add many PlaylistItems to a Playlist at once.
+    ---
+    tags:
+        - Playlist
+    post:
+        description: Add up to 500 PlaylistItems to a Playlist in one transaction. Items already in the
+                     Playlist are left as they are.
+        parameters:
+            - name: playlist_id
+              in: path
+              type: integer
+              description: ID of the playlist to add the items to.
+              required: true
+            - name: items
+              in: body
+              type: array
+              description: '[{"playlist_item_id": 1}, ...]'
+              required: true
+        responses:
+            200:
+                description: The status of each item in request order, created, unchanged, duplicate, invalid or failed.
+            400:
+                description: Missing, empty or oversized items array.
+            403:
+                description: User not authenticated.
+            404:
+                description: Playlist not found.
+            500:
+                description: Server error while adding PlaylistItems.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
+
+    try:
+        items = batch_items()
+    except BatchError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+
+    def parse(item):
+        playlist_item_id = item.get('playlist_item_id') if isinstance(item, dict) else None
+        if not positive_int(playlist_item_id):
+            raise BatchError('playlist_item_id must be a positive integer')
+        if playlist_item_id not in playlist_items:
+            raise BatchError(f'PlaylistItem {playlist_item_id} not found')
+        return {'playlist_id': playlist_id, 'playlist_item_id': playlist_item_id}, {}
+
+    try:
+        playlist = db.session.get(Playlist, playlist_id)
+        if not playlist:
+            return jsonify({'status': 'error', 'message': 'Playlist not found', 'data': None}), 404
+        playlist_items = existing_ids(db.session, PlaylistItem.id,
+                                      [item.get('playlist_item_id') for item in items
+                                       if isinstance(item, dict) and positive_int(item.get('playlist_item_id'))])
+        return jsonify(run_batch(db.session, PlaylistPlaylistitem, items, parse)), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error adding PlaylistItems to Playlist {playlist_id}: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to add PlaylistItems to Playlist', 'error_code': 'SERVER_ERROR', 'data': None}), 500
+
 @login_required
 @playlist_item_bp.delete('/api/v1/playlists/<int:playlist_id>/playlist_items')
 def remove_playlist_item_from_playlist(playlist_id):
@@ -135,7 +200,8 @@ def list_playlist_items_in_playlist(playlist_id):
     tags:
         - Playlist
     get:
-        description: Retrieve a list of all PlaylistItems in a specific Playlist.
+        description: Retrieve all PlaylistItems in a specific Playlist with their episode or podcast
+                     and whether the current user favourited the episode, in one query.
         parameters:
             - name: playlist_id
               in: path
@@ -161,9 +227,10 @@ def list_playlist_items_in_playlist(playlist_id):
             return jsonify({'status': 'error', 'message': 'Playlist not found', 'data': None}), 404
 
         # Get all playlist items associated with this playlist
-        playlist_items = PlaylistPlaylistitem.query.filter_by(playlist_id=playlist_id).all()
+        user_id = current_user.id if current_user.is_authenticated else None
+        playlist_items = load_playlist_contents(db.session, playlist_id, user_id)
         if playlist_items:
-            items_dict = [item.to_dict() for item in playlist_items]
+            items_dict = playlist_contents_to_dict(playlist_id, playlist_items)
             return jsonify({'status': 'success', 'message': 'Retrieved PlaylistItems', 'data': items_dict}), 200
         else:
             return jsonify({'status': 'error', 'message': 'No PlaylistItems found for this Playlist', 'data': None}), 404
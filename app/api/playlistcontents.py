@@ -0,0 +1,47 @@
+from sqlalchemy import exists, false, select
+from sqlalchemy.orm import joinedload
+
+from app.models import Episode, Favourite, PlaylistItem, PlaylistPlaylistitem, Podcast
+
+
+def playlist_contents_statement(playlist_id: int, user_id: int = None, where=None):
+    """
+    One select for everything a playlist page shows: each item with its episode and the episode's
+    podcast, or its podcast, and whether user_id favourited the episode. where narrows the items,
+    e.g. to a title search.
+    """
+    if user_id is None:
+        favourited = false()
+    else:
+        favourited = exists().where(Favourite.episode_id == Episode.id, Favourite.user_id == user_id)
+    statement = (
+        select(PlaylistItem, Episode, Podcast, favourited.label('favourited'))
+        .join(PlaylistPlaylistitem, PlaylistPlaylistitem.playlist_item_id == PlaylistItem.id)
+        .outerjoin(Episode, PlaylistItem.episode_id == Episode.id)
+        .outerjoin(Podcast, PlaylistItem.podcast_id == Podcast.id)
+        .options(joinedload(Episode.podcast))
+        .where(PlaylistPlaylistitem.playlist_id == playlist_id)
+        .order_by(PlaylistPlaylistitem.playlist_item_id)
+    )
+    return statement if where is None else statement.where(where)
+
+
+def load_playlist_contents(session, playlist_id: int, user_id: int = None, where=None) -> list:
+    """
+    The items of a playlist in one round trip however long it is, as
+    {'item', 'episode', 'podcast', 'favourited'} dicts; episode or podcast is None.
+    """
+    rows = session.execute(playlist_contents_statement(playlist_id, user_id, where)).unique()
+    return [{'item': item, 'episode': episode, 'podcast': podcast, 'favourited': bool(favourited)}
+            for item, episode, podcast, favourited in rows]
+
+
+def playlist_contents_to_dict(playlist_id: int, contents: list) -> list:
+    return [{
+        'playlist_id': playlist_id,
+        'playlist_item_id': entry['item'].id,
+        'added_date': entry['item'].added_date.isoformat(),
+        'episode': entry['episode'].to_dict() if entry['episode'] else None,
+        'podcast': entry['podcast'].to_dict() if entry['podcast'] else None,
+        'favourited': entry['favourited'],
+    } for entry in contents]
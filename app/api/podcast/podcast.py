@@ -4,6 +4,12 @@ from app.api.webhook_security import verify_signature
 from flask_login import current_user,login_required
 import os
 from app.models import db, Podcast
+from app.api.pagination import CursorError, page_params, paginate
+from app.api.streaming import ndjson_response, wants_ndjson
+from app.api.conditional import add_validators, collection_version, not_modified, weak_etag
+from app.api.catalogue import get_podcast_entry
+from datetime import datetime
+from sqlalchemy import select
 from app.model_utils import provider_check
 
 
@@ -21,20 +27,54 @@ def list_podcasts():
     tags:
         - Podcast
     get:
-        description: Retrieve a list of all podcasts.
+        description: Retrieve podcasts newest first, one page at a time. With stream=1 or
+                     Accept application/x-ndjson every podcast is streamed instead, one JSON object per line.
+        parameters:
+            - name: limit
+              in: query
+              type: integer
+              description: Page size (default 50, at most 200).
+              required: false
+            - name: after
+              in: query
+              type: string
+              description: next_cursor from the previous page.
+              required: false
+            - name: stream
+              in: query
+              type: integer
+              description: 1 to export the whole catalogue as NDJSON.
+              required: false
         responses:
             200:
-                description: A list of all podcasts.
+                description: A page of podcasts and the next_cursor, null on the last page.
                 schema:
                     type: array
                     items:
                         $ref: '#/definitions/Podcast'
+            304:
+                description: Not modified since the ETag in If-None-Match.
+            400:
+                description: Invalid limit or cursor.
     """
+    if wants_ndjson():
+        return ndjson_response(select(Podcast).order_by(Podcast.id))
     try:
-        podcast_list = Podcast.query.all()
-        if podcast_list:
+        limit, after = page_params()
+    except CursorError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    try:
+        etag, last_modified = collection_version(Podcast.query, Podcast, limit, after)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        podcast_list, next_cursor = paginate(Podcast.query, (Podcast.publish_date, Podcast.id), limit, after,
+                                             descending=True)
+        if podcast_list or after:
             podcast_list_dict = [item.to_dict() for item in podcast_list]
-            return jsonify({'status': 'success', 'message': 'retrieved all podcasts', 'data': podcast_list_dict}), 200
+            response = jsonify({'status': 'success', 'message': 'retrieved all podcasts', 'data': podcast_list_dict,
+                                'next_cursor': next_cursor})
+            return add_validators(response, etag, last_modified), 200
         else:
             return jsonify({'status': 'error', 'message': 'Podcast is empty', 'data': None}), 404
     except Exception as e:
@@ -63,12 +103,20 @@ def get_podcast(podcast_id):
                 description: Details of the podcast.
                 schema:
                     $ref: '#/definitions/Podcast'
+            304:
+                description: Not modified since the ETag in If-None-Match.
             404:
                 description: Podcast not found.
     """
-    podcast_ = Podcast.query.filter_by(id=podcast_id).first()
-    if podcast_:
-        return jsonify({'status': 'success', 'message': 'retrieved podcast details', 'data': podcast_.to_dict()}), 200
+    entry = get_podcast_entry(podcast_id)
+    if entry:
+        updated_at = datetime.fromisoformat(entry['updated_at'])
+        etag = weak_etag('podcast', podcast_id, updated_at)
+        cached = not_modified(etag, updated_at)
+        if cached:
+            return cached
+        response = jsonify({'status': 'success', 'message': 'retrieved podcast details', 'data': entry['data']})
+        return add_validators(response, etag, updated_at), 200
     else:
         return jsonify({'status': 'error', 'message': 'Podcast not found!', 'data': None}), 404
 
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 import logging
 from app.models import db, Rating
+from app.api.pagination import CursorError, page_params, paginate
+from app.api.catalogue import get_podcast_ratings, get_user_ratings
+from app.api.batch import BatchError, batch_items, load_targets, parse_target, positive_int, run_batch
 from flask_login import current_user,login_required
 
 logging.basicConfig(level=logging.INFO)
@@ -9,6 +12,8 @@ logger = logging.getLogger(__name__)
 
 rating = Blueprint("rating", __name__)
 
+MAX_RATING = 5
+
 @login_required
 @rating.get('/api/v1/ratings')
 def list_ratings():
@@ -18,19 +23,37 @@ def list_ratings():
     tags:
         - Rating
     get:
-        description: Retrieve a list of all ratings.
+        description: Retrieve ratings one page at a time.
+        parameters:
+            - name: limit
+              in: query
+              type: integer
+              description: Page size (default 50, at most 200).
+              required: false
+            - name: after
+              in: query
+              type: string
+              description: next_cursor from the previous page.
+              required: false
         responses:
             200:
-                description: A list of all ratings.
+                description: A page of ratings and the next_cursor, null on the last page.
                 schema:
                     type: array
                     items:
                         $ref: '#/definitions/Rating'
+            400:
+                description: Invalid limit or cursor.
     """
     try:
-        rating_list = Rating.query.all()
+        limit, after = page_params()
+    except CursorError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    try:
+        rating_list, next_cursor = paginate(Rating.query, (Rating.user_id, Rating.episode_id), limit, after)
         ratings_dict = [rating.to_dict() for rating in rating_list]
-        return jsonify({'status': 'success', 'message': 'Retrieved all ratings', 'data': ratings_dict}), 200
+        return jsonify({'status': 'success', 'message': 'Retrieved all ratings', 'data': ratings_dict,
+                        'next_cursor': next_cursor}), 200
     except Exception as e:
         logger.error(f"Error retrieving ratings: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to retrieve ratings', 'error_code': 'SERVER_ERROR', 'data': None}), 500
@@ -41,9 +64,8 @@ def list_podcast_ratings():
     data = request.json
     podcast_id = data.get('podcast_id')
     try:
-        rating_list = Rating.query.filter_by(podcast_id=podcast_id).all()
-        rating_dict = [item.to_dict() for item in rating_list]
-        count = len(rating_list)
+        rating_dict = get_podcast_ratings(podcast_id)
+        count = len(rating_dict)
         result = {'rating':rating_dict,'count':count}
         return jsonify({'status': 'success', 'message': 'Retrieved rating podcast data', 'data': result}), 200
     except Exception as e:
@@ -54,9 +76,8 @@ def list_podcast_ratings():
 @rating.get('/api/v1/ratings/user')
 def list_user_ratings():
     try:
-        rating_list = Rating.query.filter_by(user_id=current_user.id).all()
-        rating_dict = [item.to_dict() for item in rating_list]
-        count = len(rating_list)
+        rating_dict = get_user_ratings(current_user.id)
+        count = len(rating_dict)
         result = {'rating':rating_dict,'count':count}
         return jsonify({'status': 'success', 'message': 'Retrieved rating user data', 'data': result}), 200
     except Exception as e:
@@ -109,6 +130,58 @@ def rate_podcast_episode():
         logger.error(f"Error rating podcast: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to rate podcast', 'error_code': 'SERVER_ERROR', 'data': None}), 500
 
+@login_required
+@rating.post('/api/v1/ratings/batch')
+def rate_batch():
+    """
+    Rate many episodes at once.
+    ---
+    tags:
+        - Rating
+    post:
+        description: Submit up to 500 ratings in one transaction. Each item names an episode_id with a
+                     rating from 1 to 5 and an optional review_text; items naming a podcast_id are invalid,
+                     as ratings are stored per episode. An existing rating by the current user is replaced.
+        parameters:
+            - name: items
+              in: body
+              type: array
+              description: '[{"episode_id": 1, "rating": 4, "review_text": "..."}, ...]'
+              required: true
+        responses:
+            200:
+                description: The status of each item in request order, created, updated, unchanged, duplicate, invalid or failed.
+            400:
+                description: Missing, empty or oversized items array.
+            403:
+                description: User not authenticated.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
+
+    try:
+        items = batch_items()
+    except BatchError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+
+    def parse(item):
+        key = parse_target(item, targets, ('episode_id',))
+        value = item.get('rating')
+        if not positive_int(value) or value > MAX_RATING:
+            raise BatchError(f'rating must be an integer from 1 to {MAX_RATING}')
+        review_text = item.get('review_text')
+        if review_text is not None and not isinstance(review_text, str):
+            raise BatchError('review_text must be a string')
+        return dict(key, user_id=current_user.id), {'rating': value, 'review_text': review_text}
+
+    try:
+        targets = load_targets(db.session, items)
+        return jsonify(run_batch(db.session, Rating, items, parse, update_columns=('rating', 'review_text'))), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error rating in batch: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to save ratings', 'error_code': 'SERVER_ERROR', 'data': None}), 500
+
 @login_required
 @rating.delete('/api/v1/ratings')
 def remove_rating():
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify
+import logging
+from flask_login import login_required
+
+from app.models import db
+from app.search import SEARCH_MAX_LIMIT, SEARCH_MODELS, search as run_search
+
+search_api = Blueprint("search", __name__)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@login_required
+@search_api.get('/api/v1/search')
+def search_catalogue():
+    """
+    Full-text search over podcasts and episodes.
+    ---
+    tags:
+        - Search
+    get:
+        description: Ranked matches for a free-text query over titles, descriptions and episode
+                     transcriptions. Every word must match; quoted phrases and -word are supported on Postgres.
+        parameters:
+            - name: q
+              in: query
+              type: string
+              description: Search terms.
+              required: true
+            - name: type
+              in: query
+              type: string
+              enum: [podcast, episode]
+              description: Only return this kind of result.
+              required: false
+            - name: limit
+              in: query
+              type: integer
+              description: Number of results (default 20, at most 100).
+              required: false
+        responses:
+            200:
+                description: Matches best first, each with type, id, title, rank and a highlighted passage.
+            400:
+                description: Missing query or invalid type.
+    """
+    query = (request.args.get('q') or '').strip()
+    kind = request.args.get('type')
+    limit = request.args.get('limit', 20, type=int)
+    if not query:
+        return jsonify({'status': 'error', 'message': 'q is required', 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    if kind and kind not in SEARCH_MODELS:
+        return jsonify({'status': 'error', 'message': f'type must be one of {", ".join(SEARCH_MODELS)}',
+                        'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    if limit is None or limit < 1:
+        return jsonify({'status': 'error', 'message': 'limit must be a positive integer',
+                        'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    try:
+        results = run_search(db.session, query, kinds=(kind,) if kind else tuple(SEARCH_MODELS),
+                             limit=min(limit, SEARCH_MAX_LIMIT))
+        return jsonify({'status': 'success', 'message': f'{len(results)} results', 'data': results}), 200
+    except Exception as e:
+        logger.error(f'Search failed: {e}')
+        return jsonify({'status': 'error', 'message': 'Search failed', 'error_code': 'SERVER ERROR', 'data': None}), 500
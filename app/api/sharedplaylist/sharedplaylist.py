@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 import logging
 from app.models import db, SharedPlaylist
+from app.api.pagination import CursorError, page_params, paginate
+from sqlalchemy.orm import joinedload
 from app.model_utils import Shared
 from flask_login import current_user,login_required
 logging.basicConfig(level=logging.INFO)
@@ -17,20 +19,40 @@ def list_shared_playlists():
     tags:
         - Shared Playlist
     get:
-        description: Retrieve a list of all shared playlists.
+        description: Retrieve shared playlists one page at a time.
+        parameters:
+            - name: limit
+              in: query
+              type: integer
+              description: Page size (default 50, at most 200).
+              required: false
+            - name: after
+              in: query
+              type: string
+              description: next_cursor from the previous page.
+              required: false
         responses:
             200:
-                description: A list of all shared playlists.
+                description: A page of shared playlists and the next_cursor, null on the last page.
                 schema:
                     type: array
                     items:
                         $ref: '#/definitions/SharedPlaylist'
+            400:
+                description: Invalid limit or cursor.
     """
     try:
-        shared_playlist_list = SharedPlaylist.query.distinct().all()
-        if shared_playlist_list:
+        limit, after = page_params()
+    except CursorError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    try:
+        query = SharedPlaylist.query.options(joinedload(SharedPlaylist.playlist))
+        shared_playlist_list, next_cursor = paginate(query, (SharedPlaylist.user_id, SharedPlaylist.playlist_id),
+                                                     limit, after)
+        if shared_playlist_list or after:
             playlists_dict = [playlist.to_dict() for playlist in shared_playlist_list]
-            return jsonify({'status': 'success', 'message': 'Retrieved all shared playlists', 'data': playlists_dict}), 200
+            return jsonify({'status': 'success', 'message': 'Retrieved all shared playlists', 'data': playlists_dict,
+                            'next_cursor': next_cursor}), 200
         else:
             return jsonify({'status': 'error', 'message': 'shared playlist is empty', 'data': None}), 404
     except Exception as e:
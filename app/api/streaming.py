@@ -0,0 +1,38 @@
+import os
+import json
+import logging
+
+from flask import Response, request, stream_with_context
+
+from app.models import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Rows fetched per round trip; with psycopg2 yield_per also switches to a server-side cursor
+STREAM_BATCH_SIZE = int(os.getenv('API_STREAM_BATCH_SIZE', 500))
+
+
+def wants_ndjson() -> bool:
+    """True for ?stream=1 or when the client prefers application/x-ndjson over application/json."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(statement, serialize=lambda row: row.to_dict(), batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Stream the rows of a select as one JSON object per line. Rows are loaded batch_size at a time
+    and each line is written as soon as it is serialized, so memory stays flat however many rows match.
+    """
+    def generate():
+        try:
+            for row in db.session.scalars(statement.execution_options(yield_per=batch_size)):
+                yield json.dumps(serialize(row)) + '\n'
+        except Exception as e:
+            # the status line has been sent; dropping the connection tells the client the export is incomplete
+            logger.error(f'NDJSON export failed: {e}')
+            raise
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
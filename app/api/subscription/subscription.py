@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 import logging
-from app.models import db, Subscription
+from app.models import db, Subscription, Podcast
+from app.api.pagination import CursorError, page_params, paginate
+from app.api.catalogue import get_podcast_entry, get_user_subscriptions
+from app.api.batch import BatchError, batch_items, existing_ids, positive_int, run_batch
 from flask_login import current_user,login_required
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,22 +19,38 @@ def list_subscriptions():
     tags:
         - Subscription
     get:
-        description: Retrieve a list of all subscriptions.
+        description: Retrieve subscriptions one page at a time.
+        parameters:
+            - name: limit
+              in: query
+              type: integer
+              description: Page size (default 50, at most 200).
+              required: false
+            - name: after
+              in: query
+              type: string
+              description: next_cursor from the previous page.
+              required: false
         responses:
             200:
-                description: A list of all subscriptions.
+                description: A page of subscriptions and the next_cursor, null on the last page.
                 schema:
                     type: array
                     items:
                         $ref: '#/definitions/Subscription'
+            400:
+                description: Invalid limit or cursor.
     """
-    data = request.json
-
     try:
-
-        subscription_list = Subscription.query.all()
+        limit, after = page_params()
+    except CursorError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    try:
+        subscription_list, next_cursor = paginate(Subscription.query, (Subscription.user_id, Subscription.podcast_id),
+                                                  limit, after)
         subscriptions_dict = [subscription.to_dict() for subscription in subscription_list]
-        return jsonify({'status': 'success', 'message': 'Retrieved all subscriptions', 'data': subscriptions_dict}), 200
+        return jsonify({'status': 'success', 'message': 'Retrieved all subscriptions', 'data': subscriptions_dict,
+                        'next_cursor': next_cursor}), 200
     except Exception as e:
         logger.error(f"Error retrieving subscriptions: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to retrieve subscriptions', 'error_code': 'SERVER_ERROR', 'data': None}), 500
@@ -42,9 +61,8 @@ def list_podcast_subscribers_count():
     data = request.json
     podcast_id = data.get('podcast_id')
     try:
-        count = 0
-        subscription_list = Subscription.query.filter_by(podcast_id=podcast_id).all()
-        count = len(subscription_list)
+        entry = get_podcast_entry(podcast_id) if podcast_id else None
+        count = entry['data']['subscriptions'] if entry else 0
         return jsonify({'status': 'success', 'message': 'Retrieved podcast subscriber count', 'data': count}), 200
     except Exception as e:
         logger.error(f"Error retrieving podcast subscriber count: {str(e)}")
@@ -53,12 +71,10 @@ def list_podcast_subscribers_count():
 @login_required
 @subscription.get('/api/v1/subscriptions/subscribed')
 def list_subscriber_subscribed():
-    data = request.json
     try:
-        count = 0
-        subscription_list = Subscription.query.filter_by(podcast_id=current_user.id).all()
-        subscriptions_dict = [item.podcast.to_dict() for item in subscription_list]
-        count = len(subscription_list)
+        entries = [get_podcast_entry(podcast_id) for podcast_id in get_user_subscriptions(current_user.id)]
+        subscriptions_dict = [entry['data'] for entry in entries if entry]
+        count = len(subscriptions_dict)
         result = {'podcasts':subscriptions_dict,'count':count}
         return jsonify({'status': 'success', 'message': 'Retrieved podcast subscriber count', 'data': result}), 200
     except Exception as e:
@@ -111,6 +127,56 @@ def subscribe_to_podcast():
         logger.error(f"Error subscribing to podcast: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to subscribe to podcast', 'error_code': 'SERVER_ERROR', 'data': None}), 500
 
+@login_required
+@subscription.post('/api/v1/subscriptions/batch')
+def subscribe_to_podcasts_batch():
+    """
+    Subscribe the current user to many podcasts at once.
+    ---
+    tags:
+        - Subscription
+    post:
+        description: Subscribe to up to 500 podcasts in one transaction. Existing subscriptions are left as they are.
+        parameters:
+            - name: items
+              in: body
+              type: array
+              description: '[{"podcast_id": 1}, ...]'
+              required: true
+        responses:
+            200:
+                description: The status of each item in request order, created, unchanged, duplicate, invalid or failed.
+            400:
+                description: Missing, empty or oversized items array.
+            403:
+                description: User not authenticated.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
+
+    try:
+        items = batch_items()
+    except BatchError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+
+    def parse(item):
+        podcast_id = item.get('podcast_id') if isinstance(item, dict) else None
+        if not positive_int(podcast_id):
+            raise BatchError('podcast_id must be a positive integer')
+        if podcast_id not in podcasts:
+            raise BatchError(f'podcast {podcast_id} not found')
+        return {'user_id': current_user.id, 'podcast_id': podcast_id}, {}
+
+    try:
+        podcasts = existing_ids(db.session, Podcast.id,
+                                [item.get('podcast_id') for item in items
+                                 if isinstance(item, dict) and positive_int(item.get('podcast_id'))])
+        return jsonify(run_batch(db.session, Subscription, items, parse)), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error subscribing to podcasts: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to subscribe to podcasts', 'error_code': 'SERVER_ERROR', 'data': None}), 500
+
 @login_required
 @subscription.delete('/api/v1/subscriptions')
 def unsubscribe():
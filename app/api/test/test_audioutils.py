@@ -0,0 +1,68 @@
+import os
+import wave
+import struct
+import tempfile
+import unittest
+from tasks.audioutils import probe_duration
+
+# MPEG-1 layer III, 128 kbps, 44.1 kHz, no padding: 417 byte frames of 1152 samples
+MP3_FRAME_HEADER = b'\xff\xfb\x90\x00'
+MP3_FRAME_LENGTH = 417
+
+
+class TestProbeDuration(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_wav(self):
+        path = self.path('episode.wav')
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b'\x00\x00' * 8000 * 3)
+        self.assertEqual(probe_duration(path), 3)
+
+    def test_cbr_mp3_with_id3_tag(self):
+        path = self.path('episode.mp3')
+        frame = MP3_FRAME_HEADER + b'\x00' * (MP3_FRAME_LENGTH - 4)
+        with open(path, 'wb') as f:
+            f.write(b'ID3\x03\x00\x00\x00\x00\x00\x10' + b'\x00' * 16)
+            f.write(frame * 383)
+        self.assertEqual(probe_duration(path), 10)
+
+    def test_vbr_mp3_uses_xing_frame_count(self):
+        path = self.path('episode.mp3')
+        xing = b'Xing' + struct.pack('>II', 1, 1000)
+        first_frame = MP3_FRAME_HEADER + b'\x00' * 32 + xing
+        first_frame += b'\x00' * (MP3_FRAME_LENGTH - len(first_frame))
+        with open(path, 'wb') as f:
+            f.write(first_frame + MP3_FRAME_HEADER + b'\x00' * (MP3_FRAME_LENGTH - 4))
+        self.assertEqual(probe_duration(path), 26)
+
+    def test_ogg_vorbis(self):
+        path = self.path('episode.ogg')
+        identification = b'\x01vorbis' + struct.pack('<IBI', 0, 2, 44100) + b'\x00' * 14
+
+        def page(granule, packet):
+            return b'OggS\x00\x00' + struct.pack('<qIII', granule, 1, 0, 0) + bytes([1, len(packet)]) + packet
+
+        with open(path, 'wb') as f:
+            f.write(page(0, identification) + page(44100 * 5, b'\x00' * 100))
+        self.assertEqual(probe_duration(path), 5)
+
+    def test_unknown_format(self):
+        path = self.path('episode.flac')
+        with open(path, 'wb') as f:
+            f.write(b'fLaC')
+        self.assertIsNone(probe_duration(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import threading
+import unittest
+from unittest import mock
+from requests.adapters import HTTPAdapter
+from app.api.azureops import azureclass
+from app.api.azureops.azureclass import AzureBlobStorage, build_transport, AZURE_POOL_MAXSIZE
+
+CONNECTION_STRING = ('DefaultEndpointsProtocol=https;AccountName=devacct;AccountKey=ZGV2a2V5;'
+                     'EndpointSuffix=core.windows.net')
+
+
+def underlying_transport(client):
+    # child clients wrap the service client's transport so closing them leaves it open
+    transport = client._pipeline._transport
+    while hasattr(transport, '_transport'):
+        transport = transport._transport
+    return transport
+
+
+class TestBuildTransport(unittest.TestCase):
+    def test_pool_is_sized_for_concurrent_streams(self):
+        transport = build_transport()
+        adapter = transport.session.get_adapter('https://devacct.blob.core.windows.net')
+        self.assertIsInstance(adapter, HTTPAdapter)
+        self.assertEqual(adapter._pool_maxsize, AZURE_POOL_MAXSIZE)
+        self.assertFalse(transport._session_owner)
+
+
+class TestClientCache(unittest.TestCase):
+    def setUp(self):
+        self.storage = AzureBlobStorage(CONNECTION_STRING)
+
+    def test_same_blob_returns_same_client(self):
+        client = self.storage.get_blob_client('audio', 'a.mp3')
+        self.assertIs(self.storage.get_blob_client('audio', 'a.mp3'), client)
+        self.assertIsNot(self.storage.get_blob_client('audio', 'b.mp3'), client)
+        self.assertEqual((client.container_name, client.blob_name), ('audio', 'a.mp3'))
+        container = self.storage.get_container_client('audio')
+        self.assertIs(self.storage.get_container_client('audio'), container)
+
+    def test_least_recently_used_client_is_evicted(self):
+        with mock.patch.object(azureclass, 'AZURE_CLIENT_CACHE_SIZE', 3):
+            first = self.storage.get_blob_client('audio', 'a.mp3')  # also caches ('audio', None)
+            self.storage.get_blob_client('audio', 'b.mp3')
+            self.assertIs(self.storage.get_blob_client('audio', 'a.mp3'), first)
+            self.storage.get_blob_client('audio', 'c.mp3')
+            # creating c.mp3 touched the container client, leaving b.mp3 the oldest entry
+            self.assertEqual(list(self.storage._clients), [('audio', 'a.mp3'), ('audio', None), ('audio', 'c.mp3')])
+            self.assertNotIn(('audio', 'b.mp3'), self.storage._clients)
+            self.assertIs(self.storage.get_blob_client('audio', 'a.mp3'), first)
+
+    def test_concurrent_callers_share_one_client(self):
+        barrier = threading.Barrier(8)
+        real_get_container_client = self.storage.blob_service_client.get_container_client
+
+        def slow_factory(container):
+            # every thread misses the cache before any of them stores its client
+            barrier.wait(timeout=5)
+            return real_get_container_client(container)
+
+        clients = []
+        with mock.patch.object(self.storage.blob_service_client, 'get_container_client', slow_factory):
+            threads = [threading.Thread(target=lambda: clients.append(self.storage.get_container_client('audio')))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(clients), 8)
+        self.assertTrue(all(client is clients[0] for client in clients))
+
+    def test_clients_share_one_transport(self):
+        service_transport = self.storage.blob_service_client._pipeline._transport
+        for client in (self.storage.get_container_client('audio'),
+                       self.storage.get_blob_client('audio', 'a.mp3'),
+                       self.storage.get_blob_client('images', 'b.png')):
+            self.assertIs(underlying_transport(client), service_transport)
+            self.assertIs(underlying_transport(client).session, service_transport.session)
+
+    def test_delete_container_drops_its_clients(self):
+        self.storage.get_blob_client('audio', 'a.mp3')
+        self.storage.get_blob_client('images', 'b.png')
+        with mock.patch('azure.storage.blob.ContainerClient.delete_container'):
+            self.storage.delete_container('audio')
+        self.assertEqual(list(self.storage._clients), [('images', None), ('images', 'b.png')])
+
+
+if __name__ == '__main__':
+    unittest.main()
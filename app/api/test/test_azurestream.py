@@ -0,0 +1,78 @@
+import unittest
+from app.api.azureops.azureclass import AzureBlobStorage
+
+CONNECTION_STRING = ('DefaultEndpointsProtocol=https;AccountName=devacct;AccountKey=ZGV2a2V5;'
+                     'EndpointSuffix=core.windows.net')
+CHUNK_SIZE = 4
+
+
+class FakeDownloader:
+    """Like StorageStreamDownloader: chunks() fetches one bounded piece at a time."""
+
+    def __init__(self, data: bytes, fetched: list):
+        self.data = data
+        self.fetched = fetched
+
+    def chunks(self):
+        for offset in range(0, len(self.data), CHUNK_SIZE):
+            piece = self.data[offset:offset + CHUNK_SIZE]
+            self.fetched.append(len(piece))
+            yield piece
+
+    def readall(self):
+        raise AssertionError('streaming must not read the whole blob at once')
+
+
+class FakeBlobClient:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.fetched = []
+        self.downloads = []
+
+    def download_blob(self, offset=None, length=None):
+        self.downloads.append((offset, length))
+        start = offset or 0
+        end = len(self.data) if length is None else start + length
+        return FakeDownloader(self.data[start:end], self.fetched)
+
+
+class TestStreamBlobChunks(unittest.TestCase):
+    def setUp(self):
+        self.storage = AzureBlobStorage(CONNECTION_STRING)
+        self.blob = FakeBlobClient(bytes(range(26)))
+        self.storage.get_blob_client = lambda container, blob: self.blob
+
+    def test_whole_blob(self):
+        chunks = list(self.storage.stream_blob_chunks('audio', 'a.mp3'))
+        self.assertEqual(b''.join(chunks), bytes(range(26)))
+        self.assertTrue(all(len(chunk) <= CHUNK_SIZE for chunk in chunks))
+        self.assertEqual(self.blob.downloads, [(None, None)])
+
+    def test_inclusive_range(self):
+        data = b''.join(self.storage.stream_blob_chunks('audio', 'a.mp3', 5, 14))
+        self.assertEqual(data, bytes(range(5, 15)))
+        self.assertEqual(self.blob.downloads, [(5, 10)])
+
+    def test_open_ended_range(self):
+        data = b''.join(self.storage.stream_blob_chunks('audio', 'a.mp3', 20))
+        self.assertEqual(data, bytes(range(20, 26)))
+        self.assertEqual(self.blob.downloads, [(20, None)])
+
+    def test_chunks_are_fetched_as_consumed(self):
+        chunks = self.storage.stream_blob_chunks('audio', 'a.mp3')
+        self.assertEqual(self.blob.fetched, [])
+        next(chunks)
+        self.assertEqual(self.blob.fetched, [CHUNK_SIZE])
+
+    def test_open_blob_reads_lazily(self):
+        self.storage.get_blob_metadata = lambda container, blob: {'size': 26}
+        reader = self.storage.open_blob('audio', 'a.mp3')
+        self.assertEqual(len(reader), 26)
+        self.assertEqual(reader.read(6), bytes(range(6)))
+        # only the chunks needed for the six bytes were fetched
+        self.assertEqual(self.blob.fetched, [CHUNK_SIZE, CHUNK_SIZE])
+        self.assertEqual(reader.read(), bytes(range(6, 26)))
+
+
+if __name__ == '__main__':
+    unittest.main()
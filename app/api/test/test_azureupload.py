@@ -0,0 +1,60 @@
+import io
+import base64
+import threading
+import unittest
+import requests
+from app.api.azureops.azureclass import AzureBlobStorage, BlobReader
+
+
+class FakeBlobClient:
+    def __init__(self):
+        self.staged = {}
+        self.committed = None
+        self.single = None
+        self.lock = threading.Lock()
+
+    def upload_blob(self, data, content_settings=None):
+        self.single = data
+
+    def stage_block(self, block_id, data):
+        with self.lock:
+            self.staged[block_id] = data
+
+    def commit_block_list(self, block_list, content_settings=None):
+        self.committed = b''.join(self.staged[block.id] for block in block_list)
+
+
+class TestChunkedUpload(unittest.TestCase):
+    def test_large_stream_is_staged_and_committed_in_order(self):
+        data = bytes(range(256)) * 100  # 25600 bytes
+        client = FakeBlobClient()
+        AzureBlobStorage._upload_stream(client, io.BytesIO(data), 1000, 4, None)
+        self.assertIsNone(client.single)
+        self.assertEqual(len(client.staged), 26)
+        self.assertEqual(len({len(base64.b64decode(block_id)) for block_id in client.staged}), 1)
+        self.assertEqual(client.committed, data)
+
+    def test_small_stream_uses_single_put(self):
+        client = FakeBlobClient()
+        AzureBlobStorage._upload_stream(client, io.BytesIO(b'abc'), 1000, 4, None)
+        self.assertEqual(client.single, b'abc')
+        self.assertEqual(client.staged, {})
+
+
+class TestBlobReader(unittest.TestCase):
+    def test_reads_across_chunk_boundaries(self):
+        reader = BlobReader(iter([b'abc', b'defg', b'h']), 8)
+        self.assertEqual(reader.read(2), b'ab')
+        self.assertEqual(reader.read(4), b'cdef')
+        self.assertEqual(reader.read(), b'gh')
+        self.assertEqual(reader.read(1), b'')
+
+    def test_request_body_has_content_length(self):
+        reader = BlobReader(iter([b'abc', b'def']), 6)
+        request = requests.Request('POST', 'http://localhost/', data=reader).prepare()
+        self.assertEqual(request.headers['Content-Length'], '6')
+        self.assertNotIn('Transfer-Encoding', request.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
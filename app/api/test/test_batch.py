@@ -0,0 +1,170 @@
+import unittest
+from unittest import mock
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+from app.models import db, User, Podcast, Episode, Favourite, Rating, Playlist, PlaylistItem
+from app.model_utils import Providers, Roles, Categories
+from app.api.favourite.favourite import favourite
+from app.api.rating.rating import rating
+from app.api.subscription.subscription import subscription
+from app.api.playlist_bridge.playlist_bridge import playlist_item_bp
+from app.api import batch
+
+
+class TestBatchWrites(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        login_manager = LoginManager(self.app)
+        self.signed_in = True
+        login_manager.request_loader(lambda request: db.session.get(User, self.user_id) if self.signed_in else None)
+        for blueprint in (favourite, rating, subscription, playlist_item_bp):
+            self.app.register_blueprint(blueprint)
+
+        with self.app.app_context():
+            db.create_all()
+            user = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                        profile_image_url='http://example.com/u.png', role=Roles.USER)
+            db.session.add(user)
+            db.session.flush()
+            podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                              publisher='Publisher', feed_url='http://example.com/feed', user_id=user.id)
+            db.session.add(podcast)
+            db.session.flush()
+            episodes = [Episode(title=f'Episode {index}', description='An episode', podcast_id=podcast.id,
+                                audio_url=f'http://example.com/{index}.mp3') for index in range(40)]
+            db.session.add_all(episodes)
+            playlist = Playlist(title='Playlist', user_id=user.id)
+            db.session.add(playlist)
+            db.session.flush()
+            playlist_items = [PlaylistItem(episode_id=episode.id) for episode in episodes[:3]]
+            db.session.add_all(playlist_items)
+            db.session.commit()
+            self.user_id, self.podcast_id, self.playlist_id = user.id, podcast.id, playlist.id
+            self.episode_ids = [episode.id for episode in episodes]
+            self.playlist_item_ids = [item.id for item in playlist_items]
+        self.client = self.app.test_client()
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [item['status'] for item in response.json['data']]
+
+    def test_favourites_batch(self):
+        items = [{'episode_id': self.episode_ids[0]}, {'episode_id': self.episode_ids[0]},
+                 {'episode_id': self.episode_ids[1], 'podcast_id': self.podcast_id}, {'episode_id': 999}, 'junk']
+        response = self.client.post('/api/v1/favourites/batch', json={'items': items})
+        self.assertEqual(self.statuses(response), ['created', 'duplicate', 'invalid', 'invalid', 'invalid'])
+        self.assertEqual(response.json['data'][0]['episode_id'], self.episode_ids[0])
+        self.assertEqual(response.json['data'][3]['error'], 'episode 999 not found')
+
+        response = self.client.post('/api/v1/favourites/batch', json=[{'episode_id': self.episode_ids[0]}])
+        self.assertEqual(self.statuses(response), ['unchanged'])
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Episode, self.episode_ids[0]).favourite_count, 1)
+
+    def test_podcast_targets_are_invalid_for_favourites_and_ratings(self):
+        items = [{'podcast_id': self.podcast_id}, {'episode_id': self.episode_ids[0]}]
+        response = self.client.post('/api/v1/favourites/batch', json=items)
+        self.assertEqual(self.statuses(response), ['invalid', 'created'])
+        self.assertEqual(response.json['data'][0]['error'], 'podcast_id is not supported here, give episode_id')
+        items = [{'podcast_id': self.podcast_id, 'rating': 3}, {'episode_id': self.episode_ids[0], 'rating': 3}]
+        self.assertEqual(self.statuses(self.client.post('/api/v1/ratings/batch', json=items)), ['invalid', 'created'])
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Favourite).count(), 1)
+            self.assertEqual(db.session.query(Rating).count(), 1)
+
+    def test_requires_authentication(self):
+        self.signed_in = False
+        for url, items in (('/api/v1/favourites/batch', [{'episode_id': self.episode_ids[0]}]),
+                           ('/api/v1/ratings/batch', [{'episode_id': self.episode_ids[0], 'rating': 3}]),
+                           ('/api/v1/subscriptions/batch', [{'podcast_id': self.podcast_id}]),
+                           (f'/api/v1/playlists/{self.playlist_id}/playlist_items/batch',
+                            [{'playlist_item_id': self.playlist_item_ids[0]}])):
+            response = self.client.post(url, json=items)
+            self.assertEqual(response.status_code, 403, url)
+            self.assertEqual(response.json['message'], 'User not authenticated')
+
+    def test_batch_is_one_insert_and_one_commit(self):
+        statements = []
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args:
+                         statements.append(statement.split()[0].upper() + ' ' + statement.split()[2]
+                                           if statement.startswith('INSERT') else statement.split()[0].upper()))
+        response = self.client.post('/api/v1/favourites/batch',
+                                    json={'items': [{'episode_id': episode_id} for episode_id in self.episode_ids]})
+        self.assertEqual(self.statuses(response), ['created'] * 40)
+        self.assertEqual(statements.count('INSERT favourite'), 1)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Favourite).count(), 40)
+
+    def test_ratings_batch_upserts(self):
+        items = [{'episode_id': self.episode_ids[0], 'rating': 4}, {'episode_id': self.episode_ids[1], 'rating': 9}]
+        self.assertEqual(self.statuses(self.client.post('/api/v1/ratings/batch', json=items)), ['created', 'invalid'])
+        items = [{'episode_id': self.episode_ids[0], 'rating': 2, 'review_text': 'Changed my mind'},
+                 {'episode_id': self.episode_ids[1], 'rating': 5}]
+        self.assertEqual(self.statuses(self.client.post('/api/v1/ratings/batch', json=items)), ['updated', 'created'])
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Rating, (self.user_id, self.episode_ids[0])).rating, 2)
+            episode = db.session.get(Episode, self.episode_ids[0])
+            self.assertEqual((episode.rating_count, episode.rating_sum), (1, 2))
+
+    def test_subscriptions_batch(self):
+        items = [{'podcast_id': self.podcast_id}, {'podcast_id': 999}, {'podcast_id': True}]
+        response = self.client.post('/api/v1/subscriptions/batch', json=items)
+        self.assertEqual(self.statuses(response), ['created', 'invalid', 'invalid'])
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Podcast, self.podcast_id).subscriber_count, 1)
+
+    def test_playlist_items_batch(self):
+        url = f'/api/v1/playlists/{self.playlist_id}/playlist_items/batch'
+        items = [{'playlist_item_id': item_id} for item_id in self.playlist_item_ids]
+        self.assertEqual(self.statuses(self.client.post(url, json=items)), ['created'] * 3)
+        self.assertEqual(self.statuses(self.client.post(url, json=items[:1])), ['unchanged'])
+        self.assertEqual(self.client.post('/api/v1/playlists/999/playlist_items/batch', json=items).status_code, 404)
+
+    def test_retries_after_concurrent_insert(self):
+        self.client.post('/api/v1/favourites/batch', json=[{'episode_id': self.episode_ids[0]}])
+        find_existing = batch._find_existing
+        lookups = []
+
+        def miss_first_lookup(session, model, keys):
+            # as if another request inserted the row between the lookup and the flush
+            lookups.append(keys)
+            return {} if len(lookups) == 1 else find_existing(session, model, keys)
+
+        items = [{'episode_id': self.episode_ids[0]}, {'episode_id': self.episode_ids[1]}]
+        with mock.patch.object(batch, '_find_existing', miss_first_lookup):
+            response = self.client.post('/api/v1/favourites/batch', json=items)
+        self.assertEqual(self.statuses(response), ['unchanged', 'created'])
+        self.assertEqual(len(lookups), 2)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Episode, self.episode_ids[0]).favourite_count, 1)
+            self.assertEqual(db.session.get(Episode, self.episode_ids[1]).favourite_count, 1)
+
+    def test_constraint_violation_fails_only_its_item(self):
+        lookups = []
+        find_existing = batch._find_existing
+
+        def count_lookups(session, model, keys):
+            lookups.append(keys)
+            return find_existing(session, model, keys)
+
+        entries = [({'user_id': self.user_id, 'episode_id': self.episode_ids[0]}, {'rating': 3}),
+                   ({'user_id': self.user_id, 'episode_id': self.episode_ids[1]}, {'rating': None}),
+                   ({'user_id': self.user_id, 'episode_id': self.episode_ids[2]}, {'rating': 5})]
+        with self.app.app_context(), mock.patch.object(batch, '_find_existing', count_lookups):
+            self.assertEqual(batch.upsert_batch(db.session, Rating, entries), ['created', 'failed', 'created'])
+            # a NOT NULL violation is not a race: no retry, straight to one savepoint per entry
+            self.assertEqual(len(lookups), 2)
+            # the rolled back savepoints leave what the other entries' flushes collected
+            self.assertIn(('ratings', f'user:{self.user_id}'), db.session.info['catalogue_invalidations'])
+            db.session.commit()
+            self.assertEqual(db.session.query(Rating).count(), 2)
+            self.assertEqual(db.session.get(Episode, self.episode_ids[0]).rating_count, 1)
+
+    def test_rejects_bad_bodies(self):
+        self.assertEqual(self.client.post('/api/v1/favourites/batch', json={'items': []}).status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/favourites/batch', json={'items': [{}] * 501}).status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/ratings/batch', data='nope').status_code, 400)
@@ -0,0 +1,106 @@
+import json
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import redis
+from app.api.azureops.blobmeta import BlobPropertiesCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.down = False
+
+    def get(self, key):
+        self.check()
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.check()
+        self.store[key] = value
+
+    def delete(self, key):
+        self.check()
+        self.store.pop(key, None)
+
+    def check(self):
+        if self.down:
+            raise redis.ConnectionError('redis unavailable')
+
+
+class FakeLoader:
+    """Returns BlobProperties-like dicts and counts how often Azure would be asked."""
+
+    def __init__(self, size=1024, content_type='audio/wav'):
+        self.size = size
+        self.content_type = content_type
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'size': self.size, 'etag': '"0x1"', 'content_settings': SimpleNamespace(content_type=self.content_type),
+                'last_modified': datetime(2024, 1, 1, tzinfo=timezone.utc)}
+
+
+class TestBlobPropertiesCache(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.cache = BlobPropertiesCache(self.redis, ttl=60, local_ttl=30)
+        self.loader = FakeLoader()
+
+    def get(self, cache=None):
+        return (cache or self.cache).get('audio', 'episode.mp3', self.loader)
+
+    def test_miss_loads_and_fills_both_levels(self):
+        metadata = self.get()
+        self.assertEqual(metadata, {'size': 1024, 'etag': '"0x1"', 'content_type': 'audio/wav',
+                                    'last_modified': '2024-01-01T00:00:00+00:00'})
+        self.assertEqual(self.loader.calls, 1)
+        key = BlobPropertiesCache.cache_key('audio', 'episode.mp3')
+        self.assertEqual(json.loads(self.redis.store[key]), metadata)
+
+    def test_hit_does_not_reload(self):
+        self.get()
+        self.assertEqual(self.get()['size'], 1024)
+        # another worker has an empty local cache but shares redis
+        self.assertEqual(self.get(BlobPropertiesCache(self.redis))['size'], 1024)
+        self.assertEqual(self.loader.calls, 1)
+
+    def test_invalidate_reloads(self):
+        self.get()
+        self.loader.size = 2048
+        self.cache.invalidate('audio', 'episode.mp3')
+        self.assertEqual(self.redis.store, {})
+        self.assertEqual(self.get()['size'], 2048)
+        self.assertEqual(self.loader.calls, 2)
+
+    def test_expired_local_entry_reads_redis(self):
+        cache = BlobPropertiesCache(self.redis, local_ttl=-1)
+        self.get(cache)
+        self.redis.store.clear()
+        self.get(cache)
+        self.assertEqual(self.loader.calls, 2)
+
+    def test_redis_down_falls_back_to_loader(self):
+        self.redis.down = True
+        self.assertEqual(self.get()['size'], 1024)
+        # the local level still saves the next request a trip to azure
+        self.assertEqual(self.get()['size'], 1024)
+        self.assertEqual(self.loader.calls, 1)
+        self.cache.invalidate('audio', 'episode.mp3')
+        self.assertEqual(self.get()['size'], 1024)
+        self.assertEqual(self.loader.calls, 2)
+
+    def test_local_level_is_bounded(self):
+        cache = BlobPropertiesCache(self.redis, local_size=2)
+        for blob_name in ('a.mp3', 'b.mp3', 'c.mp3'):
+            cache.get('audio', blob_name, self.loader)
+        self.assertEqual(list(cache._local), [cache.cache_key('audio', 'b.mp3'), cache.cache_key('audio', 'c.mp3')])
+
+    def test_missing_content_settings(self):
+        self.loader = lambda: {'size': 1, 'etag': None, 'content_settings': None, 'last_modified': None}
+        self.assertEqual(self.get(), {'size': 1, 'etag': None, 'content_type': None, 'last_modified': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
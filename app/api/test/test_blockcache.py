@@ -0,0 +1,69 @@
+import unittest
+from app.api.azureops.blockcache import BlobBlockCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+
+    def execute(self):
+        for key, value in self.commands:
+            self.redis_client.store[key] = value
+
+
+class FakeStorage:
+    def __init__(self, data):
+        self.data = data
+        self.requests = []
+
+    def stream_blob_chunks(self, container_name, blob_name, start_byte=None, end_byte=None):
+        self.requests.append((start_byte, end_byte))
+        yield self.data[start_byte:end_byte + 1]
+
+
+class TestBlobBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.data = bytes(range(256)) * 40  # 10240 bytes
+        self.redis = FakeRedis()
+        self.storage = FakeStorage(self.data)
+        self.cache = BlobBlockCache(self.redis, self.storage, block_size=1024, ttl=60)
+
+    def read(self, start, end):
+        return b''.join(self.cache.read_range('audio', 'episode.mp3', start, end, len(self.data)))
+
+    def test_range_is_stitched_from_blocks(self):
+        self.assertEqual(self.read(100, 3000), self.data[100:3001])
+        self.assertEqual(self.read(0, len(self.data) - 1), self.data)
+        self.assertEqual(self.read(10000, 10239), self.data[10000:])
+
+    def test_overlapping_ranges_share_blocks(self):
+        self.read(100, 3000)
+        requests_after_first = len(self.storage.requests)
+        self.assertEqual(self.read(500, 2900), self.data[500:2901])
+        self.assertEqual(len(self.storage.requests), requests_after_first)
+
+    def test_only_missing_blocks_are_fetched(self):
+        self.read(0, 1023)
+        self.read(3072, 4095)
+        self.storage.requests.clear()
+        self.assertEqual(self.read(0, 5119), self.data[:5120])
+        self.assertEqual(self.storage.requests, [(1024, 3071), (4096, 5119)])
+
+
+if __name__ == '__main__':
+    unittest.main()
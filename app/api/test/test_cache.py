@@ -0,0 +1,134 @@
+import time
+import unittest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.cache import ReadThroughCache
+from app.models import db, User, Podcast, Subscription
+from app.model_utils import Providers, Roles, Categories
+from app.api import catalogue
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+def requests(cache_name, result):
+    return REGISTRY.get_sample_value('shortcast_cache_requests_total', {'cache': cache_name, 'result': result}) or 0
+
+
+class TestReadThroughCache(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.cache = ReadThroughCache('test', self.redis, local_size=2)
+        self.loads = []
+
+    def loader(self, value):
+        def load():
+            self.loads.append(value)
+            return value
+        return load
+
+    def test_local_then_redis_then_loader(self):
+        before = {result: requests('test', result) for result in ('local', 'redis', 'miss')}
+        self.assertEqual(self.cache.get('podcast', 1, self.loader({'title': 'a'})), {'title': 'a'})
+        self.assertEqual(self.cache.get('podcast', 1, self.loader({'title': 'b'})), {'title': 'a'})
+        # a second worker shares redis but not the local level
+        other = ReadThroughCache('test', self.redis)
+        self.assertEqual(other.get('podcast', 1, self.loader({'title': 'c'})), {'title': 'a'})
+        self.assertEqual(self.loads, [{'title': 'a'}])
+        self.assertEqual(requests('test', 'miss') - before['miss'], 1)
+        self.assertEqual(requests('test', 'local') - before['local'], 1)
+        self.assertEqual(requests('test', 'redis') - before['redis'], 1)
+
+    def test_none_is_not_cached(self):
+        self.assertIsNone(self.cache.get('podcast', 404, self.loader(None)))
+        self.assertIsNone(self.cache.get('podcast', 404, self.loader(None)))
+        self.assertEqual(len(self.loads), 2)
+
+    def test_empty_list_is_cached(self):
+        self.cache.get('ratings', 'user:1', self.loader([]))
+        self.cache.clear_local()
+        self.assertEqual(self.cache.get('ratings', 'user:1', self.loader([1])), [])
+
+    def test_invalidate_clears_both_levels(self):
+        self.cache.get('podcast', 1, self.loader('old'))
+        self.cache.invalidate([('podcast', 1)])
+        self.assertEqual(self.cache.get('podcast', 1, self.loader('new')), 'new')
+
+    def test_local_level_is_bounded(self):
+        for key in range(3):
+            self.cache.get('podcast', key, self.loader(key))
+        self.assertEqual(len(self.cache._local), 2)
+
+    def test_local_entries_expire(self):
+        cache = ReadThroughCache('test', self.redis, local_ttl=0)
+        cache.get('podcast', 1, self.loader('a'))
+        self.redis.values.clear()
+        time.sleep(0.01)
+        self.assertEqual(cache.get('podcast', 1, self.loader('b')), 'b')
+
+
+class TestCatalogueInvalidation(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.redis_client = catalogue.catalogue_cache.redis_client
+        catalogue.catalogue_cache.redis_client = FakeRedis()
+        catalogue.catalogue_cache.clear_local()
+
+        self.user = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                         profile_image_url='http://example.com/u.png', role=Roles.USER)
+        self.session.add(self.user)
+        self.session.flush()
+        self.podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                               publisher='Publisher', feed_url='http://example.com/feed', user_id=self.user.id)
+        self.session.add(self.podcast)
+        self.session.commit()
+
+    def tearDown(self):
+        catalogue.catalogue_cache.redis_client = self.redis_client
+        catalogue.catalogue_cache.clear_local()
+        self.session.close()
+        self.engine.dispose()
+
+    def cached(self, namespace, key):
+        return catalogue.catalogue_cache.get(namespace, key, lambda: 'stale')
+
+    def test_commit_invalidates_changed_rows(self):
+        self.assertEqual(self.cached('podcast', self.podcast.id), 'stale')
+        self.assertEqual(self.cached('subscriptions', f'user:{self.user.id}'), 'stale')
+        self.assertEqual(self.cached('ratings', f'user:{self.user.id}'), 'stale')
+
+        self.session.add(Subscription(user_id=self.user.id, podcast_id=self.podcast.id))
+        self.session.commit()
+        self.assertIsNone(self.cached_or_none('podcast', self.podcast.id))
+        self.assertIsNone(self.cached_or_none('subscriptions', f'user:{self.user.id}'))
+        # untouched entries survive
+        self.assertEqual(self.cached('ratings', f'user:{self.user.id}'), 'stale')
+
+    def test_rollback_keeps_entries(self):
+        self.cached('podcast', self.podcast.id)
+        self.podcast.title = 'Renamed'
+        self.session.flush()
+        self.session.rollback()
+        self.assertEqual(self.cached('podcast', self.podcast.id), 'stale')
+
+    def cached_or_none(self, namespace, key):
+        return catalogue.catalogue_cache.get(namespace, key, lambda: None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime
+from flask import Flask
+from app.models import db, User, Podcast
+from app.model_utils import Providers, Roles, Categories
+from app.api.podcast.podcast import podcast
+from app.api.catalogue import catalogue_cache
+
+
+class TestConditionalGet(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        self.app.register_blueprint(podcast)
+        catalogue_cache.clear_local()
+
+        with self.app.app_context():
+            db.create_all()
+            owner = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                         profile_image_url='http://example.com/u.png', role=Roles.USER)
+            db.session.add(owner)
+            db.session.flush()
+            db.session.add_all([Podcast(title=f'Podcast {index}', description='A podcast', category=Categories.COMEDY,
+                                        publisher='Publisher', feed_url=f'http://example.com/{index}',
+                                        user_id=owner.id, updated_at=datetime(2025, 1, 1, 12, 0, 0))
+                                for index in range(3)])
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def touch(self, podcast_id, updated_at):
+        with self.app.app_context():
+            db.session.get(Podcast, podcast_id).updated_at = updated_at
+            db.session.commit()
+
+    def test_podcast_not_modified(self):
+        response = self.client.get('/api/v1/podcasts/1')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+        response = self.client.get('/api/v1/podcasts/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        self.touch(1, datetime(2025, 1, 2))
+        response = self.client.get('/api/v1/podcasts/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/v1/podcasts/2').headers['Last-Modified']
+        response = self.client.get('/api/v1/podcasts/2', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+        self.touch(2, datetime(2025, 1, 2))
+        response = self.client.get('/api/v1/podcasts/2', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_tracks_page_and_rows(self):
+        first = self.client.get('/api/v1/podcasts?limit=2')
+        etag = first.headers['ETag']
+        self.assertEqual(self.client.get('/api/v1/podcasts?limit=2', headers={'If-None-Match': etag}).status_code, 304)
+        # a different page has its own validator
+        self.assertEqual(self.client.get('/api/v1/podcasts?limit=1', headers={'If-None-Match': etag}).status_code, 200)
+
+        self.touch(3, datetime(2025, 1, 3))
+        self.assertEqual(self.client.get('/api/v1/podcasts?limit=2', headers={'If-None-Match': etag}).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+from app.models import db, User, Podcast, Episode, Subscription, Favourite, Rating, reconcile_counters
+from app.model_utils import Providers, Roles, Categories
+
+
+class TestCounters(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        self.users = []
+        for index in range(3):
+            user = User(oauth_provider=Providers.GITHUB, oauth_id=str(index), username=f'user{index}',
+                        profile_image_url='http://example.com/u.png', role=Roles.USER)
+            self.users.append(user)
+        self.session.add_all(self.users)
+        self.session.flush()
+        self.podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                               publisher='Publisher', feed_url='http://example.com/feed', user_id=self.users[0].id)
+        self.session.add(self.podcast)
+        self.session.flush()
+        self.episode = Episode(title='Episode', description='An episode', podcast_id=self.podcast.id,
+                               audio_url='http://example.com/1.mp3')
+        self.session.add(self.episode)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_counters_start_at_zero(self):
+        self.assertEqual(self.podcast.subscriber_count, 0)
+        self.assertEqual(self.episode.favourite_count, 0)
+        self.assertEqual(self.podcast.to_dict()['subscriptions'], 0)
+
+    def test_subscriptions_counted(self):
+        for user in self.users:
+            self.session.add(Subscription(user_id=user.id, podcast_id=self.podcast.id))
+        self.session.commit()
+        self.assertEqual(self.podcast.subscriber_count, 3)
+        self.assertEqual(self.podcast.to_dict()['subscriptions'], 3)
+
+        self.session.delete(self.session.get(Subscription, (self.users[0].id, self.podcast.id)))
+        self.session.commit()
+        self.assertEqual(self.podcast.subscriber_count, 2)
+
+    def test_favourites_counted(self):
+        for user in self.users[:2]:
+            self.session.add(Favourite(user_id=user.id, episode_id=self.episode.id))
+        self.session.flush()
+        # visible inside the transaction that added them
+        self.assertEqual(self.episode.favourite_count, 2)
+        self.session.commit()
+
+        self.session.delete(self.session.get(Favourite, (self.users[1].id, self.episode.id)))
+        self.session.commit()
+        self.assertEqual(self.episode.favourite_count, 1)
+
+    def test_rollback_discards_increment(self):
+        self.session.add(Favourite(user_id=self.users[0].id, episode_id=self.episode.id))
+        self.session.flush()
+        self.session.rollback()
+        self.assertEqual(self.episode.favourite_count, 0)
+
+    def test_ratings_summed(self):
+        self.session.add(Rating(user_id=self.users[0].id, episode_id=self.episode.id, rating=4))
+        self.session.add(Rating(user_id=self.users[1].id, episode_id=self.episode.id, rating=2))
+        self.session.commit()
+        self.assertEqual((self.episode.rating_count, self.episode.rating_sum), (2, 6))
+
+        rating = self.session.get(Rating, (self.users[1].id, self.episode.id))
+        rating.rating = 5
+        self.session.commit()
+        self.assertEqual((self.episode.rating_count, self.episode.rating_sum), (2, 9))
+
+        self.session.delete(rating)
+        self.session.commit()
+        self.assertEqual((self.episode.rating_count, self.episode.rating_sum), (1, 4))
+
+    def test_reconcile_repairs_bulk_changes(self):
+        for user in self.users:
+            self.session.add(Favourite(user_id=user.id, episode_id=self.episode.id))
+            self.session.add(Subscription(user_id=user.id, podcast_id=self.podcast.id))
+        self.session.commit()
+        # bulk deletes skip the flush events
+        self.session.execute(delete(Favourite).where(Favourite.user_id == self.users[0].id))
+        self.session.commit()
+        self.assertEqual(self.episode.favourite_count, 3)
+
+        self.assertEqual(reconcile_counters(self.session), 1)
+        self.session.commit()
+        self.assertEqual(self.episode.favourite_count, 2)
+        self.assertEqual(self.podcast.subscriber_count, 3)
+        self.assertEqual(reconcile_counters(self.session), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
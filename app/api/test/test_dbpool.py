@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app import dbpool
+from app.dbpool import InstrumentedQueuePool, engine_options, instrument_pool, replica_binds
+
+
+def sample(name, bind):
+    return REGISTRY.get_sample_value(name, {'bind': bind}) or 0
+
+
+class TestEngineOptions(unittest.TestCase):
+    def test_sqlite_keeps_its_pool(self):
+        self.assertEqual(engine_options('sqlite://'), {'pool_pre_ping': True})
+
+    def test_postgres_pool_settings(self):
+        with mock.patch.object(dbpool, 'DB_STATEMENT_TIMEOUT', 5000):
+            options = engine_options('postgresql://user@db/shortcast')
+        self.assertIs(options['poolclass'], InstrumentedQueuePool)
+        self.assertEqual(options['pool_size'], dbpool.DB_POOL_SIZE)
+        self.assertEqual(options['connect_args'], {'options': '-c statement_timeout=5000'})
+
+    def test_replica_binds(self):
+        binds = replica_binds(['postgresql://user@replica-a/shortcast', 'postgresql://user@replica-b/shortcast'])
+        self.assertEqual(sorted(binds), ['replica_0', 'replica_1'])
+        self.assertEqual(binds['replica_1']['url'], 'postgresql://user@replica-b/shortcast')
+        self.assertIs(binds['replica_0']['poolclass'], InstrumentedQueuePool)
+
+
+class TestPoolMetrics(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.engine = create_engine(f'sqlite:///{self.path}', poolclass=InstrumentedQueuePool, pool_size=1,
+                                    max_overflow=0, pool_timeout=0.05)
+        instrument_pool(self.engine, 'test')
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_checkouts_and_timeouts(self):
+        self.assertEqual(sample('shortcast_db_pool_capacity', 'test'), 1)
+        waits = sample('shortcast_db_pool_checkout_seconds_count', 'test')
+        timeouts = sample('shortcast_db_pool_timeouts_total', 'test')
+        connection = self.engine.connect()
+        self.assertEqual(sample('shortcast_db_pool_checked_out', 'test'), 1)
+        with self.assertRaises(PoolTimeoutError):
+            self.engine.connect()
+        connection.close()
+        self.assertEqual(sample('shortcast_db_pool_checked_out', 'test'), 0)
+        self.assertEqual(sample('shortcast_db_pool_checkout_seconds_count', 'test'), waits + 2)
+        self.assertEqual(sample('shortcast_db_pool_timeouts_total', 'test'), timeouts + 1)
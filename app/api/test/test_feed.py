@@ -0,0 +1,101 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models import db, User, Podcast, Episode, Favourite, Playlist, SharedPlaylist
+from app.model_utils import Providers, Roles, Categories
+from app.views.feed import load_home_feed
+
+
+class TestHomeFeed(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.count_statement)
+
+        owner = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                     profile_image_url='http://example.com/u.png', role=Roles.USER)
+        self.session.add(owner)
+        self.session.flush()
+        self.podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                               publisher='Publisher', feed_url='http://example.com/feed', user_id=owner.id)
+        self.session.add(self.podcast)
+        self.session.flush()
+        self.episodes = []
+        for index in range(10):
+            episode = Episode(title=f'Episode {index}', description='An episode', podcast_id=self.podcast.id,
+                              audio_url=f'http://example.com/{index}.mp3',
+                              publish_date=datetime(2025, 1, 1) + timedelta(days=index))
+            self.episodes.append(episode)
+        self.session.add_all(self.episodes)
+        self.session.commit()
+        self.episode_ids = [episode.id for episode in self.episodes]
+        self.users = 0
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def add_users(self, count):
+        """Each new user favourites the first few episodes and shares a playlist."""
+        for _ in range(count):
+            self.users += 1
+            user = User(oauth_provider=Providers.GITHUB, oauth_id=str(self.users), username=f'user{self.users}',
+                        profile_image_url='http://example.com/u.png', role=Roles.USER)
+            self.session.add(user)
+            self.session.flush()
+            for episode_id in self.episode_ids[:1 + self.users % 7]:
+                self.session.add(Favourite(user_id=user.id, episode_id=episode_id))
+            playlist = Playlist(user_id=user.id, title=f'Playlist {self.users}')
+            self.session.add(playlist)
+            self.session.flush()
+            self.session.add(SharedPlaylist(user_id=user.id, playlist_id=playlist.id))
+        self.session.commit()
+        self.session.expunge_all()
+
+    def queries_for_feed(self):
+        self.statements.clear()
+        feed = load_home_feed(self.session)
+        self.session.expunge_all()
+        return len(self.statements), feed
+
+    def test_query_count_is_constant(self):
+        self.add_users(3)
+        small_count, small_feed = self.queries_for_feed()
+        self.add_users(40)
+        large_count, large_feed = self.queries_for_feed()
+
+        self.assertEqual(small_count, 3)
+        self.assertEqual(large_count, small_count)
+        self.assertEqual(len(large_feed['shared_playlists']), 43)
+        self.assertTrue(all(item['playlist'] for item in large_feed['shared_playlists']))
+
+    def test_top_episodes_are_ordered_by_favourites(self):
+        self.add_users(14)
+        _, feed = self.queries_for_feed()
+        counts = [episode['count'] for episode in feed['top_episodes']]
+        self.assertEqual(len(counts), 5)
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertEqual(feed['top_episodes'][0]['episode_id'], self.episode_ids[0])
+        self.assertEqual(counts[0], 14)
+        self.assertEqual(feed['latest_episodes'][0]['title'], 'Episode 9')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestBeatSchedule(unittest.TestCase):
+    def test_schedule_loads_with_old_style_settings(self):
+        from flask import Flask
+        from celerysetup import make_celery
+        flask_app = Flask(__name__)
+        flask_app.config.update(CELERY_BROKER_URL='memory://', CELERY_RESULT_BACKEND='cache+memory://')
+        celery = make_celery(flask_app)
+        self.assertIn('refresh-home-feed', celery.conf.beat_schedule)
+        self.assertEqual(celery.conf.result_backend, 'cache+memory://')
@@ -0,0 +1,256 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models import db, User, Podcast, Episode, Favourite
+from app.model_utils import Providers, Roles, Categories
+from app.views import feed
+from app.views.feed import HomeFeedCache, FavouriteStateCache
+
+
+class FakeRedis:
+    """The subset of redis commands HomeFeedCache and FavouriteStateCache use."""
+
+    def __init__(self):
+        self.values = {}
+        self.zsets = {}
+        self.hashes = {}
+        self.sets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None, keepttl=False):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.zsets.pop(key, None)
+            self.hashes.pop(key, None)
+            self.sets.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update({str(member): score for member, score in mapping.items()})
+
+    def zincrby(self, key, amount, member):
+        zset = self.zsets.setdefault(key, {})
+        zset[str(member)] = zset.get(str(member), 0) + amount
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(str(member), None)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [member for member, score in zset.items() if score <= high]:
+            del zset[member]
+
+    def zrevrange(self, key, start, end, withscores=False):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+        return [(member, float(score)) for member, score in items[start:end + 1]]
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({str(field): value for field, value in mapping.items()})
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(str(field)) for field in fields]
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(str(field), None)
+
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(str(member) for member in members)
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(str(member) for member in members)
+
+    def smismember(self, key, members):
+        return [int(str(member) in self.sets.get(key, set())) for member in members]
+
+    def expire(self, key, seconds):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class TestHomeFeedCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.cache = HomeFeedCache(FakeRedis())
+        self.original_cache = feed.home_feed_cache
+        feed.home_feed_cache = self.cache
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+        self.users = []
+        for index in range(4):
+            user = User(oauth_provider=Providers.GITHUB, oauth_id=str(index), username=f'user{index}',
+                        profile_image_url='http://example.com/u.png', role=Roles.USER)
+            self.session.add(user)
+            self.session.flush()
+            self.users.append(user.id)
+        podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                          publisher='Publisher', feed_url='http://example.com/feed', user_id=self.users[0])
+        self.session.add(podcast)
+        self.session.flush()
+        self.podcast_id = podcast.id
+        self.episode_ids = [self.add_episode(index) for index in range(3)]
+        self.session.add(Favourite(user_id=self.users[0], episode_id=self.episode_ids[0]))
+        self.session.commit()
+
+    def tearDown(self):
+        feed.home_feed_cache = self.original_cache
+        self.session.close()
+        self.engine.dispose()
+
+    def add_episode(self, index):
+        episode = Episode(title=f'Episode {index}', description='An episode', podcast_id=self.podcast_id,
+                          audio_url=f'http://example.com/{index}.mp3',
+                          publish_date=datetime(2025, 1, 1) + timedelta(days=index))
+        self.session.add(episode)
+        self.session.flush()
+        return episode.id
+
+    def read_feed(self):
+        self.statements.clear()
+        home_feed = self.cache.get(self.session)
+        return len(self.statements), home_feed
+
+    def test_warm_cache_reads_without_queries(self):
+        cold_queries, cold_feed = self.read_feed()
+        self.assertGreater(cold_queries, 0)
+        warm_queries, warm_feed = self.read_feed()
+        self.assertEqual(warm_queries, 0)
+        self.assertEqual(warm_feed, cold_feed)
+
+    def test_committed_favourites_update_top_counts(self):
+        self.read_feed()
+        for user_id in self.users[1:]:
+            self.session.add(Favourite(user_id=user_id, episode_id=self.episode_ids[2]))
+        self.session.commit()
+
+        queries, home_feed = self.read_feed()
+        self.assertEqual(queries, 0)
+        self.assertEqual([(e['episode_id'], e['count']) for e in home_feed['top_episodes']],
+                         [(self.episode_ids[2], 3), (self.episode_ids[0], 1)])
+
+        favourite = self.session.get(Favourite, (self.users[0], self.episode_ids[0]))
+        self.session.delete(favourite)
+        self.session.commit()
+        _, home_feed = self.read_feed()
+        self.assertEqual([e['episode_id'] for e in home_feed['top_episodes']], [self.episode_ids[2]])
+
+    def test_rolled_back_favourites_are_ignored(self):
+        self.read_feed()
+        self.session.add(Favourite(user_id=self.users[1], episode_id=self.episode_ids[1]))
+        self.session.flush()
+        self.session.rollback()
+        _, home_feed = self.read_feed()
+        self.assertEqual([e['count'] for e in home_feed['top_episodes']], [1])
+
+    def test_new_episode_is_prepended_to_latest(self):
+        self.read_feed()
+        new_id = self.add_episode(10)
+        self.session.commit()
+        queries, home_feed = self.read_feed()
+        self.assertEqual(queries, 0)
+        self.assertEqual(home_feed['latest_episodes'][0]['episode_id'], new_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestFavouriteStateCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.redis = FakeRedis()
+        self.cache = FavouriteStateCache(self.redis)
+        self.original_cache = feed.favourite_state_cache
+        feed.favourite_state_cache = self.cache
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+        user = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                    profile_image_url='http://example.com/u.png', role=Roles.USER)
+        self.session.add(user)
+        self.session.flush()
+        self.user_id = user.id
+        podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                          publisher='Publisher', feed_url='http://example.com/feed', user_id=user.id)
+        self.session.add(podcast)
+        self.session.flush()
+        episodes = [Episode(title=f'Episode {index}', description='An episode', podcast_id=podcast.id,
+                            audio_url=f'http://example.com/{index}.mp3') for index in range(3)]
+        self.session.add_all(episodes)
+        self.session.flush()
+        self.episode_ids = [episode.id for episode in episodes]
+        self.session.add(Favourite(user_id=self.user_id, episode_id=self.episode_ids[0]))
+        self.session.commit()
+
+    def tearDown(self):
+        feed.favourite_state_cache = self.original_cache
+        self.session.close()
+        self.engine.dispose()
+
+    def read_state(self):
+        self.statements.clear()
+        state = self.cache.get(self.session, self.user_id, self.episode_ids)
+        return len(self.statements), state
+
+    def test_warm_set_answers_without_queries(self):
+        cold_queries, cold_state = self.read_state()
+        self.assertEqual(cold_queries, 1)
+        warm_queries, warm_state = self.read_state()
+        self.assertEqual(warm_queries, 0)
+        self.assertEqual(warm_state, {self.episode_ids[0]: True, self.episode_ids[1]: False,
+                                      self.episode_ids[2]: False})
+        self.assertEqual(warm_state, cold_state)
+
+    def test_committed_favourites_update_the_set(self):
+        self.read_state()
+        self.session.add(Favourite(user_id=self.user_id, episode_id=self.episode_ids[2]))
+        self.session.delete(self.session.get(Favourite, (self.user_id, self.episode_ids[0])))
+        self.session.commit()
+        queries, state = self.read_state()
+        self.assertEqual(queries, 0)
+        self.assertEqual([state[episode_id] for episode_id in self.episode_ids], [False, False, True])
+
+    def test_partial_set_is_reloaded(self):
+        # a favourite committed before the set was ever loaded must not be taken for the whole set
+        self.session.add(Favourite(user_id=self.user_id, episode_id=self.episode_ids[1]))
+        self.session.commit()
+        queries, state = self.read_state()
+        self.assertEqual(queries, 1)
+        self.assertEqual([state[episode_id] for episode_id in self.episode_ids], [True, True, False])
+
+    def test_rolled_back_favourites_are_ignored(self):
+        self.read_state()
+        self.session.add(Favourite(user_id=self.user_id, episode_id=self.episode_ids[1]))
+        self.session.flush()
+        self.session.rollback()
+        self.assertFalse(self.read_state()[1][self.episode_ids[1]])
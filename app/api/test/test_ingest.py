@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from flask_login import LoginManager
+from app.models import db, User, Podcast, Episode
+from app.model_utils import Providers, Roles, Categories
+from app.api.ingest.ingest import ingest
+from tasks import ingestservice
+
+
+class FakeTaskInfo:
+    """In-memory stand-in for TaskInfoSingleton."""
+
+    def __init__(self):
+        self.values = {}
+
+    def __call__(self):
+        return self
+
+    def get_value(self, key):
+        return self.values.get(key)
+
+    def set_value(self, key, value, ex=None):
+        self.values[key] = value
+
+    def set_task_info(self, task_id, task_name):
+        pass
+
+
+class TestIngestion(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        login_manager = LoginManager(self.app)
+        self.signed_in_as = None
+        login_manager.request_loader(lambda request: db.session.get(User, self.signed_in_as)
+                                     if self.signed_in_as else None)
+        self.app.register_blueprint(ingest)
+
+        with self.app.app_context():
+            db.create_all()
+            users = [User(oauth_provider=Providers.GITHUB, oauth_id=name, username=name,
+                          profile_image_url='http://example.com/u.png', role=Roles.USER) for name in ('owner', 'other')]
+            db.session.add_all(users)
+            db.session.flush()
+            podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                              publisher='Publisher', feed_url='http://example.com/feed', user_id=users[0].id)
+            db.session.add(podcast)
+            db.session.commit()
+            self.owner_id, self.other_id, self.podcast_id = users[0].id, users[1].id, podcast.id
+        self.client = self.app.test_client()
+
+        handle, self.audio_path = tempfile.mkstemp(suffix='.mp3')
+        os.close(handle)
+        self.addCleanup(lambda: os.path.exists(self.audio_path) and os.remove(self.audio_path))
+
+        self.task_info = FakeTaskInfo()
+        self.storage = mock.Mock()
+        self.storage.upload_blob.side_effect = lambda container, blob, path: f'https://blobs/{blob}'
+        self.transcribe = mock.Mock()
+        for patcher in (mock.patch.object(ingestservice, 'TaskInfoSingleton', self.task_info),
+                        mock.patch.object(ingestservice, 'probe_duration', return_value=42),
+                        mock.patch('app.app', self.app),
+                        mock.patch('app.api.azureops.azureapi.azure_storage_instance', self.storage),
+                        mock.patch('tasks.transcriptionservice.transcribe_episode', self.transcribe)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start(self):
+        ingestion_id = 'abc123'
+        ingestservice.set_ingestion_state(
+            ingestion_id, status='queued', user_id=self.owner_id, podcast_id=self.podcast_id, title='Episode',
+            description='An episode', publish_date='2024-01-01T00:00:00', audio_path=self.audio_path,
+            audio_blob='abc_episode.mp3')
+        return ingestion_id
+
+    def test_ingest_episode(self):
+        ingestion_id = self.start()
+        result = ingestservice.ingest_episode.apply(args=[ingestion_id]).get()
+        state = ingestservice.get_ingestion_state(ingestion_id)
+        self.assertEqual(state['status'], 'done')
+        self.assertEqual(result['episode_id'], state['episode_id'])
+        self.assertFalse(os.path.exists(self.audio_path))
+        self.transcribe.apply_async.assert_called_once()
+        with self.app.app_context():
+            episode = db.session.get(Episode, state['episode_id'])
+            self.assertEqual((episode.audio_url, episode.duration), ('https://blobs/abc_episode.mp3', 42))
+
+    def test_retry_after_commit_reuses_the_episode(self):
+        ingestion_id = self.start()
+        real_set_state = ingestservice.set_ingestion_state
+
+        def fail_recording_episode(ingestion_id, **fields):
+            # the row is committed, then the write that records it fails
+            if 'episode_id' in fields and not getattr(fail_recording_episode, 'failed', False):
+                fail_recording_episode.failed = True
+                raise ConnectionError('redis unavailable')
+            return real_set_state(ingestion_id, **fields)
+
+        with mock.patch.object(ingestservice, 'set_ingestion_state', fail_recording_episode):
+            ingestservice.ingest_episode.apply(args=[ingestion_id]).get()
+        self.assertEqual(ingestservice.get_ingestion_state(ingestion_id)['status'], 'done')
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Episode).count(), 1)
+
+    def test_failure_keeps_blobs_a_row_uses(self):
+        ingestion_id = self.start()
+        with self.app.app_context():
+            db.session.add(Episode(title='Episode', description='An episode', podcast_id=self.podcast_id,
+                                   audio_url='https://blobs/abc_episode.mp3'))
+            db.session.commit()
+        state = ingestservice.set_ingestion_state(ingestion_id, audio_url='https://blobs/abc_episode.mp3',
+                                                  image_url='https://blobs/abc_cover.png', image_blob='abc_cover.png')
+        ingestservice.fail_ingestion(ingestion_id, state, RuntimeError('boom'))
+        self.storage.delete_blob.assert_called_once_with(ingestservice.container_name, 'abc_cover.png')
+        self.assertEqual(ingestservice.get_ingestion_state(ingestion_id)['status'], 'failed')
+        self.assertFalse(os.path.exists(self.audio_path))
+
+    def test_status_endpoint(self):
+        ingestion_id = self.start()
+        url = f'/api/v1/ingestions/{ingestion_id}'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.signed_in_as = self.other_id
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.signed_in_as = self.owner_id
+        self.assertEqual(self.client.get('/api/v1/ingestions/missing').status_code, 404)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['data']['status'], 'queued')
+        self.assertEqual(response.json['data']['ingestion_id'], ingestion_id)
+        # spool paths and blob names stay internal
+        self.assertNotIn('audio_path', response.json['data'])
+        self.assertNotIn('audio_blob', response.json['data'])
@@ -0,0 +1,34 @@
+import unittest
+from unittest import mock
+from flask import Flask
+from app.api.metrics import metrics as metrics_module
+from app.api.metrics.metrics import metrics
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(metrics)
+        self.client = self.app.test_client()
+
+    def get(self, authorization=None):
+        headers = {'Authorization': authorization} if authorization else {}
+        return self.client.get('/metrics', headers=headers)
+
+    def test_disabled_without_token(self):
+        with mock.patch.object(metrics_module, 'METRICS_TOKEN', None):
+            self.assertEqual(self.get().status_code, 404)
+            self.assertEqual(self.get('Bearer anything').status_code, 404)
+
+    def test_requires_bearer_token(self):
+        with mock.patch.object(metrics_module, 'METRICS_TOKEN', 'scrape-secret'):
+            self.assertEqual(self.get().status_code, 403)
+            self.assertEqual(self.get('Bearer wrong').status_code, 403)
+            self.assertEqual(self.get('Basic scrape-secret').status_code, 403)
+            response = self.get('Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'shortcast_cache_requests', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import db, User, Podcast, Subscription
+from app.model_utils import Providers, Roles, Categories
+from app.api.pagination import CursorError, MAX_PAGE_LIMIT, encode_cursor, decode_cursor, page_params, paginate
+
+
+class TestKeysetPagination(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.users = [User(oauth_provider=Providers.GITHUB, oauth_id=str(index), username=f'user{index}',
+                           profile_image_url='http://example.com/u.png', role=Roles.USER) for index in range(4)]
+        self.session.add_all(self.users)
+        self.session.flush()
+        # several podcasts share a publish date, so the id tie-breaker matters
+        self.podcasts = [Podcast(title=f'Podcast {index}', description='A podcast', category=Categories.COMEDY,
+                                 publisher='Publisher', feed_url=f'http://example.com/{index}',
+                                 publish_date=datetime(2025, 1, 1 + index // 3), user_id=self.users[0].id)
+                         for index in range(11)]
+        self.session.add_all(self.podcasts)
+        self.session.flush()
+        for user in self.users:
+            for podcast in self.podcasts[:3]:
+                self.session.add(Subscription(user_id=user.id, podcast_id=podcast.id))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def walk(self, query, columns, limit, descending=False) -> list:
+        pages = []
+        after = None
+        while True:
+            items, after = paginate(query, columns, limit, after, descending=descending)
+            pages.append(items)
+            if after is None:
+                return pages
+
+    def test_pages_cover_every_row_once_in_order(self):
+        query = self.session.query(Podcast)
+        pages = self.walk(query, (Podcast.publish_date, Podcast.id), 4, descending=True)
+        self.assertEqual([len(page) for page in pages], [4, 4, 3])
+        seen = [podcast.id for page in pages for podcast in page]
+        expected = [podcast.id for podcast in
+                    sorted(self.podcasts, key=lambda podcast: (podcast.publish_date, podcast.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_composite_primary_key(self):
+        query = self.session.query(Subscription)
+        pages = self.walk(query, (Subscription.user_id, Subscription.podcast_id), 5)
+        keys = [(item.user_id, item.podcast_id) for page in pages for item in page]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), 12)
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        items, after = paginate(self.session.query(User), (User.id,), 4)
+        self.assertEqual(len(items), 4)
+        self.assertIsNone(after)
+
+    def test_cursor_round_trip(self):
+        values = [datetime(2025, 1, 2, 3, 4, 5), 7]
+        cursor = encode_cursor(values)
+        self.assertEqual(decode_cursor(cursor, (Podcast.publish_date, Podcast.id)), values)
+
+    def test_invalid_cursor(self):
+        columns = (Podcast.publish_date, Podcast.id)
+        for cursor in ('garbage!', encode_cursor([1]), encode_cursor(['not a date', 1]), ''):
+            with self.assertRaises(CursorError):
+                decode_cursor(cursor, columns)
+
+    def test_page_params(self):
+        app = Flask(__name__)
+        with app.test_request_context('/?limit=100000&after=abc'):
+            self.assertEqual(page_params(), (MAX_PAGE_LIMIT, 'abc'))
+        with app.test_request_context('/?limit=0'):
+            with self.assertRaises(CursorError):
+                page_params()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models import db, User, Podcast, Episode, Favourite, Playlist, PlaylistItem, PlaylistPlaylistitem
+from app.model_utils import Providers, Roles, Categories
+from app.api.playlistcontents import load_playlist_contents, playlist_contents_to_dict
+from app.search import LocalSearchBackend
+
+
+class TestPlaylistContents(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        self.user = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                         profile_image_url='http://example.com/u.png', role=Roles.USER)
+        self.session.add(self.user)
+        self.session.flush()
+        self.podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                               publisher='Publisher', feed_url='http://example.com/feed', user_id=self.user.id)
+        self.session.add(self.podcast)
+        self.session.flush()
+        self.episodes = [Episode(title=f'Episode {index}', description='An episode', podcast_id=self.podcast.id,
+                                 audio_url=f'http://example.com/{index}.mp3') for index in range(50)]
+        self.session.add_all(self.episodes)
+        self.playlist = Playlist(title='Playlist', user_id=self.user.id)
+        self.session.add(self.playlist)
+        self.session.flush()
+
+        items = [PlaylistItem(episode_id=episode.id) for episode in self.episodes]
+        items.append(PlaylistItem(podcast_id=self.podcast.id))
+        self.session.add_all(items)
+        self.session.flush()
+        self.session.add_all([PlaylistPlaylistitem(playlist_id=self.playlist.id, playlist_item_id=item.id)
+                              for item in items])
+        self.session.add_all([Favourite(user_id=self.user.id, episode_id=episode.id)
+                              for episode in self.episodes[::2]])
+        self.playlist_id, self.user_id, self.podcast_id = self.playlist.id, self.user.id, self.podcast.id
+        self.favourited_ids = {episode.id for episode in self.episodes[::2]}
+        self.session.commit()
+        self.session.expunge_all()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def count_queries(self):
+        statements = []
+        event.listen(self.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        return statements
+
+    def test_one_round_trip(self):
+        statements = self.count_queries()
+        contents = load_playlist_contents(self.session, self.playlist_id, self.user_id)
+        data = playlist_contents_to_dict(self.playlist_id, contents)
+        image_urls = [entry['episode'].podcast.image_url for entry in contents if entry['episode']]
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(data), 51)
+        self.assertEqual(len(image_urls), 50)
+        self.assertEqual(data[-1]['podcast']['podcast_id'], self.podcast_id)
+        self.assertIsNone(data[-1]['episode'])
+
+    def test_favourite_state(self):
+        contents = load_playlist_contents(self.session, self.playlist_id, self.user_id)
+        favourited = {entry['episode'].id for entry in contents if entry['favourited']}
+        self.assertEqual(favourited, self.favourited_ids)
+        anonymous = load_playlist_contents(self.session, self.playlist_id)
+        self.assertFalse(any(entry['favourited'] for entry in anonymous))
+
+    def test_title_filter(self):
+        where = LocalSearchBackend().similar(Episode.title, 'Episode 7')
+        contents = load_playlist_contents(self.session, self.playlist_id, self.user_id, where=where)
+        self.assertIn('Episode 7', [entry['episode'].title for entry in contents])
+        self.assertTrue(all(entry['episode'] for entry in contents))
@@ -0,0 +1,109 @@
+import unittest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from app.models import db, Podcast, Episode, Subscription, Favourite, Rating, Download, Playlist, SharedPlaylist, \
+    PlaylistPlaylistitem
+from app.views.feed import load_top_episodes, load_latest_episodes, load_shared_playlists
+
+
+class TestQueryPlans(unittest.TestCase):
+    """
+    Runs EXPLAIN QUERY PLAN over the statements behind the hot lookups and fails when one of them
+    falls back to a full table scan or sorts rows it could read in index order.
+    """
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.capture_statement)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def capture_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith('EXPLAIN'):
+            self.statements.append((statement, parameters))
+
+    def plans(self, run) -> list:
+        """Execute run() and return the query plan of every SELECT it issued."""
+        self.statements.clear()
+        run()
+        plans = []
+        with self.engine.connect() as connection:
+            for statement, parameters in list(self.statements):
+                rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+                plans.append([row[-1] for row in rows])
+        self.assertTrue(plans, 'no statement was executed')
+        return plans
+
+    def assertIndexed(self, run, index_name: str):
+        for plan in self.plans(run):
+            for step in plan:
+                # a bare "SCAN table" reads every row; "SCAN table USING INDEX" walks an index in order
+                self.assertFalse(step.startswith('SCAN') and 'INDEX' not in step, f'full scan in {plan}')
+                self.assertNotIn('TEMP B-TREE', step, f'sort not served by an index in {plan}')
+            self.assertTrue(any(index_name in step for step in plan), f'{index_name} not used in {plan}')
+
+    def test_episodes_of_podcast(self):
+        self.assertIndexed(lambda: self.session.scalars(
+            select(Episode).filter_by(podcast_id=1).order_by(Episode.publish_date.desc())).all(),
+                           'ix_episode_podcast_id_publish_date')
+
+    def test_latest_episodes(self):
+        self.assertIndexed(lambda: load_latest_episodes(self.session), 'ix_episode_publish_date')
+
+    def test_latest_podcasts(self):
+        self.assertIndexed(lambda: self.session.scalars(
+            select(Podcast).order_by(Podcast.publish_date.desc()).limit(10)).all(), 'ix_podcast_publish_date')
+
+    def test_podcasts_of_user(self):
+        self.assertIndexed(lambda: self.session.scalars(select(Podcast).filter_by(user_id=1)).all(),
+                           'ix_podcast_user_id')
+
+    def test_favourites_of_episode(self):
+        self.assertIndexed(lambda: self.session.scalars(select(Favourite).filter_by(episode_id=1)).all(),
+                           'ix_favourite_episode_id_user_id')
+
+    def test_favourites_of_podcast(self):
+        self.assertIndexed(lambda: self.session.scalars(select(Favourite).filter_by(podcast_id=1)).all(),
+                           'ix_favourite_podcast_id')
+
+    def test_ratings_of_podcast(self):
+        self.assertIndexed(lambda: self.session.scalars(select(Rating).filter_by(podcast_id=1)).all(),
+                           'ix_rating_podcast_id')
+
+    def test_subscribers_of_podcast(self):
+        self.assertIndexed(lambda: self.session.scalars(select(Subscription).filter_by(podcast_id=1)).all(),
+                           'ix_subscription_podcast_id_user_id')
+
+    def test_downloads_of_podcast(self):
+        self.assertIndexed(lambda: self.session.scalars(select(Download).filter_by(podcast_id=1)).all(),
+                           'ix_download_podcast_id')
+
+    def test_playlists_of_user(self):
+        self.assertIndexed(lambda: self.session.scalars(select(Playlist).filter_by(user_id=1)).all(),
+                           'ix_playlist_user_id')
+
+    def test_shares_of_playlist(self):
+        self.assertIndexed(lambda: self.session.scalars(select(SharedPlaylist).filter_by(playlist_id=1)).all(),
+                           'ix_shared_playlist_playlist_id')
+
+    def test_playlists_containing_item(self):
+        self.assertIndexed(lambda: self.session.scalars(
+            select(PlaylistPlaylistitem).filter_by(playlist_item_id=1)).all(),
+                           'ix_playlist_playlistitem_playlist_item_id')
+
+    def test_top_episodes(self):
+        self.assertIndexed(lambda: load_top_episodes(self.session), 'ix_episode_favourite_count')
+
+    def test_shared_playlists_join(self):
+        # every share is listed, but each one finds its playlist by primary key
+        plan = self.plans(lambda: load_shared_playlists(self.session))[0]
+        self.assertTrue(any(step.startswith('SEARCH playlist') and 'PRIMARY KEY' in step for step in plan), plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
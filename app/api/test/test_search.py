@@ -0,0 +1,93 @@
+import unittest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app import search
+from app.models import db, User, Podcast, Episode
+from app.model_utils import Providers, Roles, Categories
+
+
+class TestLocalSearch(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.previous_backend = search._backend
+        search._backend = self.backend = search.LocalSearchBackend()
+
+        owner = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                     profile_image_url='http://example.com/u.png', role=Roles.USER)
+        self.session.add(owner)
+        self.session.flush()
+        self.podcast = Podcast(title='Space Hour', description='Rockets, orbits and telescopes',
+                               category=Categories.COMEDY, publisher='Publisher', feed_url='http://example.com/feed',
+                               user_id=owner.id)
+        self.session.add(self.podcast)
+        self.session.flush()
+        self.episodes = [
+            Episode(title='Telescopes', description='How mirrors are ground', podcast_id=self.podcast.id,
+                    audio_url='http://example.com/1.mp3'),
+            Episode(title='Gardening', description='Soil and seeds', podcast_id=self.podcast.id,
+                    audio_url='http://example.com/2.mp3'),
+        ]
+        self.session.add_all(self.episodes)
+        self.session.commit()
+
+    def tearDown(self):
+        search._backend = self.previous_backend
+        self.session.close()
+        self.engine.dispose()
+
+    def test_title_outranks_description(self):
+        results = search.search(self.session, 'telescopes')
+        self.assertEqual([(result['type'], result['id']) for result in results],
+                         [('episode', self.episodes[0].id), ('podcast', self.podcast.id)])
+        self.assertIn('<b>telescopes</b>', results[1]['highlight'])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(search.search(self.session, 'soil seeds', kinds=('episode',))[0]['id'], self.episodes[1].id)
+        self.assertEqual(search.search(self.session, 'soil telescopes'), [])
+
+    def test_transcription_indexed_on_commit(self):
+        search.search(self.session, 'anything')
+        self.episodes[1].transcription = 'Today we talk about compost heaps'
+        self.session.commit()
+        results = search.search(self.session, 'compost', kinds=('episode',))
+        self.assertEqual([result['id'] for result in results], [self.episodes[1].id])
+        self.assertIn('<b>compost</b>', results[0]['highlight'])
+
+    def test_deleted_rows_removed(self):
+        search.search(self.session, 'anything')
+        self.session.delete(self.episodes[0])
+        self.session.commit()
+        self.assertEqual([result['type'] for result in search.search(self.session, 'telescopes')], ['podcast'])
+
+
+class TestTrigramSimilarity(unittest.TestCase):
+    def test_matches_pg_trgm(self):
+        # values from SELECT similarity(...) on Postgres
+        self.assertEqual(search.trigrams('cat'), {'  c', ' ca', 'cat', 'at '})
+        self.assertAlmostEqual(search.trigram_similarity('word', 'two words'), 4 / 11)
+        self.assertEqual(search.trigram_similarity('Space Hour', 'space hour'), 1.0)
+        self.assertEqual(search.trigram_similarity('', 'anything'), 0.0)
+
+    def test_similar_filters_rows(self):
+        engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        owner = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                     profile_image_url='http://example.com/u.png', role=Roles.USER)
+        session.add(owner)
+        session.flush()
+        podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                          publisher='Publisher', feed_url='http://example.com/feed', user_id=owner.id)
+        session.add(podcast)
+        session.flush()
+        session.add_all([Episode(title=title, description='An episode', podcast_id=podcast.id,
+                                 audio_url=f'http://example.com/{index}.mp3')
+                         for index, title in enumerate(['Telescope Mirrors', 'Telescopes', 'Gardening', 'Mirrors Lenses Telescope'])])
+        session.commit()
+        clause = search.LocalSearchBackend().similar(Episode.title, 'telescope')
+        matches = session.scalars(select(Episode).where(clause).order_by(Episode.id)).all()
+        self.assertEqual([episode.title for episode in matches], ['Telescope Mirrors', 'Telescopes'])
+        session.close()
+        engine.dispose()
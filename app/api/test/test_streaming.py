@@ -0,0 +1,64 @@
+import json
+import unittest
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import event, select
+from app.models import db, User, Podcast
+from app.model_utils import Providers, Roles, Categories
+from app.api.streaming import NDJSON_MIMETYPE, ndjson_response, wants_ndjson
+
+
+class TestNdjsonStreaming(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+
+        @self.app.get('/podcasts')
+        def podcasts():
+            if wants_ndjson():
+                return ndjson_response(select(Podcast).order_by(Podcast.id), batch_size=3)
+            return 'json'
+
+        with self.app.app_context():
+            db.create_all()
+            owner = User(oauth_provider=Providers.GITHUB, oauth_id='owner', username='owner',
+                         profile_image_url='http://example.com/u.png', role=Roles.USER)
+            db.session.add(owner)
+            db.session.flush()
+            db.session.add_all([Podcast(title=f'Podcast {index}', description='A podcast', category=Categories.COMEDY,
+                                        publisher='Publisher', feed_url=f'http://example.com/{index}',
+                                        publish_date=datetime(2025, 1, 1), user_id=owner.id)
+                                for index in range(10)])
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def test_stream_parameter(self):
+        response = self.client.get('/podcasts?stream=1')
+        self.assertEqual(response.mimetype, NDJSON_MIMETYPE)
+        self.assertTrue(response.is_streamed)
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], [f'Podcast {index}' for index in range(10)])
+
+    def test_accept_header(self):
+        response = self.client.get('/podcasts', headers={'Accept': NDJSON_MIMETYPE})
+        self.assertEqual(response.mimetype, NDJSON_MIMETYPE)
+        self.assertEqual(self.client.get('/podcasts', headers={'Accept': '*/*'}).get_data(as_text=True), 'json')
+        self.assertEqual(self.client.get('/podcasts').get_data(as_text=True), 'json')
+
+    def test_streams_one_query_lazily(self):
+        fetches = []
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args: fetches.append(statement))
+        response = self.client.get('/podcasts?stream=1')
+        iterator = iter(response.response)
+        first = next(iterator)
+        # the first line is written before the rest of the table is serialized
+        self.assertEqual(json.loads(first)['title'], 'Podcast 0')
+        self.assertEqual(len(list(iterator)), 9)
+        self.assertEqual(len(fetches), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import io
+import json
+import wave
+import struct
+import threading
+import unittest
+from unittest import mock
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from celery.app.task import Task
+from celery.canvas import _chord
+from tasks import transcriptionservice
+from tasks.transcriptionservice import plan_segments, transcribe_window, stitch_segments
+from tasks.transcriptionbackends import HttpTranscriptionBackend
+from tasks.audioutils import mp3_second_marks
+
+SAMPLE_RATE = 8000
+MP3_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413  # 128 kbps, 44.1 kHz, 1152 samples
+
+
+class FakeStorage:
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def get_blob_metadata(self, container_name, blob_name):
+        return {'size': len(self.blobs[blob_name])}
+
+    def stream_blob_chunks(self, container_name, blob_name, start_byte=None, end_byte=None):
+        data = self.blobs[blob_name]
+        start = start_byte or 0
+        end = len(data) - 1 if end_byte is None else end_byte
+        for offset in range(start, end + 1, 4096):
+            yield data[offset:min(offset + 4096, end + 1)]
+
+
+class WordPerSecondHandler(BaseHTTPRequestHandler):
+    """Stand-in inference server: each second of audio holds one sample value, transcribed as 'w<value>'."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with wave.open(io.BytesIO(body), 'rb') as f:
+            frames = f.readframes(f.getnframes())
+        samples = struct.unpack(f'<{len(frames) // 2}h', frames)
+        words = [f"w{samples[i]}" for i in range(0, len(samples), SAMPLE_RATE)]
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(json.dumps({'text': ' '.join(words)}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def make_wav(seconds):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        for second in range(seconds):
+            f.writeframes(struct.pack('<h', second) * SAMPLE_RATE)
+    return buffer.getvalue()
+
+
+class TestSegmentedTranscription(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), WordPerSecondHandler)
+        cls.backend = HttpTranscriptionBackend(f"http://127.0.0.1:{cls.server.server_port}/", token='test')
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def test_wav_windows_are_transcribed_and_stitched(self):
+        storage = FakeStorage({'audio/episode.wav': make_wav(75)})
+        source = {'container': 'audio', 'blob': 'audio/episode.wav'}
+        windows = plan_segments(storage, source, window=30, overlap=2)
+        self.assertEqual([(w['start'], w['end']) for w in windows], [(0, 30), (28, 58), (56, 75)])
+
+        results = [transcribe_window(storage, source, window, self.backend) for window in reversed(windows)]
+        stitched = stitch_segments(results)
+        self.assertEqual(stitched['text'], ' '.join(f"w{second}" for second in range(75)))
+        self.assertEqual(stitched['segments'][1]['start'], 28)
+        self.assertTrue(stitched['segments'][1]['text'].startswith('w30 '))
+
+    def test_mp3_windows_fall_on_frame_boundaries(self):
+        data = b'ID3\x03\x00\x00\x00\x00\x00\x10' + b'\x00' * 16 + MP3_FRAME * 2000  # ~52 s
+        storage = FakeStorage({'audio/episode.mp3': data})
+        windows = plan_segments(storage, {'container': 'audio', 'blob': 'audio/episode.mp3'}, window=30, overlap=2)
+        self.assertEqual(len(windows), 2)
+        for window in windows:
+            self.assertEqual((window['start_byte'] - 26) % len(MP3_FRAME), 0)
+            self.assertEqual((window['end_byte'] + 1 - 26) % len(MP3_FRAME), 0)
+        self.assertEqual(windows[-1]['end_byte'], len(data) - 1)
+        self.assertLess(windows[1]['start_byte'], windows[0]['end_byte'])
+
+    def test_marks_survive_frames_split_across_chunks(self):
+        data = MP3_FRAME * 100
+        chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+        marks, end_offset, duration = mp3_second_marks(chunks)
+        self.assertEqual(end_offset, len(data))
+        self.assertAlmostEqual(duration, 100 * 1152 / 44100)
+        self.assertEqual(marks[0], 0)
+        self.assertEqual(marks[1], 39 * len(MP3_FRAME))
+
+    def test_unsplittable_formats_are_not_planned(self):
+        storage = FakeStorage({'audio/episode.ogg': b'OggS' + b'\x00' * 100})
+        self.assertEqual(plan_segments(storage, {'container': 'audio', 'blob': 'audio/episode.ogg'}), [])
+
+
+class TestTranscriptionDispatch(unittest.TestCase):
+    def dispatch(self, windows):
+        """Run transcribe_episode, returning the registered and dispatched task ids in call order."""
+        calls = []
+
+        def run_chord(chord_, header, body, partial_args, **options):
+            calls.append(('dispatch', body.freeze(options.get('task_id')).id))
+
+        def apply_async(task, args=None, kwargs=None, task_id=None, **options):
+            calls.append(('dispatch', task_id))
+
+        task_info = mock.Mock()
+        task_info.set_task_info.side_effect = lambda task_id, name: calls.append(('register', task_id))
+        with mock.patch.object(transcriptionservice, 'plan_segments', return_value=windows), \
+                mock.patch.object(transcriptionservice, 'TaskInfoSingleton', return_value=task_info), \
+                mock.patch.object(_chord, 'run', run_chord), mock.patch.object(Task, 'apply_async', apply_async), \
+                mock.patch('app.api.azureops.azureapi.azure_storage_instance'):
+            transcriptionservice.transcribe_episode.run({'container': 'audio', 'blob': 'a.wav'}, 7)
+        return calls
+
+    def test_id_is_registered_before_dispatch(self):
+        # the success handler ignores a task whose id is not registered yet
+        for windows in ([{'index': 0}, {'index': 1}], []):
+            calls = self.dispatch(windows)
+            self.assertEqual([action for action, _ in calls], ['register', 'dispatch'])
+            self.assertEqual(calls[0][1], calls[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
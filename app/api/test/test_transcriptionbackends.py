@@ -0,0 +1,63 @@
+import threading
+import unittest
+from unittest import mock
+from tasks import transcriptionbackends
+from tasks.transcriptionbackends import BatchingTranscriber, TranscriptionBackend, TranscriptionError, retry_countdown
+
+
+class RecordingBackend(TranscriptionBackend):
+    def __init__(self):
+        self.batches = []
+
+    def transcribe(self, audio):
+        return self.transcribe_batch([audio])[0]
+
+    def transcribe_batch(self, audios):
+        self.batches.append(list(audios))
+        if b'fail' in audios:
+            raise TranscriptionError('model failed')
+        return [{'text': audio.decode()} for audio in audios]
+
+
+class TestBatchingTranscriber(unittest.TestCase):
+    def run_concurrently(self, transcriber, audios):
+        results = {}
+
+        def worker(audio):
+            try:
+                results[audio] = transcriber.transcribe(audio)
+            except TranscriptionError as e:
+                results[audio] = e
+
+        threads = [threading.Thread(target=worker, args=(audio,)) for audio in audios]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        return results
+
+    def test_concurrent_requests_share_one_batch(self):
+        backend = RecordingBackend()
+        transcriber = BatchingTranscriber(backend, batch_size=4, max_wait=2)
+        results = self.run_concurrently(transcriber, [b'a', b'b', b'c', b'd'])
+        self.assertEqual(len(backend.batches), 1)
+        self.assertEqual({audio: result['text'] for audio, result in results.items()},
+                         {b'a': 'a', b'b': 'b', b'c': 'c', b'd': 'd'})
+
+    def test_batch_failure_reaches_every_caller(self):
+        backend = RecordingBackend()
+        transcriber = BatchingTranscriber(backend, batch_size=2, max_wait=2)
+        results = self.run_concurrently(transcriber, [b'ok', b'fail'])
+        self.assertTrue(all(isinstance(result, TranscriptionError) for result in results.values()))
+
+
+class TestRetryCountdown(unittest.TestCase):
+    def test_backoff_grows_and_is_capped(self):
+        with mock.patch.object(transcriptionbackends, 'TRANSCRIBE_RETRY_BASE', 10), \
+                mock.patch.object(transcriptionbackends, 'TRANSCRIBE_RETRY_MAX', 100):
+            for retries, (low, high) in enumerate([(5, 10), (10, 20), (20, 40), (40, 80), (50, 100), (50, 100)]):
+                self.assertTrue(low <= retry_countdown(retries) <= high)
+
+
+if __name__ == '__main__':
+    unittest.main()
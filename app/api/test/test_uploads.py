@@ -0,0 +1,258 @@
+import json
+import unittest
+from unittest import mock
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+
+import redis
+from azure.core.exceptions import ResourceNotFoundError
+from flask import Flask
+from flask_login import LoginManager
+from app.models import db, User, Podcast, Episode
+from app.model_utils import Providers, Roles, Categories
+from app.api.azureops.azureclass import AzureBlobStorage, UPLOAD_SAS_TTL
+from app.api.uploads import uploads as uploads_module
+from app.api.uploads.uploads import (uploads, session_key, finalized_key, start_transcription, UPLOAD_MAX_SIZE,
+                                     UPLOAD_SESSION_TTL)
+
+CONNECTION_STRING = ('DefaultEndpointsProtocol=https;AccountName=devacct;AccountKey=ZGV2a2V5;'
+                     'EndpointSuffix=core.windows.net')
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+
+class TestUploadSas(unittest.TestCase):
+    def test_sas_only_allows_writing_the_one_blob(self):
+        storage = AzureBlobStorage(CONNECTION_STRING)
+        url = urlparse(storage.generate_upload_sas('audio', 'audio/abc_episode.mp3', ttl=60))
+        self.assertEqual(url.netloc, 'devacct.blob.core.windows.net')
+        self.assertEqual(url.path, '/audio/audio/abc_episode.mp3')
+        query = parse_qs(url.query)
+        self.assertEqual(query['sr'], ['b'])
+        self.assertEqual(query['sp'], ['cw'])
+        self.assertIn('sig', query)
+        expiry = datetime.strptime(query['se'][0], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+        self.assertLessEqual((expiry - datetime.now(timezone.utc)).total_seconds(), 60)
+
+
+class TestDirectUploads(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        login_manager = LoginManager(self.app)
+        self.signed_in_as = None
+        login_manager.request_loader(lambda request: db.session.get(User, self.signed_in_as)
+                                     if self.signed_in_as else None)
+        self.app.register_blueprint(uploads)
+
+        with self.app.app_context():
+            db.create_all()
+            users = [User(oauth_provider=Providers.GITHUB, oauth_id=name, username=name,
+                          profile_image_url='http://example.com/u.png', role=Roles.USER) for name in ('owner', 'other')]
+            db.session.add_all(users)
+            db.session.flush()
+            podcast = Podcast(title='Podcast', description='A podcast', category=Categories.COMEDY,
+                              publisher='Publisher', feed_url='http://example.com/feed', user_id=users[0].id)
+            db.session.add(podcast)
+            db.session.commit()
+            self.owner_id, self.other_id, self.podcast_id = users[0].id, users[1].id, podcast.id
+        self.client = self.app.test_client()
+
+        self.redis = FakeRedis()
+        self.storage = mock.Mock()
+        self.storage.generate_upload_sas.side_effect = lambda container, blob: f'https://blobs/{blob}?sig=x'
+        self.storage.get_blob_properties.return_value = mock.Mock(size=1024)
+        self.storage.get_blob_client.side_effect = lambda container, blob: mock.Mock(url=f'https://blobs/{blob}')
+        self.start_transcription = mock.Mock()
+        for patcher in (mock.patch.object(uploads_module, 'redis_client', self.redis),
+                        mock.patch.object(uploads_module, 'azure_storage_instance', self.storage),
+                        mock.patch.object(uploads_module, 'start_transcription', self.start_transcription)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def create_session(self, **fields):
+        body = dict({'podcast_id': self.podcast_id, 'filename': 'My Episode.mp3', 'size': 1024}, **fields)
+        return self.client.post('/api/v1/uploads', json=body)
+
+    def finalize(self, upload_id, **fields):
+        body = dict({'title': 'Episode', 'description': 'An episode'}, **fields)
+        return self.client.post(f'/api/v1/uploads/{upload_id}/finalize', json=body)
+
+    def test_create_session(self):
+        self.signed_in_as = self.owner_id
+        response = self.create_session()
+        self.assertEqual(response.status_code, 201)
+        data = response.json['data']
+        self.assertEqual(data['blob_name'], f"audio/{data['upload_id']}_My_Episode.mp3")
+        self.assertEqual(data['upload_url'], f"https://blobs/{data['blob_name']}?sig=x")
+        self.assertEqual(data['expires_in'], UPLOAD_SAS_TTL)
+        self.assertEqual(data['headers'], {'x-ms-blob-type': 'BlockBlob'})
+        key = session_key(data['upload_id'])
+        self.assertEqual(json.loads(self.redis.values[key]), {'user_id': self.owner_id, 'podcast_id': self.podcast_id,
+                                                              'blob_name': data['blob_name'], 'size': 1024})
+        self.assertEqual(self.redis.ttls[key], UPLOAD_SESSION_TTL)
+
+    def test_create_session_rejects(self):
+        self.assertEqual(self.create_session().status_code, 403)
+        self.signed_in_as = self.owner_id
+        self.assertEqual(self.create_session(filename='notes.txt').status_code, 400)
+        self.assertEqual(self.create_session(filename='').status_code, 400)
+        for size in (0, UPLOAD_MAX_SIZE + 1, '1024', None):
+            self.assertEqual(self.create_session(size=size).status_code, 400, size)
+        self.assertEqual(self.create_session(podcast_id=999).status_code, 403)
+        self.signed_in_as = self.other_id
+        self.assertEqual(self.create_session().status_code, 403)
+        self.assertEqual(self.redis.values, {})
+        self.storage.generate_upload_sas.assert_not_called()
+
+    def test_create_session_storage_failure(self):
+        self.signed_in_as = self.owner_id
+        self.storage.generate_upload_sas.side_effect = RuntimeError('no credential')
+        self.assertEqual(self.create_session().status_code, 500)
+        self.assertEqual(self.redis.values, {})
+
+    def test_finalize_creates_episode(self):
+        self.signed_in_as = self.owner_id
+        data = self.create_session().json['data']
+        response = self.finalize(data['upload_id'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['data']['audio_url'], f"https://blobs/{data['blob_name']}")
+        self.assertNotIn(session_key(data['upload_id']), self.redis.values)
+        with self.app.app_context():
+            episode = db.session.scalar(db.select(Episode))
+            self.assertEqual((episode.title, episode.podcast_id), ('Episode', self.podcast_id))
+            self.start_transcription.assert_called_once_with(data['blob_name'], episode.id)
+        # a retried finalize gets the episode back instead of creating a duplicate
+        retry = self.finalize(data['upload_id'])
+        self.assertEqual(retry.status_code, 409)
+        self.assertEqual(retry.json['data']['episode_id'], response.json['data']['episode_id'])
+        self.signed_in_as = self.other_id
+        self.assertEqual(self.finalize(data['upload_id']).status_code, 404)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Episode).count(), 1)
+        self.start_transcription.assert_called_once()
+
+    def test_concurrent_finalize_creates_one_episode(self):
+        self.signed_in_as = self.owner_id
+        upload_id = self.create_session().json['data']['upload_id']
+        real_get = self.redis.get
+
+        def get_then_lose_the_race(key):
+            value = real_get(key)
+            if key == session_key(upload_id):
+                # the other request claims the session between our read and our claim
+                self.redis.delete(key)
+            return value
+
+        with mock.patch.object(self.redis, 'get', get_then_lose_the_race):
+            response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 409)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Episode).count(), 0)
+        self.start_transcription.assert_not_called()
+
+    def test_finalize_episode_already_uses_blob(self):
+        self.signed_in_as = self.owner_id
+        data = self.create_session().json['data']
+        with self.app.app_context():
+            db.session.add(Episode(title='Episode', description='An episode', podcast_id=self.podcast_id,
+                                   audio_url=f"https://blobs/{data['blob_name']}"))
+            db.session.commit()
+        self.assertEqual(self.finalize(data['upload_id']).status_code, 409)
+        self.start_transcription.assert_not_called()
+
+    def test_finalize_failure_restores_session(self):
+        self.signed_in_as = self.owner_id
+        upload_id = self.create_session().json['data']['upload_id']
+        saved = self.redis.values[session_key(upload_id)]
+        with mock.patch.object(db.session, 'commit', side_effect=RuntimeError('database down')):
+            self.assertEqual(self.finalize(upload_id).status_code, 500)
+        self.assertEqual(self.redis.values[session_key(upload_id)], saved)
+        self.assertNotIn(finalized_key(upload_id), self.redis.values)
+        self.assertEqual(self.finalize(upload_id).status_code, 201)
+
+    def test_finalize_rejects(self):
+        self.signed_in_as = self.owner_id
+        upload_id = self.create_session().json['data']['upload_id']
+        self.signed_in_as = None
+        self.assertEqual(self.finalize(upload_id).status_code, 403)
+        self.signed_in_as = self.other_id
+        self.assertEqual(self.finalize(upload_id).status_code, 403)
+        self.signed_in_as = self.owner_id
+        self.assertEqual(self.finalize(upload_id, title='').status_code, 400)
+        self.assertEqual(self.finalize('missing').status_code, 404)
+        # the session survives every rejection above
+        self.assertIn(session_key(upload_id), self.redis.values)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Episode).count(), 0)
+
+    def test_finalize_before_upload(self):
+        self.signed_in_as = self.owner_id
+        upload_id = self.create_session().json['data']['upload_id']
+        self.storage.get_blob_properties.side_effect = ResourceNotFoundError('no blob')
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['message'], 'audio file not uploaded')
+        # the client may still upload and finalize again
+        self.assertIn(session_key(upload_id), self.redis.values)
+
+    def test_finalize_oversized_blob_is_deleted(self):
+        self.signed_in_as = self.owner_id
+        data = self.create_session().json['data']
+        self.storage.get_blob_properties.return_value = mock.Mock(size=UPLOAD_MAX_SIZE + 1)
+        self.assertEqual(self.finalize(data['upload_id']).status_code, 400)
+        self.storage.delete_blob.assert_called_once_with(uploads_module.container_name, data['blob_name'])
+        self.assertNotIn(session_key(data['upload_id']), self.redis.values)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Episode).count(), 0)
+
+    def test_finalize_size_mismatch(self):
+        self.signed_in_as = self.owner_id
+        data = self.create_session().json['data']
+        self.storage.get_blob_properties.return_value = mock.Mock(size=2048)
+        response = self.finalize(data['upload_id'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['message'], 'uploaded file size does not match the declared size')
+        self.storage.delete_blob.assert_called_once_with(uploads_module.container_name, data['blob_name'])
+        # the client may upload the declared file again
+        self.assertIn(session_key(data['upload_id']), self.redis.values)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Episode).count(), 0)
+
+    def test_finalize_redis_failure(self):
+        self.signed_in_as = self.owner_id
+        with mock.patch.object(self.redis, 'get', side_effect=redis.ConnectionError('down')):
+            self.assertEqual(self.finalize('any').status_code, 500)
+
+
+class TestStartTranscription(unittest.TestCase):
+    def test_queues_transcription_of_the_blob(self):
+        transcribe = mock.Mock()
+        transcribe.apply_async.return_value = mock.Mock(id='task-1')
+        with mock.patch('tasks.transcriptionservice.transcribe_episode', transcribe), \
+                mock.patch.object(uploads_module, 'TaskInfoSingleton') as task_info:
+            start_transcription('audio/abc_episode.mp3', 7)
+        transcribe.apply_async.assert_called_once_with(
+            args=[{'container': uploads_module.container_name, 'blob': 'audio/abc_episode.mp3'}, 7])
+        task_info.return_value.set_task_info.assert_called_once_with('task-1', 'transcription_plan')
+
+    def test_failure_does_not_raise(self):
+        transcribe = mock.Mock()
+        transcribe.apply_async.side_effect = ConnectionError('broker down')
+        with mock.patch('tasks.transcriptionservice.transcribe_episode', transcribe):
+            start_transcription('audio/abc_episode.mp3', 7)
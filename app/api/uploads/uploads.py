@@ -0,0 +1,271 @@
+import os
+import json
+import uuid
+import logging
+from datetime import datetime
+
+import redis
+from azure.core.exceptions import ResourceNotFoundError
+from sqlalchemy.exc import IntegrityError
+from flask import Blueprint, request, jsonify
+from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
+
+from app.models import db, Episode, Podcast
+from app.api.azureops.azureapi import azure_storage_instance
+from app.api.azureops.azureclass import UPLOAD_SAS_TTL
+from app.api.azureops.redisclass import redis_client
+from task_singleton import TaskInfoSingleton
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+uploads = Blueprint("uploads", __name__)
+
+container_name = os.getenv('AZURE_CONTAINER_NAME')
+
+# Same limits as EpisodeForm, enforced again at finalize because the bytes never reach the app.
+ALLOWED_AUDIO_EXTENSIONS = {'mp3', 'wav', 'ogg'}
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 50 * 1024 * 1024))
+# The session outlives the SAS so an upload that finishes just before expiry can still be finalized.
+UPLOAD_SESSION_TTL = UPLOAD_SAS_TTL + 15 * 60
+
+
+def session_key(upload_id: str) -> str:
+    return f"upload:{upload_id}"
+
+
+def finalized_key(upload_id: str) -> str:
+    return f"upload:{upload_id}:episode"
+
+
+def episode_conflict(episode_id=None):
+    """409 for an upload that was already finalized, with the episode when it is known."""
+    episode = db.session.get(Episode, episode_id) if episode_id else None
+    return jsonify({'status': 'error', 'message': 'upload already finalized', 'error_code': 'CONFLICT',
+                    'data': episode.to_dict() if episode else None}), 409
+
+
+def start_transcription(blob_name: str, episode_id: int):
+    from tasks.transcriptionservice import transcribe_episode
+    try:
+        task = transcribe_episode.apply_async(args=[{'container': container_name, 'blob': blob_name}, episode_id])
+        TaskInfoSingleton().set_task_info(task.id, 'transcription_plan')
+        logger.info("Transcription started asynchronously.")
+    except Exception as e:
+        logger.error(f"Failed to start transcription: {e}")
+
+
+@login_required
+@uploads.post('/api/v1/uploads')
+def create_upload_session():
+    """
+    Start a direct-to-storage episode upload.
+    ---
+    tags:
+        - Upload
+    post:
+        description: Issue a short-lived write SAS url for an episode audio file. The client PUTs the file to
+                     upload_url with the returned headers and then calls the finalize endpoint.
+        parameters:
+            - name: podcast_id
+              in: body
+              type: integer
+              description: ID of the podcast the episode belongs to.
+              required: true
+            - name: filename
+              in: body
+              type: string
+              description: Original audio file name (mp3, wav or ogg).
+              required: true
+            - name: size
+              in: body
+              type: integer
+              description: Size of the audio file in bytes.
+              required: true
+        responses:
+            201:
+                description: Upload session created.
+            400:
+                description: Invalid file name or size.
+            403:
+                description: User not authenticated or not the podcast owner.
+            500:
+                description: Internal server error.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
+
+    data = request.json
+    podcast_id = data.get('podcast_id')
+    filename = secure_filename(data.get('filename') or '')
+    size = data.get('size')
+
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in ALLOWED_AUDIO_EXTENSIONS:
+        return jsonify({'status': 'error', 'message': 'Audio files only!', 'error_code': 'VALIDATION ERROR',
+                        'data': None}), 400
+    if not isinstance(size, int) or size <= 0 or size > UPLOAD_MAX_SIZE:
+        return jsonify({'status': 'error', 'message': f'File size must be under {UPLOAD_MAX_SIZE} bytes',
+                        'error_code': 'VALIDATION ERROR', 'data': None}), 400
+
+    podcast = db.session.get(Podcast, podcast_id)
+    if podcast is None or podcast.user_id != current_user.id:
+        return jsonify({'status': 'error', 'message': 'podcast not found', 'data': None}), 403
+
+    upload_id = uuid.uuid4().hex
+    blob_name = f"audio/{upload_id}_{filename}"
+    try:
+        upload_url = azure_storage_instance.generate_upload_sas(container_name, blob_name)
+        upload_session = {'user_id': current_user.id, 'podcast_id': podcast.id, 'blob_name': blob_name, 'size': size}
+        redis_client.set(session_key(upload_id), json.dumps(upload_session), ex=UPLOAD_SESSION_TTL)
+    except Exception as e:
+        logger.error(str(e))
+        return jsonify({'status': 'error', 'message': 'upload session not created', 'error_code': 'SERVER ERROR',
+                        'data': None}), 500
+
+    response_data = {
+        'upload_id': upload_id,
+        'upload_url': upload_url,
+        'blob_name': blob_name,
+        'expires_in': UPLOAD_SAS_TTL,
+        'headers': {'x-ms-blob-type': 'BlockBlob'}
+    }
+    return jsonify({'status': 'success', 'message': 'upload session created', 'data': response_data}), 201
+
+
+@login_required
+@uploads.post('/api/v1/uploads/<upload_id>/finalize')
+def finalize_upload(upload_id):
+    """
+    Create the episode for a finished direct upload.
+    ---
+    tags:
+        - Upload
+    post:
+        description: Check that the audio blob of an upload session exists and create the Episode row.
+        parameters:
+            - name: upload_id
+              in: path
+              type: string
+              description: ID returned when the upload session was created.
+              required: true
+            - name: title
+              in: body
+              type: string
+              description: Episode title.
+              required: true
+            - name: description
+              in: body
+              type: string
+              description: Episode description.
+              required: true
+            - name: image_url
+              in: body
+              type: string
+              description: Optional episode image url.
+              required: false
+        responses:
+            201:
+                description: Episode created.
+            400:
+                description: Missing fields, or the uploaded blob is missing, too large or not the declared size.
+            403:
+                description: User not authenticated or not the session owner.
+            404:
+                description: Upload session not found or expired.
+            409:
+                description: The upload was already finalized; data holds the episode once it is created.
+            500:
+                description: Internal server error.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': 'User not authenticated'}), 403
+
+    data = request.json
+    title = data.get('title')
+    description = data.get('description')
+    image_url = data.get('image_url')
+    if not title or not description:
+        return jsonify({'status': 'error', 'message': 'title and description required',
+                        'error_code': 'VALIDATION ERROR', 'data': None}), 400
+
+    try:
+        raw_session = redis_client.get(session_key(upload_id))
+        raw_finalized = None if raw_session else redis_client.get(finalized_key(upload_id))
+    except redis.RedisError as e:
+        logger.error(str(e))
+        return jsonify({'status': 'error', 'message': 'Internal Server error', 'error_code': 'SERVER ERROR',
+                        'data': None}), 500
+    if not raw_session:
+        finalized = json.loads(raw_finalized) if raw_finalized else None
+        if finalized and finalized['user_id'] == current_user.id:
+            return episode_conflict(finalized['episode_id'])
+        return jsonify({'status': 'error', 'message': 'upload session not found', 'data': None}), 404
+    upload_session = json.loads(raw_session)
+    if upload_session['user_id'] != current_user.id:
+        return jsonify({'status': 'error', 'message': 'upload session not found', 'data': None}), 403
+
+    blob_name = upload_session['blob_name']
+    try:
+        properties = azure_storage_instance.get_blob_properties(container_name, blob_name)
+    except ResourceNotFoundError:
+        return jsonify({'status': 'error', 'message': 'audio file not uploaded', 'error_code': 'VALIDATION ERROR',
+                        'data': None}), 400
+
+    if properties.size > UPLOAD_MAX_SIZE:
+        azure_storage_instance.delete_blob(container_name, blob_name)
+        redis_client.delete(session_key(upload_id))
+        return jsonify({'status': 'error', 'message': f'File size must be under {UPLOAD_MAX_SIZE} bytes',
+                        'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    if properties.size != upload_session['size']:
+        # the session stays so the client can upload the declared file again
+        azure_storage_instance.delete_blob(container_name, blob_name)
+        return jsonify({'status': 'error', 'message': 'uploaded file size does not match the declared size',
+                        'error_code': 'VALIDATION ERROR', 'data': None}), 400
+
+    # Claim the session before inserting: only the request whose delete removed it goes on, so a
+    # retried or concurrent finalize cannot create a second episode for the same blob.
+    try:
+        claimed = redis_client.delete(session_key(upload_id))
+    except redis.RedisError as e:
+        logger.error(str(e))
+        return jsonify({'status': 'error', 'message': 'Internal Server error', 'error_code': 'SERVER ERROR',
+                        'data': None}), 500
+    if not claimed:
+        return episode_conflict()
+
+    try:
+        new_episode = Episode(
+            title=title,
+            description=description,
+            image_url=image_url,
+            audio_url=azure_storage_instance.get_blob_client(container_name, blob_name).url,
+            podcast_id=upload_session['podcast_id'],
+            publish_date=datetime.now()
+        )
+        db.session.add(new_episode)
+        db.session.commit()
+    except IntegrityError:
+        # an episode already points at this blob
+        db.session.rollback()
+        return episode_conflict()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(str(e))
+        # give the session back so the client can retry the finalize
+        try:
+            redis_client.set(session_key(upload_id), raw_session, ex=UPLOAD_SESSION_TTL)
+        except redis.RedisError as redis_error:
+            logger.error(f"Failed to restore upload session {upload_id}: {redis_error}")
+        return jsonify({'status': 'error', 'message': 'episode not created', 'error_code': 'SERVER ERROR',
+                        'data': None}), 500
+
+    logger.info(f"Episode {new_episode.id} created from upload {upload_id}")
+    try:
+        finalized = {'user_id': current_user.id, 'episode_id': new_episode.id}
+        redis_client.set(finalized_key(upload_id), json.dumps(finalized), ex=UPLOAD_SESSION_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to record finalized upload {upload_id}: {e}")
+    start_transcription(blob_name, new_episode.id)
+    return jsonify({'status': 'success', 'message': 'episode created', 'data': new_episode.to_dict()}), 201
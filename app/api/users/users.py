@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 import logging
 from app.models import User, db
+from app.api.pagination import CursorError, page_params, paginate
 from app.model_utils import role_check
 from  flask_login import current_user,login_required
 logging.basicConfig(level=logging.INFO)
@@ -17,7 +18,19 @@ def list_users():
     tags:
         - User
     summary: Returns a list of all users in the system.
-    description: This endpoint retrieves all users from the database and returns them as a JSON array.
+    description: This endpoint returns users ordered by id, one page at a time. Pass the next_cursor of a page
+                 as after to get the following page; next_cursor is null on the last page.
+    parameters:
+        - name: limit
+          in: query
+          type: integer
+          description: Page size (default 50, at most 200).
+          required: false
+        - name: after
+          in: query
+          type: string
+          description: next_cursor from the previous page.
+          required: false
     responses:
         200:
             description: Successfully retrieved the list of users.
@@ -36,6 +49,10 @@ def list_users():
                                 type: array
                                 items:
                                     $ref: '#/components/schemas/User'
+                            next_cursor:
+                                type: string
+        400:
+            description: Invalid limit or cursor.
         500:
             description: Internal server error occurred while retrieving users.
             content:
@@ -56,9 +73,14 @@ def list_users():
                                 type: 'null'
     """
     try:
-        user_list = User.query.all()
+        limit, after = page_params()
+    except CursorError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'error_code': 'VALIDATION ERROR', 'data': None}), 400
+    try:
+        user_list, next_cursor = paginate(User.query, (User.id,), limit, after)
         users_dict = [user.to_dict() for user in user_list]
-        return jsonify({'status': 'success', 'message': 'Retrieved all users', 'data': users_dict}), 200
+        return jsonify({'status': 'success', 'message': 'Retrieved all users', 'data': users_dict,
+                        'next_cursor': next_cursor}), 200
     except Exception as e:
         logger.error(f"Error retrieving users: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to retrieve users', 'error_code': 'SERVER_ERROR', 'data': None}), 500
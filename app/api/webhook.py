@@ -11,8 +11,7 @@ logger = logging.getLogger(__name__)
 
 def handle_webhook_failure(blob_name, container_name):
     """Rollback function to delete blob after webhook failure."""
-    blob_client = azure_storage_instance.get_blob_client(container=container_name, blob=blob_name)
-    blob_client.delete_blob()
+    azure_storage_instance.delete_blob(container_name, blob_name)
     logger.error(f"Blob {blob_name} in {container_name} deleted due to webhook failure.")
 
 
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import redis
+
+from app.metrics import CACHE_INVALIDATIONS, CACHE_REQUESTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = int(os.getenv('CACHE_TTL', 600))
+CACHE_LOCAL_TTL = int(os.getenv('CACHE_LOCAL_TTL', 5))
+CACHE_LOCAL_SIZE = int(os.getenv('CACHE_LOCAL_SIZE', 4096))
+
+
+class ReadThroughCache:
+    """
+    Two-level read-through cache for JSON-serializable values.
+
+    Redis is shared by every worker and holds entries for ttl seconds. The in-process LRU in front
+    of it holds at most local_size entries for local_ttl seconds; invalidate() clears this process
+    and Redis, so other workers may serve their local copy for up to local_ttl seconds after a write.
+    """
+
+    def __init__(self, name: str, redis_client, ttl: int = CACHE_TTL, local_ttl: int = CACHE_LOCAL_TTL,
+                 local_size: int = CACHE_LOCAL_SIZE):
+        self.name = name
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cache_key(self, namespace: str, key) -> str:
+        return f"cache:{self.name}:{namespace}:{key}"
+
+    def get(self, namespace: str, key, loader):
+        """
+        Return the cached value for (namespace, key), calling loader() when neither level has it.
+        A None from loader() (e.g. row not found) is returned but not cached.
+        """
+        cache_key = self.cache_key(namespace, key)
+
+        value = self._get_local(cache_key)
+        if value is not None:
+            CACHE_REQUESTS.labels(self.name, 'local').inc()
+            return value
+
+        try:
+            cached = self.redis_client.get(cache_key)
+        except redis.RedisError as e:
+            logger.warning(f'{self.name} cache unavailable: {e}')
+            cached = None
+        if cached:
+            CACHE_REQUESTS.labels(self.name, 'redis').inc()
+            value = json.loads(cached)
+            self._set_local(cache_key, value)
+            return value
+
+        CACHE_REQUESTS.labels(self.name, 'miss').inc()
+        value = loader()
+        if value is None:
+            return None
+        try:
+            self.redis_client.set(cache_key, json.dumps(value), ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f'Failed to fill {self.name} cache: {e}')
+        self._set_local(cache_key, value)
+        return value
+
+    def invalidate(self, keys):
+        """Drop (namespace, key) pairs from both levels."""
+        cache_keys = [self.cache_key(namespace, key) for namespace, key in keys]
+        if not cache_keys:
+            return
+        with self._lock:
+            for cache_key in cache_keys:
+                self._local.pop(cache_key, None)
+        CACHE_INVALIDATIONS.labels(self.name).inc(len(cache_keys))
+        try:
+            self.redis_client.delete(*cache_keys)
+        except redis.RedisError as e:
+            logger.warning(f'Failed to invalidate {self.name} cache: {e}')
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _get_local(self, cache_key: str):
+        with self._lock:
+            entry = self._local.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[cache_key]
+                return None
+            self._local.move_to_end(cache_key)
+            return value
+
+    def _set_local(self, cache_key: str, value):
+        with self._lock:
+            self._local[cache_key] = (time.monotonic() + self.local_ttl, value)
+            self._local.move_to_end(cache_key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
@@ -0,0 +1,79 @@
+import os
+import time
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import DB_POOL_CAPACITY, DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS, DB_POOL_TIMEOUTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per process: each gunicorn and celery worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+# milliseconds, 0 for no limit; Postgres only
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+# comma separated; each becomes a bind named replica_0, replica_1, ...
+DB_REPLICA_URIS = [uri.strip() for uri in os.getenv('DB_REPLICA_URIS', '').split(',') if uri.strip()]
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection and how often they give up."""
+
+    bind_name = 'primary'
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.bind_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(self.bind_name).observe(time.perf_counter() - start)
+
+
+def engine_options(uri: str) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for uri. SQLite keeps the pool Flask-SQLAlchemy picks for it."""
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    if not uri or make_url(uri).get_backend_name() == 'sqlite':
+        return options
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+    })
+    if DB_STATEMENT_TIMEOUT and make_url(uri).get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'}
+    return options
+
+
+def replica_binds(uris: list = DB_REPLICA_URIS) -> dict:
+    """SQLALCHEMY_BINDS entries for the read replicas, with the same pool settings as the primary."""
+    return {f'replica_{index}': dict(engine_options(uri), url=uri) for index, uri in enumerate(uris)}
+
+
+def instrument_pool(engine, bind_name: str):
+    """Export the checkout latency and saturation of engine's pool under bind_name."""
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return
+    pool.bind_name = bind_name
+    DB_POOL_CAPACITY.labels(bind_name).set(pool.size() + pool._max_overflow)
+
+    @event.listens_for(pool, 'checkout')
+    def _checked_out(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.labels(bind_name).inc()
+
+    @event.listens_for(pool, 'checkin')
+    def _checked_in(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.labels(bind_name).dec()
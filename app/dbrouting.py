@@ -0,0 +1,169 @@
+import os
+import math
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.expression import Select, UpdateBase
+
+from app.metrics import DB_ROUTED_STATEMENTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Reads may be this many seconds behind the primary: replicas lagging more are skipped, and a
+# client that wrote within this window reads from the primary so it sees its own writes.
+DB_REPLICA_STALENESS = float(os.getenv('DB_REPLICA_STALENESS', 5))
+DB_REPLICA_LAG_CHECK = float(os.getenv('DB_REPLICA_LAG_CHECK', 10))
+# The lag check runs on the request path; a replica that does not answer within this is skipped
+DB_REPLICA_LAG_TIMEOUT = float(os.getenv('DB_REPLICA_LAG_TIMEOUT', 2))
+
+REPLICA_BLUEPRINTS = {'podcast', 'episode', 'rating', 'subscription', 'favourite', 'shared_playlist'}
+REPLICA_ENDPOINTS = {'views.podcast', 'views.episode'}
+SAFE_METHODS = {'GET', 'HEAD'}
+LAST_WRITE_KEY = 'db_last_write'
+
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+""")
+
+
+class ReplicaHealth:
+    """
+    Replication lag of each replica, measured at most every DB_REPLICA_LAG_CHECK seconds per process.
+    One request measures while the others keep the previous value; a replica that cannot be measured
+    within DB_REPLICA_LAG_TIMEOUT counts as infinitely behind.
+    """
+
+    def __init__(self, check_interval: float = DB_REPLICA_LAG_CHECK, timeout: float = DB_REPLICA_LAG_TIMEOUT):
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.lags = {}
+        self._measuring = set()
+        self._probes = {}
+        self._lock = threading.Lock()
+
+    def lag(self, bind_key: str, engine) -> float:
+        with self._lock:
+            checked_at, lag = self.lags.get(bind_key, (None, None))
+            if checked_at is not None and (time.monotonic() - checked_at < self.check_interval
+                                           or bind_key in self._measuring):
+                return lag
+            self._measuring.add(bind_key)
+        try:
+            lag = self._measure(bind_key, engine)
+        finally:
+            with self._lock:
+                self._measuring.discard(bind_key)
+        with self._lock:
+            self.lags[bind_key] = (time.monotonic(), lag)
+        return lag
+
+    def _measure(self, bind_key: str, engine) -> float:
+        if engine.dialect.name != 'postgresql':
+            return 0.0
+        try:
+            with self._probe(bind_key, engine).connect() as connection:
+                return float(connection.execute(REPLICA_LAG_QUERY).scalar() or 0)
+        except Exception as e:
+            logger.warning(f'Replica {bind_key} unavailable: {e}')
+            return float('inf')
+
+    def _probe(self, bind_key: str, engine):
+        """
+        An unpooled engine for the replica with connect and statement timeouts, so the check neither
+        waits for a pooled connection nor hangs on a replica that accepts connections but never answers.
+        """
+        with self._lock:
+            if bind_key not in self._probes:
+                self._probes[bind_key] = create_engine(engine.url, poolclass=NullPool, connect_args={
+                    # libpq takes whole seconds
+                    'connect_timeout': max(1, math.ceil(self.timeout)),
+                    'options': f'-c statement_timeout={int(self.timeout * 1000)}',
+                })
+            return self._probes[bind_key]
+
+
+replica_health = ReplicaHealth()
+
+
+@contextmanager
+def primary_reads(session):
+    """
+    Read from the primary inside the block whatever the request. For loaders that fill shared caches:
+    a value read from a lagging replica would be served long after the staleness window.
+    """
+    previous = session.info.get('primary_reads', False)
+    session.info['primary_reads'] = True
+    try:
+        yield
+    finally:
+        session.info['primary_reads'] = previous
+
+
+def recently_wrote() -> bool:
+    return time.time() - flask_session.get(LAST_WRITE_KEY, 0) < DB_REPLICA_STALENESS
+
+
+def routes_to_replica() -> bool:
+    """True while handling a read-only request on a blueprint or view that may read from a replica."""
+    if not has_request_context() or request.method not in SAFE_METHODS:
+        return False
+    if request.blueprint not in REPLICA_BLUEPRINTS and request.endpoint not in REPLICA_ENDPOINTS:
+        return False
+    return not recently_wrote()
+
+
+class RoutingSession(Session):
+    """
+    Sends the ORM and Core SELECTs of read-only requests to a replica bind (replica_0, replica_1, ...) and
+    everything else to the primary. A session picks one replica for its lifetime, so the queries of
+    a request see one consistent snapshot, and it stays on the primary once it has written.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if isinstance(clause, UpdateBase):
+                self.info['wrote'] = True
+            elif isinstance(clause, Select) and self._reads_from_replica(clause):
+                replica = self._replica()
+                if replica is not None:
+                    DB_ROUTED_STATEMENTS.labels(self.info['replica']).inc()
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause) -> bool:
+        if self._flushing or self.info.get('wrote') or self.info.get('primary_reads'):
+            return False
+        if clause._for_update_arg is not None:
+            return False
+        return routes_to_replica()
+
+    def _replica(self):
+        engines = self._db.engines
+        if 'replica' not in self.info:
+            fresh = [key for key in engines if key and key.startswith('replica_')
+                     and replica_health.lag(key, engines[key]) <= DB_REPLICA_STALENESS]
+            self.info['replica'] = random.choice(fresh) if fresh else None
+        return engines[self.info['replica']] if self.info['replica'] else None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(session):
+    if session.in_nested_transaction():
+        return
+    # the client reads from the primary until the replicas have caught up with this commit
+    if session.info.get('wrote') and has_request_context() and current_app.secret_key:
+        flask_session[LAST_WRITE_KEY] = time.time()
@@ -0,0 +1,33 @@
+import os
+
+from flask import Response
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# Outcome of a read-through cache lookup: local (in-process hit), redis (shared hit) or miss
+CACHE_REQUESTS = Counter('shortcast_cache_requests', 'Read-through cache lookups', ['cache', 'result'])
+CACHE_INVALIDATIONS = Counter('shortcast_cache_invalidations', 'Read-through cache keys invalidated', ['cache'])
+
+# Connection pools, per bind; saturation is checked_out / capacity. Gauges sum over live worker processes.
+DB_POOL_CHECKOUT_SECONDS = Histogram('shortcast_db_pool_checkout_seconds', 'Time spent waiting for a pooled connection',
+                                     ['bind'], buckets=(.0005, .001, .005, .01, .05, .1, .5, 1, 5, 10, 30))
+DB_POOL_TIMEOUTS = Counter('shortcast_db_pool_timeouts', 'Connection checkouts that gave up after pool_timeout',
+                           ['bind'])
+DB_POOL_CHECKED_OUT = Gauge('shortcast_db_pool_checked_out', 'Connections currently checked out', ['bind'],
+                            multiprocess_mode='livesum')
+DB_ROUTED_STATEMENTS = Counter('shortcast_db_replica_statements', 'Statements sent to a read replica', ['bind'])
+DB_POOL_CAPACITY = Gauge('shortcast_db_pool_capacity', 'pool_size + max_overflow', ['bind'],
+                         multiprocess_mode='livesum')
+
+
+def metrics_response() -> Response:
+    """
+    Current metrics in the Prometheus text format. Under gunicorn set PROMETHEUS_MULTIPROC_DIR so the
+    samples of every worker process are merged instead of reporting whichever worker answered.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
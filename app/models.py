@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Enum, Integer, DateTime, ForeignKey, SmallInteger, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, Session
+from sqlalchemy import String, Enum, Integer, DateTime, ForeignKey, SmallInteger, UniqueConstraint, JSON, Index, \
+    event, inspect, select, update, or_
+from sqlalchemy.orm.util import identity_key
 from sqlalchemy.sql import func
 from app.model_utils import Providers, Roles, Categories, Shared
+from app.dbrouting import RoutingSession
 from flask_login import UserMixin
 
 from flask_admin.contrib.sqla import ModelView
@@ -11,7 +14,7 @@ class Base(DeclarativeBase):
     ...
 
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 
 
 class User(db.Model, UserMixin):
@@ -54,6 +57,14 @@ class Podcast(db.Model):
     feed_url: Mapped[str] = mapped_column(String, nullable=True, unique=True, name='uq_podcast_feed_url')
     audio_url: Mapped[str] = mapped_column(String, nullable=True, unique=True, name='uq_podcast_audio_url')
     duration: Mapped[int] = mapped_column(Integer, nullable=True)
+    # bumped on every UPDATE, counters included; the API derives ETags from it
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(),
+                                                 nullable=False)
+    # counters maintained on flush, see adjust_counters
+    subscriber_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    favourite_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
     episodes: Mapped[list['Episode']] = db.relationship('Episode', backref='podcast', cascade='all, delete-orphan')
     subscriptions: Mapped[list['Subscription']] = db.relationship('Subscription', backref='podcast',
                                                                   cascade='all, delete-orphan')
@@ -62,10 +73,14 @@ class Podcast(db.Model):
     playlist_items = db.relationship('PlaylistItem', backref='podcast', uselist=False, cascade='all, delete-orphan')
     ratings: Mapped[list['Rating']] = db.relationship('Rating', backref='podcast', cascade='all, delete-orphan')
     downloads: Mapped[list['Download']] = db.relationship('Download', backref='podcast', cascade='all, delete-orphan')
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_podcast'), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_podcast'), nullable=False,
+                                         index=True)
 
     __table_args__ = (
         UniqueConstraint('publisher', 'title', name='uix_publisher_title'),
+        # browse pages list newest first, optionally narrowed to one category
+        Index('ix_podcast_publish_date', 'publish_date'),
+        Index('ix_podcast_category_publish_date', 'category', 'publish_date'),
     )
 
     def __init__(self, **kwargs):
@@ -91,7 +106,7 @@ class Podcast(db.Model):
             'feed_url': self.feed_url,
             'audio_url': self.audio_url,
             'duration': self.duration,
-            'subscriptions': len(self.subscriptions)
+            'subscriptions': self.subscriber_count
         }
 
 
@@ -104,6 +119,14 @@ class Episode(db.Model):
     image_url: Mapped[str] = mapped_column(String, nullable=True)
     audio_url: Mapped[str] = mapped_column(String, nullable=False, unique=True, name='uq_episode_audio_url')
     transcription:Mapped[str] = mapped_column(String,nullable=True)
+    # [{'start': seconds, 'end': seconds, 'text': ...}] for transcripts stitched from windows
+    transcription_segments: Mapped[list] = mapped_column(JSON, nullable=True)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(),
+                                                 nullable=False)
+    # counters maintained on flush, see adjust_counters
+    favourite_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
     podcast_id: Mapped[int] = mapped_column(Integer, ForeignKey('podcast.id', name='fk_podcast_episode'),
                                             nullable=False)
     favourites: Mapped[list['Favourite']] = db.relationship('Favourite', backref='episode',
@@ -112,6 +135,13 @@ class Episode(db.Model):
     ratings: Mapped[list['Rating']] = db.relationship('Rating', backref='episode', cascade='all,delete-orphan')
     downloads: Mapped[list['Download']] = db.relationship('Download', backref='episode', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # a podcast's episodes newest first; also serves plain podcast_id lookups
+        Index('ix_episode_podcast_id_publish_date', 'podcast_id', 'publish_date'),
+        Index('ix_episode_publish_date', 'publish_date'),
+        Index('ix_episode_favourite_count', 'favourite_count'),
+    )
+
     def to_dict(self):
         return {
             'episode_id': self.id,
@@ -132,6 +162,11 @@ class Subscription(db.Model):
                                             primary_key=True)
     subscribed_date: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
 
+    # the primary key leads with user_id; subscriber lookups and counts go by podcast
+    __table_args__ = (
+        Index('ix_subscription_podcast_id_user_id', 'podcast_id', 'user_id'),
+    )
+
     # podcasts:Mapped[list['Podcast']] = db.relationship('Podcast',backref='subscription')
     # users: Mapped[list['User']] = db.relationship('User', backref='subscription')
     def to_dict(self):
@@ -146,11 +181,16 @@ class Favourite(db.Model):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_favourite'), nullable=False,
                                          primary_key=True)
     podcast_id: Mapped[int] = mapped_column(Integer, ForeignKey('podcast.id', name='fk_podcast_favourite'),
-                                            nullable=True)
+                                            nullable=True, index=True)
     episode_id: Mapped[int] = mapped_column(Integer, ForeignKey('episode.id', name='fk_episode_favourite'),
                                             primary_key=True)
     added_date: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
 
+    __table_args__ = (
+        # favourite counts per episode are answered from the index alone
+        Index('ix_favourite_episode_id_user_id', 'episode_id', 'user_id'),
+    )
+
     # podcasts:Mapped[list['Podcast']] = db.relationship('Podcast',backref='favourite')
     # episodes:Mapped[list['Episode']] = db.relationship('Episode',backref = 'favourite')
     # users: Mapped[list['User']] = db.relationship('User', backref='favourite')
@@ -174,9 +214,9 @@ class Rating(db.Model):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_rating'), nullable=False,
                                          primary_key=True)
     podcast_id: Mapped[int] = mapped_column(Integer, ForeignKey('podcast.id', name='fk_podcast_rating'),
-                                             nullable=True)
+                                             nullable=True, index=True)
     episode_id: Mapped[int] = mapped_column(Integer, ForeignKey('episode.id', name='fk_episode_rating'),
-                                            primary_key=True)
+                                            primary_key=True, index=True)
     rating: Mapped[int] = mapped_column(SmallInteger, nullable=False)
     review_text: Mapped[str] = mapped_column(String, nullable=True)
     review_date: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
@@ -209,9 +249,9 @@ class Download(db.Model):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_download'), nullable=False,
                                          primary_key=True)
     podcast_id: Mapped[int] = mapped_column(Integer, ForeignKey('podcast.id', name='fk_podcast_download'),
-                                         nullable=True)
+                                         nullable=True, index=True)
     episode_id: Mapped[int] = mapped_column(Integer, ForeignKey('episode.id', name='fk_episode_download'),
-                                            primary_key=True)
+                                            primary_key=True, index=True)
     download_date: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
 
     # podcasts: Mapped[list['Podcast']] = db.relationship('Podcast', backref='download')
@@ -240,10 +280,13 @@ class Download(db.Model):
 
 class Playlist(db.Model):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement='auto')
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_playlist'), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_playlist'), nullable=False,
+                                         index=True)
     title: Mapped[str] = mapped_column(String, nullable=False, unique=True, name='uq_playlist_title')
     image_url: Mapped[str] = mapped_column(String, nullable=False,default='')
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(),
+                                                 nullable=False)
     shared_playlist: Mapped['SharedPlaylist'] = db.relationship('SharedPlaylist', backref='playlist',
                                                                 cascade='all, delete-orphan')
     playlist_playlist_item: Mapped['PlaylistPlaylistitem'] = db.relationship('PlaylistPlaylistitem', backref='playlist',
@@ -262,9 +305,9 @@ class PlaylistItem(db.Model):
     __tablename__ = 'playlistitem'
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement='auto')
     podcast_id: Mapped[int] = mapped_column(Integer, ForeignKey('podcast.id', name='fk_podcast_playlist_item'),
-                                            nullable=True)
+                                            nullable=True, index=True)
     episode_id: Mapped[int] = mapped_column(Integer, ForeignKey('episode.id', name='fk_episode_playlist_item'),
-                                            nullable=True)
+                                            nullable=True, index=True)
     added_date: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
     playlist_playlist_item: Mapped['PlaylistPlaylistitem'] = db.relationship('PlaylistPlaylistitem',
                                                                              backref='playlistitem',
@@ -292,7 +335,7 @@ class SharedPlaylist(db.Model):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', name='fk_user_shared_playlist'), nullable=False,
                                          primary_key=True)
     playlist_id: Mapped[int] = mapped_column(Integer, ForeignKey('playlist.id', name='fk_playlist_shared_playlist'),
-                                             primary_key=True, nullable=False)
+                                             primary_key=True, nullable=False, index=True)
     roles: Mapped[str] = mapped_column(Enum(Shared), nullable=False, default=Shared.CONSUMERS)
 
     # user:Mapped['User'] = db.relationship('User',backref='shared_playlist')
@@ -312,7 +355,7 @@ class PlaylistPlaylistitem(db.Model):
                                              primary_key=True, nullable=False)
     playlist_item_id: Mapped[int] = mapped_column(Integer, ForeignKey('playlistitem.id',
                                                                       name='fk_playlist_item_playlist_playlist_item'),
-                                                  primary_key=True, nullable=False)
+                                                  primary_key=True, nullable=False, index=True)
 
     # playlist: Mapped['Playlist'] = db.relationship('Playlist', backref='playlist_playlist_items')
     # playlist_item:Mapped['PlaylistItem'] = db.relationship('PlaylistItem',backref = 'playlist_playlist_items')
@@ -323,6 +366,107 @@ class PlaylistPlaylistitem(db.Model):
         }
 
 
+def _counter_target(instance):
+    """The Episode or Podcast (class, id) a favourite or rating counts towards."""
+    if instance.episode_id:
+        return Episode, instance.episode_id
+    if instance.podcast_id:
+        return Podcast, instance.podcast_id
+    return None
+
+
+def _counter_deltas(session) -> dict:
+    """{(model, id): {column: delta}} for the subscriptions, favourites and ratings in this flush."""
+    deltas = {}
+
+    def add(target, column, delta):
+        if target and delta:
+            counters = deltas.setdefault(target, {})
+            counters[column] = counters.get(column, 0) + delta
+
+    for instances, sign in ((session.new, 1), (session.deleted, -1)):
+        for instance in instances:
+            if isinstance(instance, Subscription):
+                add((Podcast, instance.podcast_id), 'subscriber_count', sign)
+            elif isinstance(instance, Favourite):
+                add(_counter_target(instance), 'favourite_count', sign)
+            elif isinstance(instance, Rating):
+                add(_counter_target(instance), 'rating_count', sign)
+                add(_counter_target(instance), 'rating_sum', sign * (instance.rating or 0))
+    for instance in session.dirty:
+        if isinstance(instance, Rating):
+            history = inspect(instance).attrs.rating.history
+            if history.has_changes():
+                add(_counter_target(instance), 'rating_sum',
+                    sum(history.added or [0]) - sum(history.deleted or [0]))
+    return deltas
+
+
+@event.listens_for(Session, 'after_flush')
+def adjust_counters(session, flush_context):
+    """
+    Keep the denormalized counters in step with the rows they count. The increments run as
+    UPDATE ... SET count = count + n in the same transaction as the change, so concurrent writers
+    never lose an update and a rollback undoes both. reconcile_counters repairs any drift.
+    """
+    deltas = _counter_deltas(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    for (model, target_id), counters in deltas.items():
+        table = model.__table__
+        connection.execute(update(table).where(table.c.id == target_id)
+                           .values({column: table.c[column] + delta for column, delta in counters.items()}))
+    session.info.setdefault('stale_counters', []).extend(
+        (identity_key(model, target_id), list(counters)) for (model, target_id), counters in deltas.items())
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def expire_counters(session, flush_context):
+    """Counters were changed behind the ORM's back; reload them on next access."""
+    for key, columns in session.info.pop('stale_counters', []):
+        instance = session.identity_map.get(key)
+        if instance is not None:
+            session.expire(instance, columns)
+
+
+def reconcile_counters(session):
+    """
+    Recompute every counter from the rows it counts, writing only rows that drifted (for example
+    after a bulk delete, which skips the flush events). The caller commits.
+    """
+    def count(model, column, owner):
+        return select(func.count()).select_from(model).where(column == owner.id).scalar_subquery()
+
+    def total(column, owner_column, owner):
+        return select(func.coalesce(func.sum(column), 0)).where(owner_column == owner.id).scalar_subquery()
+
+    targets = {
+        Podcast: {
+            'subscriber_count': count(Subscription, Subscription.podcast_id, Podcast),
+            'favourite_count': count(Favourite, Favourite.podcast_id, Podcast),
+            'rating_count': count(Rating, Rating.podcast_id, Podcast),
+            'rating_sum': total(Rating.rating, Rating.podcast_id, Podcast),
+        },
+        Episode: {
+            'favourite_count': count(Favourite, Favourite.episode_id, Episode),
+            'rating_count': count(Rating, Rating.episode_id, Episode),
+            'rating_sum': total(Rating.rating, Rating.episode_id, Episode),
+        },
+    }
+    updated = 0
+    for model, counters in targets.items():
+        result = session.execute(
+            update(model)
+            .where(or_(*(getattr(model, column) != value for column, value in counters.items())))
+            .values(counters)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+    session.expire_all()
+    return updated
+
+
 models = {User,Podcast,Episode,Subscription,Favourite,Rating,Download,Playlist,PlaylistItem,SharedPlaylist,PlaylistPlaylistitem}
 def register_models(admin_obj, models: set):
     for model in models:
@@ -0,0 +1,292 @@
+import os
+import re
+import sqlite3
+import math
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from itertools import chain
+
+from sqlalchemy import and_, event, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import db, Podcast, Episode
+from app.dbrouting import primary_reads
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 'postgres', 'local', or unset to pick by database dialect
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND')
+SEARCH_LANGUAGE = os.getenv('SEARCH_LANGUAGE', 'english')
+SEARCH_MAX_LIMIT = 100
+# The local index also picks up rows written by other processes by rebuilding this often
+SEARCH_LOCAL_REFRESH = int(os.getenv('SEARCH_LOCAL_REFRESH', 300))
+
+SEARCH_MODELS = {'podcast': Podcast, 'episode': Episode}
+# Field weights, as in the tsvector columns: title A, description B, transcription C
+FIELD_WEIGHTS = {'title': 1.0, 'description': 0.4, 'transcription': 0.2}
+HIGHLIGHT_START, HIGHLIGHT_STOP = '<b>', '</b>'
+# Titles match a fuzzy search when their trigram similarity is above this
+SIMILARITY_THRESHOLD = 0.5
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    def search(self, session, query: str, kind: str, limit: int) -> list:
+        """
+        Ranked matches of kind ('podcast' or 'episode') for a free-text query, best first, as
+        {'type', 'id', 'title', 'rank', 'highlight'} dicts. Every query word must match.
+        """
+        ...
+
+    @abstractmethod
+    def similar(self, column, term: str, threshold: float = SIMILARITY_THRESHOLD):
+        """A where clause selecting rows whose column has a trigram similarity to term above threshold."""
+        ...
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Uses the generated search_vector tsvector columns and their GIN indexes. The columns are
+    recomputed by Postgres on every insert and update, transcriptions included.
+    """
+
+    def __init__(self, language: str = SEARCH_LANGUAGE):
+        self.language = language
+
+    def search(self, session, query: str, kind: str, limit: int) -> list:
+        table = SEARCH_MODELS[kind].__tablename__
+        highlight_source = "coalesce(description, '')" if kind == 'podcast' else \
+            "coalesce(description, '') || ' ' || coalesce(transcription, '')"
+        # ts_headline re-parses the document, so it only runs on the rows that survive the LIMIT
+        statement = text(f"""
+            SELECT ranked.id, ranked.title, ranked.rank,
+                   ts_headline(CAST(:language AS regconfig), ranked.document, ranked.query,
+                               'MaxFragments=2, MaxWords=20, MinWords=8, StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}')
+            FROM (
+                SELECT {table}.id, {table}.title, {highlight_source} AS document, q AS query,
+                       ts_rank_cd({table}.search_vector, q) AS rank
+                FROM {table}, websearch_to_tsquery(CAST(:language AS regconfig), :query) AS q
+                WHERE {table}.search_vector @@ q
+                ORDER BY rank DESC, {table}.id DESC
+                LIMIT :limit
+            ) AS ranked
+            ORDER BY ranked.rank DESC, ranked.id DESC
+        """)
+        rows = session.execute(statement, {'language': self.language, 'query': query, 'limit': limit})
+        return [{'type': kind, 'id': row[0], 'title': row[1], 'rank': float(row[2]), 'highlight': row[3]}
+                for row in rows]
+
+    def similar(self, column, term: str, threshold: float = SIMILARITY_THRESHOLD):
+        # % narrows the rows through the trigram index at pg_trgm's own threshold (0.3 unless
+        # configured), similarity() then applies ours exactly
+        return and_(column.op('%')(term), func.similarity(column, term) > threshold)
+
+
+def tokenize(value: str) -> list:
+    return re.findall(r'\w+', (value or '').lower())
+
+
+def trigrams(value: str) -> set:
+    """Trigrams of value the way pg_trgm extracts them: per lowercased word, padded with two spaces before and one after."""
+    grams = set()
+    for word in re.findall(r'[^\W_]+', (value or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(first: str, second: str) -> float:
+    """pg_trgm's similarity(): shared trigrams over all distinct trigrams of both strings."""
+    first, second = trigrams(first), trigrams(second)
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+def highlight(document: str, terms: set, width: int = 80) -> str:
+    """The first passage of document containing a query term, with the terms wrapped like ts_headline."""
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(term) for term in sorted(terms)) + r')\b', re.IGNORECASE)
+    found = pattern.search(document or '')
+    if found is None:
+        return (document or '')[:width]
+    start = max(0, found.start() - width // 2)
+    passage = document[start:start + width]
+    return pattern.sub(lambda m: f'{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}', passage)
+
+
+class LocalSearchIndex:
+    """
+    In-process inverted index used when the database is not Postgres (development, SQLite tests).
+    Scores are tf-idf with the same field weights as the tsvector columns.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.documents = {}
+        self.built_at = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, session):
+        with self._lock:
+            self.postings = {}
+            self.documents = {}
+            for kind, model in SEARCH_MODELS.items():
+                for row in session.scalars(select(model)):
+                    self._add(kind, document_fields(kind, row))
+            self.built_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > SEARCH_LOCAL_REFRESH
+
+    def upsert(self, kind: str, fields: dict):
+        with self._lock:
+            self._remove((kind, fields['id']))
+            self._add(kind, fields)
+
+    def remove(self, kind: str, row_id: int):
+        with self._lock:
+            self._remove((kind, row_id))
+
+    def _add(self, kind: str, fields: dict):
+        key = (kind, fields['id'])
+        self.documents[key] = fields
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(fields.get(field)):
+                postings = self.postings.setdefault(token, {})
+                postings[key] = postings.get(key, 0) + weight
+
+    def _remove(self, key):
+        fields = self.documents.pop(key, None)
+        if fields is None:
+            return
+        for token in set(chain.from_iterable(tokenize(fields.get(field)) for field in FIELD_WEIGHTS)):
+            postings = self.postings.get(token)
+            if postings:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[token]
+
+    def search(self, query: str, kind: str) -> list:
+        """[(score, id)] for every document of kind containing all query terms, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            matches = None
+            for term in terms:
+                keys = {key for key in self.postings.get(term, {}) if key[0] == kind}
+                matches = keys if matches is None else matches & keys
+                if not matches:
+                    return []
+            total = max(1, sum(1 for key in self.documents if key[0] == kind))
+            scored = []
+            for key in matches:
+                score = sum(self.postings[term][key] * math.log(1 + total / len(self.postings[term]))
+                            for term in terms)
+                scored.append((score, key[1]))
+        return sorted(scored, reverse=True)
+
+
+def document_fields(kind: str, row) -> dict:
+    fields = {'id': row.id, 'title': row.title, 'description': row.description}
+    if kind == 'episode':
+        fields['transcription'] = row.transcription
+    return fields
+
+
+class LocalSearchBackend(SearchBackend):
+    def __init__(self, index: LocalSearchIndex = None):
+        self.index = index or LocalSearchIndex()
+
+    def _ensure_index(self, session):
+        if self.index.is_stale():
+            with primary_reads(session):
+                self.index.rebuild(session)
+
+    def search(self, session, query: str, kind: str, limit: int) -> list:
+        self._ensure_index(session)
+        terms = set(tokenize(query))
+        results = []
+        for score, row_id in self.index.search(query, kind)[:limit]:
+            fields = self.index.documents[(kind, row_id)]
+            document = ' '.join(filter(None, (fields.get('description'), fields.get('transcription'))))
+            results.append({'type': kind, 'id': row_id, 'title': fields['title'], 'rank': round(score, 6),
+                            'highlight': highlight(document, terms)})
+        return results
+
+    def similar(self, column, term: str, threshold: float = SIMILARITY_THRESHOLD):
+        # similarity() is registered on SQLite connections below
+        return func.similarity(column, term) > threshold
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """The backend selected by SEARCH_BACKEND, defaulting to Postgres full-text search on Postgres."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = SEARCH_BACKEND or ('postgres' if db.engine.dialect.name == 'postgresql' else 'local')
+            if name == 'postgres':
+                _backend = PostgresSearchBackend()
+            elif name == 'local':
+                _backend = LocalSearchBackend()
+            else:
+                raise ValueError(f"Unknown SEARCH_BACKEND '{name}'")
+        return _backend
+
+
+def search(session, query: str, kinds=('podcast', 'episode'), limit: int = 20) -> list:
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    backend = get_search_backend()
+    results = list(chain.from_iterable(backend.search(session, query, kind, limit) for kind in kinds))
+    return sorted(results, key=lambda result: result['rank'], reverse=True)[:limit]
+
+
+@event.listens_for(Engine, 'connect')
+def _register_similarity(dbapi_connection, connection_record):
+    """Give SQLite pg_trgm's similarity(), so fuzzy matches run in the query on either database."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('similarity', 2, trigram_similarity, deterministic=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_search_changes(session, flush_context):
+    if not isinstance(_backend, LocalSearchBackend):
+        return
+    changes = session.info.setdefault('search_changes', {'upserts': {}, 'removals': set()})
+    for instance in chain(session.new, session.dirty):
+        for kind, model in SEARCH_MODELS.items():
+            if isinstance(instance, model):
+                changes['upserts'][(kind, instance.id)] = document_fields(kind, instance)
+    for instance in session.deleted:
+        for kind, model in SEARCH_MODELS.items():
+            if isinstance(instance, model):
+                changes['removals'].add((kind, instance.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_search_changes(session):
+    if session.in_nested_transaction():
+        return
+    changes = session.info.pop('search_changes', None)
+    if not changes or not isinstance(_backend, LocalSearchBackend):
+        return
+    for (kind, _), fields in changes['upserts'].items():
+        _backend.index.upsert(kind, fields)
+    for kind, row_id in changes['removals']:
+        _backend.index.remove(kind, row_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_search_changes(session, previous_transaction):
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop('search_changes', None)
@@ -33,7 +33,7 @@ def add_episode_to_playlist(episode_id, playlist_id):
     return new_playlist_item, None
 
 
-def update_transcription(episode_id: int, transcription_text: str):
+def update_transcription(episode_id: int, transcription_text: str, segments: list = None):
     try:
         with app.app_context():
             # Query the episode by ID
@@ -43,6 +43,7 @@ def update_transcription(episode_id: int, transcription_text: str):
             if episode:
                 # Update the transcription field with the provided transcription text
                 episode.transcription = transcription_text
+                episode.transcription_segments = segments
 
                 # Commit the changes to the database
                 db.session.commit()
@@ -0,0 +1,327 @@
+import os
+import json
+import logging
+
+import redis
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import Episode, Favourite, SharedPlaylist
+from app.dbrouting import primary_reads
+from app.api.azureops.redisclass import redis_client
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOP_EPISODES_LIMIT = 5
+LATEST_EPISODES_LIMIT = 8
+# The beat task rebuilds the snapshot every HOME_FEED_REFRESH_SECONDS; the TTL only matters if beat stops.
+HOME_FEED_TTL = int(os.getenv('HOME_FEED_TTL', 3600))
+HOME_FEED_REFRESH_SECONDS = int(os.getenv('HOME_FEED_REFRESH_SECONDS', 300))
+# Per-user favourite sets also expire, which bounds how long a set rebuilt during a concurrent write can be stale
+FAVOURITE_STATE_TTL = int(os.getenv('FAVOURITE_STATE_TTL', 86400))
+
+
+def load_top_episodes(session, limit: int = TOP_EPISODES_LIMIT) -> list:
+    """Most favourited episodes with their favourite count, read from the maintained counter."""
+    episodes = session.scalars(
+        select(Episode)
+        .where(Episode.favourite_count > 0)
+        .order_by(Episode.favourite_count.desc(), Episode.id.desc())
+        .limit(limit)
+    ).all()
+    top_episodes = []
+    for episode in episodes:
+        episode_dict = episode.to_dict()
+        episode_dict.update({'count': episode.favourite_count})
+        top_episodes.append(episode_dict)
+    return top_episodes
+
+
+def load_latest_episodes(session, limit: int = LATEST_EPISODES_LIMIT) -> list:
+    episodes = session.scalars(select(Episode).order_by(Episode.publish_date.desc()).limit(limit)).all()
+    return [episode.to_dict() for episode in episodes]
+
+
+def load_shared_playlists(session) -> list:
+    """Shared playlists with their playlist joined in, so to_dict() does not lazy load per row."""
+    shared_playlists = session.scalars(
+        select(SharedPlaylist).options(joinedload(SharedPlaylist.playlist))
+    ).unique().all()
+    return [shared_playlist.to_dict() for shared_playlist in shared_playlists]
+
+
+def load_favourite_state(session, user_id, episode_ids: list) -> dict:
+    """{episode_id: True if the user favourited it} for a page of episodes, in one query."""
+    favourited = set(session.scalars(
+        select(Favourite.episode_id).where(Favourite.user_id == user_id, Favourite.episode_id.in_(episode_ids))
+    )) if episode_ids else set()
+    return {episode_id: episode_id in favourited for episode_id in episode_ids}
+
+
+def load_home_feed(session) -> dict:
+    """
+    Everything the home page lists, in three queries however many favourites
+    and shared playlists exist.
+    """
+    return {
+        'top_episodes': load_top_episodes(session),
+        'latest_episodes': load_latest_episodes(session),
+        'shared_playlists': load_shared_playlists(session)
+    }
+
+
+class HomeFeedCache:
+    """
+    Precomputed home feed kept in Redis.
+
+    The snapshot holds the latest episodes and shared playlists. Favourite counts live in a sorted
+    set that is updated by ZINCRBY as favourites are committed, so the top list never needs the
+    aggregate query; the episodes it names are cached in a hash. Reading the feed touches the
+    database only when the cache is cold.
+    """
+
+    SNAPSHOT_KEY = 'homefeed:snapshot'
+    COUNTS_KEY = 'homefeed:favourite_counts'
+    EPISODES_KEY = 'homefeed:episodes'
+
+    def __init__(self, redis_client, ttl: int = HOME_FEED_TTL):
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    def get(self, session) -> dict:
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            pipeline.get(self.SNAPSHOT_KEY)
+            pipeline.zrevrange(self.COUNTS_KEY, 0, TOP_EPISODES_LIMIT - 1, withscores=True)
+            raw_snapshot, top = pipeline.execute()
+            if raw_snapshot is None:
+                return self.refresh(session)
+            feed = json.loads(raw_snapshot)
+            feed['top_episodes'] = self._top_episodes(session, top)
+            return feed
+        except redis.RedisError as e:
+            logger.warning(f'Home feed cache unavailable: {e}')
+            return load_home_feed(session)
+
+    def _top_episodes(self, session, top: list) -> list:
+        top = [(int(member), int(score)) for member, score in top if score > 0]
+        ids = [episode_id for episode_id, _ in top]
+        cached = self.redis_client.hmget(self.EPISODES_KEY, ids) if ids else []
+        episodes = {episode_id: json.loads(raw) for episode_id, raw in zip(ids, cached) if raw}
+
+        missing = [episode_id for episode_id in ids if episode_id not in episodes]
+        if missing:
+            loaded = {episode.id: episode.to_dict()
+                      for episode in session.scalars(select(Episode).where(Episode.id.in_(missing)))}
+            if loaded:
+                self.redis_client.hset(self.EPISODES_KEY,
+                                       mapping={episode_id: json.dumps(data) for episode_id, data in loaded.items()})
+            episodes.update(loaded)
+
+        return [dict(episodes[episode_id], count=count) for episode_id, count in top if episode_id in episodes]
+
+    def refresh(self, session) -> dict:
+        """Rebuild every part of the cache from the database and return the fresh feed."""
+        feed = load_home_feed(session)
+        counts = session.execute(
+            select(Episode.id, Episode.favourite_count).where(Episode.favourite_count > 0)
+        ).all()
+        episodes = {episode['episode_id']: json.dumps(episode)
+                    for episode in feed['top_episodes'] + feed['latest_episodes']}
+        snapshot = {'latest_episodes': feed['latest_episodes'], 'shared_playlists': feed['shared_playlists']}
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.delete(self.COUNTS_KEY, self.EPISODES_KEY)
+            if counts:
+                pipeline.zadd(self.COUNTS_KEY, {episode_id: count for episode_id, count in counts if episode_id})
+            if episodes:
+                pipeline.hset(self.EPISODES_KEY, mapping=episodes)
+            pipeline.set(self.SNAPSHOT_KEY, json.dumps(snapshot), ex=self.ttl)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Failed to store home feed: {e}')
+        return feed
+
+    def apply(self, changes: dict):
+        """Apply the favourite and episode changes of a committed transaction."""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for episode_id, delta in changes['favourites'].items():
+                if delta:
+                    pipeline.zincrby(self.COUNTS_KEY, delta, episode_id)
+            if changes['favourites']:
+                pipeline.zremrangebyscore(self.COUNTS_KEY, '-inf', 0)
+            if changes['deleted_episodes']:
+                pipeline.zrem(self.COUNTS_KEY, *changes['deleted_episodes'])
+            if changes['deleted_episodes'] or changes['updated_episodes']:
+                pipeline.hdel(self.EPISODES_KEY, *changes['deleted_episodes'], *changes['updated_episodes'])
+            if changes['new_episodes']:
+                pipeline.hset(self.EPISODES_KEY, mapping={data['episode_id']: json.dumps(data)
+                                                          for data in changes['new_episodes']})
+            pipeline.execute()
+
+            if changes['stale_snapshot']:
+                self.redis_client.delete(self.SNAPSHOT_KEY)
+            elif changes['new_episodes'] or changes['updated_episodes']:
+                self._update_latest(changes['new_episodes'], changes['updated_episodes'])
+        except redis.RedisError as e:
+            logger.warning(f'Failed to update home feed cache: {e}')
+
+    def _update_latest(self, new_episodes: list, updated_episodes: set):
+        raw_snapshot = self.redis_client.get(self.SNAPSHOT_KEY)
+        if raw_snapshot is None:
+            return
+        snapshot = json.loads(raw_snapshot)
+        latest = snapshot['latest_episodes']
+        if any(episode['episode_id'] in updated_episodes for episode in latest):
+            # an edited episode is on the page; let the next read rebuild it
+            self.redis_client.delete(self.SNAPSHOT_KEY)
+            return
+        latest = sorted(new_episodes + latest, key=lambda episode: episode['publish_date'], reverse=True)
+        snapshot['latest_episodes'] = latest[:LATEST_EPISODES_LIMIT]
+        self.redis_client.set(self.SNAPSHOT_KEY, json.dumps(snapshot), keepttl=True)
+
+
+home_feed_cache = HomeFeedCache(redis_client)
+
+
+def _pending_changes(session) -> dict:
+    return session.info.setdefault('home_feed_changes', {
+        'favourites': {}, 'new_episodes': [], 'updated_episodes': set(), 'deleted_episodes': set(),
+        'stale_snapshot': False
+    })
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_home_feed_changes(session, flush_context):
+    changes = _pending_changes(session)
+    for instance in session.new:
+        if isinstance(instance, Favourite) and instance.episode_id:
+            changes['favourites'][instance.episode_id] = changes['favourites'].get(instance.episode_id, 0) + 1
+        elif isinstance(instance, Episode):
+            if 'publish_date' in inspect(instance).unloaded:
+                changes['stale_snapshot'] = True
+            else:
+                changes['new_episodes'].append(instance.to_dict())
+        elif isinstance(instance, SharedPlaylist):
+            changes['stale_snapshot'] = True
+    for instance in session.deleted:
+        if isinstance(instance, Favourite) and instance.episode_id:
+            changes['favourites'][instance.episode_id] = changes['favourites'].get(instance.episode_id, 0) - 1
+        elif isinstance(instance, Episode):
+            changes['deleted_episodes'].add(instance.id)
+            changes['stale_snapshot'] = True
+        elif isinstance(instance, SharedPlaylist):
+            changes['stale_snapshot'] = True
+    for instance in session.dirty:
+        if isinstance(instance, Episode) and session.is_modified(instance, include_collections=False):
+            changes['updated_episodes'].add(instance.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_home_feed_changes(session):
+    if session.in_nested_transaction():
+        return
+    changes = session.info.pop('home_feed_changes', None)
+    if changes and any(changes.values()):
+        home_feed_cache.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_home_feed_changes(session, previous_transaction):
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop('home_feed_changes', None)
+
+
+class FavouriteStateCache:
+    """
+    The episode ids each user has favourited, as a Redis set per user, so a listing page answers
+    "did I favourite this?" for all its episodes with one SMISMEMBER.
+
+    A set is only trusted when it holds the SENTINEL member, which is written when the set is
+    loaded from the database. Committed favourites are added and removed blindly; on a set that
+    was never loaded that leaves a partial set without the sentinel, which the next read replaces.
+    """
+
+    KEY = 'favourites:user:{}'
+    SENTINEL = 0
+
+    def __init__(self, redis_client, ttl: int = FAVOURITE_STATE_TTL):
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    def get(self, session, user_id, episode_ids: list) -> dict:
+        """{episode_id: True if the user favourited it}, like load_favourite_state."""
+        if not episode_ids:
+            return {}
+        key = self.KEY.format(user_id)
+        try:
+            loaded, *members = self.redis_client.smismember(key, [self.SENTINEL, *episode_ids])
+            if loaded:
+                return {episode_id: bool(member) for episode_id, member in zip(episode_ids, members)}
+            favourited = self.load(session, user_id)
+            return {episode_id: episode_id in favourited for episode_id in episode_ids}
+        except redis.RedisError as e:
+            logger.warning(f'Favourite state cache unavailable: {e}')
+            return load_favourite_state(session, user_id, episode_ids)
+
+    def load(self, session, user_id) -> set:
+        """Replace the user's set with their favourites from the database."""
+        # the set lives for FAVOURITE_STATE_TTL, so it is never loaded from a lagging replica
+        with primary_reads(session):
+            favourited = set(session.scalars(
+                select(Favourite.episode_id).where(Favourite.user_id == user_id, Favourite.episode_id.isnot(None))
+            ))
+        key = self.KEY.format(user_id)
+        pipeline = self.redis_client.pipeline()
+        pipeline.delete(key)
+        pipeline.sadd(key, self.SENTINEL, *favourited)
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+        return favourited
+
+    def apply(self, changes: dict):
+        """Apply {(user_id, episode_id): delta} from a committed transaction."""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for (user_id, episode_id), delta in changes.items():
+                key = self.KEY.format(user_id)
+                if delta > 0:
+                    pipeline.sadd(key, episode_id)
+                elif delta < 0:
+                    pipeline.srem(key, episode_id)
+                pipeline.expire(key, self.ttl)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Failed to update favourite state cache: {e}')
+
+
+favourite_state_cache = FavouriteStateCache(redis_client)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_favourite_state_changes(session, flush_context):
+    changes = session.info.setdefault('favourite_state_changes', {})
+    for instances, delta in ((session.new, 1), (session.deleted, -1)):
+        for instance in instances:
+            if isinstance(instance, Favourite) and instance.episode_id:
+                key = (instance.user_id, instance.episode_id)
+                changes[key] = changes.get(key, 0) + delta
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_favourite_state_changes(session):
+    if session.in_nested_transaction():
+        return
+    changes = session.info.pop('favourite_state_changes', None)
+    if changes and any(changes.values()):
+        favourite_state_cache.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_favourite_state_changes(session, previous_transaction):
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop('favourite_state_changes', None)
@@ -5,21 +5,21 @@ from flask import Blueprint, render_template, request, url_for, session, redirec
 from flask_login import current_user, logout_user,login_required
 import logging
 from dotenv import load_dotenv
-from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.utils import secure_filename
 from datetime import datetime
-from difflib import SequenceMatcher
 
 from app.api.auth import login_user_
 from app.api.azureops.azureapi import azure_storage_instance
 from app.api.oauth.oauth import OauthFacade
 from app.model_utils import Categories,categories_details
+from app.views.feed import home_feed_cache, favourite_state_cache
+from app.search import get_search_backend
+from app.api.playlistcontents import load_playlist_contents
 from app.views.helpers import get_authentication_links, PlaylistForm, EpisodeForm,PodcastForm,EmailForm, PreferencesForm, EpisodeUpdateForm, PodcastUpdateForm
 
-from app.models import Podcast, Episode, SharedPlaylist, db, Playlist, PlaylistItem, PlaylistPlaylistitem, User, \
+from app.models import Podcast, Episode, db, Playlist, PlaylistItem, PlaylistPlaylistitem, User, \
     Favourite
-from app.api.azureops.azureclass import AzureBlobStorage
 from task_singleton import TaskInfoSingleton
 
 load_dotenv()
@@ -29,7 +29,6 @@ GITHUB_CLIENT_SECRET = os.getenv('GITHUB_SECRET_KEY')
 connection_string = os.getenv('AZURE_CONNECTION_STRING')
 container_name = os.getenv('AZURE_CONTAINER_NAME')
 github_client_id = os.getenv('GITHUB_ID')
-azure_storage_instance = AzureBlobStorage(connection_string)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -57,33 +56,10 @@ def index():
     shared_playlists = []
     email_form = EmailForm()
     try:
-
-        top_episodes = (
-            db.session.query(
-                Favourite.episode_id, func.count(Favourite.user_id).label('favourite_count')
-            )
-            .group_by(Favourite.episode_id)
-            .order_by(func.count(Favourite.user_id).desc())
-            .limit(5)  # Get the top 5
-            .all()
-        )
-
-        # Convert the result to a list of dictionaries
-        most_popular_episodes = []
-        for episode_id, count in top_episodes:
-            episode = Episode.query.filter_by(id=episode_id).first()
-            if episode:
-                episode_dict = episode.to_dict()
-                episode_dict.update({'count': count})
-                most_popular_episodes.append(episode_dict)
-
-
-        latest_episodes = Episode.query.order_by(Episode.publish_date.desc()).limit(8).all()
-        shared_playlists = SharedPlaylist.query.all()
-
-        latest_episodes = [episode.to_dict() for episode in latest_episodes]
-
-        shared_playlists = [shared_playlist.to_dict() for shared_playlist in shared_playlists]
+        feed = home_feed_cache.get(db.session)
+        most_popular_episodes = feed['top_episodes']
+        latest_episodes = feed['latest_episodes']
+        shared_playlists = feed['shared_playlists']
     except Exception as e:
         logger.error(f"Failed to retrieve top podcasts: {str(e)}")
 
@@ -102,6 +78,7 @@ def index():
 @views_bp.route('/create-podcast',methods=['GET','POST'])
 @login_required
 def create_podcast():
+    from tasks.ingestservice import ingest_podcast_image, spool_file, start_ingestion, remove_spooled
     form = PodcastForm()
     form.category.choices = [(category.name, category.name.replace('_', ' ').title()) for category in Categories]
     email_form = EmailForm()
@@ -111,61 +88,52 @@ def create_podcast():
         description = form.description.data
         category = form.category.data
         duration = form.duration.data
-        if form.image_file.data:
-            image_file = form.image_file.data
-            original_filename = secure_filename(image_file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{original_filename}"
-            file_path = os.path.join('/tmp', unique_filename)
-
-            image_file.save(file_path)
-
-            blob_name = f"images/{unique_filename}"
-            try:
-                image_url = azure_storage_instance.upload_blob(container_name, blob_name, file_path)
-            except Exception as e:
-                flash(f"Error uploading image: {e}", "error")
-                return render_template('createpodcast.html', form=form)
-            # Removes uploaded image
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        try:
+            new_podcast = Podcast(
+                title=title,
+                description=description,
+                category=category,  # find a way to make it accept multi values,probably make a category table
+                publisher=current_user.username,
+                duration=duration if duration else None,
+                user_id = current_user.id
 
+            )
 
+            website_hostname = os.getenv('WEBSITE_HOSTNAME')
+            db.session.add(new_podcast)
+            db.session.flush()
+            new_podcast.feed_url = f"{website_hostname}/podcasts/{new_podcast.id}/feed"
+            new_podcast.validate_urls()
+            db.session.commit()
+            logger.info("Podcast created successfully!")
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error saving podcast: {e} rolled database ")
+            flash(f"Error saving podcast: {e}", "error")
+            return render_template('createpodcast.html', form=form,email_form=email_form)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f'Encountered error: {e}')
+            flash("An unexpected error occurred. Please try again.", "error")
+            return render_template('createpodcast.html', form=form,email_form=email_form)
 
+        # The image is uploaded by ingest_podcast_image and set on the podcast once it is in storage
+        image_queued = True
+        if form.image_file.data:
+            image_path = None
             try:
-                new_podcast = Podcast(
-                    title=title,
-                    description=description,
-                    image_url=image_url if image_url else None,
-                    category=category,  # find a way to make it accept multi values,probably make a category table
-                    publisher=current_user.username,
-                    duration=duration if duration else None,
-                    user_id = current_user.id
-
-                )
-
-                website_hostname = os.getenv('WEBSITE_HOSTNAME')
-                db.session.add(new_podcast)
-                db.session.flush()
-                new_podcast.feed_url = f"{website_hostname}/podcasts/{new_podcast.id}/feed"
-                new_podcast.validate_urls()
-                db.session.commit()
-                logger.info("Podcast created successfully!")
-                flash('Podcast created successfully!', 'success')
-                return redirect(url_for('views.podcast'))
-            except SQLAlchemyError as e:
-                db.session.rollback()
-                logger.error(f"Error saving episode: {e} rolled database ")
-                azure_storage_instance.delete_blob(container_name, blob_name)
-                logger.error('deleted data from azure')
-                flash(f"Error saving episode: {e}", "error")
+                image_path, unique_filename = spool_file(form.image_file.data)
+                start_ingestion(ingest_podcast_image, user_id=current_user.id, podcast_id=new_podcast.id,
+                                image_path=image_path, image_blob=f"images/{unique_filename}")
             except Exception as e:
-                db.session.rollback()
-                logger.error(f"Error saving episode: {e} rolled database ")
-                azure_storage_instance.delete_blob(container_name, blob_name)
-                logger.error('deleted data from azure')
-                logger.error(f'Encountered error: {e}')
-                flash("An unexpected error occurred. Please try again.", "error")
-            return render_template('createpodcast.html', form=form,email_form=email_form)
+                remove_spooled(image_path)
+                logger.error(f"Error queueing podcast image: {e}")
+                flash(f"Podcast created, but its image could not be uploaded: {e}", "warning")
+                image_queued = False
+
+        if image_queued:
+            flash('Podcast created successfully!', 'success')
+        return redirect(url_for('views.podcast'))
 
     return render_template('createpodcast.html', form=form,email_form=email_form)
 
@@ -173,7 +141,7 @@ def create_podcast():
 @views_bp.route('/create_episode', methods=['GET', 'POST'])
 @login_required
 def create_episode():
-    from tasks.transcriptionservice import transcribe
+    from tasks.ingestservice import ingest_episode, spool_file, start_ingestion, remove_spooled
     form = EpisodeForm()
     email_form = EmailForm()
     # Fetch the list of podcasts that belong to the current user
@@ -181,92 +149,36 @@ def create_episode():
 
     # Populate the podcast dropdown with podcast titles and IDs
     form.podcast_id.choices = [(podcast.id, podcast.title) for podcast in podcasts]
-    image_url = None
-    audio_url = None
-    audio_file_path = None
-    blob_name = None
     # form validation
     if form.validate_on_submit():
 
         logging.info("Form is valid, processing data")
-        title = form.title.data
-        description = form.description.data
-        podcast_id = form.podcast_id.data
-        publish_date = datetime.now()
-
-        # Process the image file upload (if any)
-        if form.image_file.data:
-            image_file = form.image_file.data
-            original_filename = secure_filename(image_file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{original_filename}"
-            file_path = os.path.join('/tmp', unique_filename)
-
-            image_file.save(file_path)  # Save the file temporarily
-
-            # Upload the image to Azure Blob Storage
-            blob_name = f"images/{unique_filename}"
-            try:
-                image_url = azure_storage_instance.upload_blob(container_name, blob_name, file_path)
-            except Exception as e:
-                flash(f"Error uploading image: {e}", "error")
-                return render_template('createepisodes.html', form=form, podcasts=podcasts)
-
-            # Clean up the temporary file after upload
-            if os.path.exists(file_path):
-                os.remove(file_path)
-
-        if form.audio_file.data:
-            audio_file = form.audio_file.data
-            original_filename = secure_filename(audio_file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{original_filename}"
-            audio_file_path = os.path.join('/tmp', unique_filename)
-
-            audio_file.save(audio_file_path)
-
-            blob_name = f"audio/{unique_filename}"
-            try:
-                audio_url = azure_storage_instance.upload_blob(container_name, blob_name, audio_file_path)
-                logging.info(f"Audio uploaded successfully: {audio_url}")
-            except Exception as e:
-                flash(f"Error uploading audio: {e}", "error")
-                logging.error(f"Error uploading audio: {e}")
-                return render_template('createepisodes.html', form=form, podcasts=podcasts)
-
-
-
-
+        ingestion = {
+            'user_id': current_user.id,
+            'title': form.title.data,
+            'description': form.description.data,
+            'duration': form.duration.data,
+            'podcast_id': form.podcast_id.data,
+            'publish_date': datetime.now().isoformat()
+        }
+
+        # Spool the files; uploading, the DB insert and transcription run in ingest_episode
         try:
-            # Create a new episode record
-            new_episode = Episode(
-                title=title,
-                description=description,
-                image_url=image_url if image_url else None,
-                audio_url=audio_url,
-                podcast_id=podcast_id,
-                publish_date=publish_date
-            )
-
-            db.session.add(new_episode)
-            db.session.commit()
-            logging.info("Episode created successfully!")
-            flash('Episode created successfully!', 'success')
-
-            # transcription asynchronous
-            try:
-                if audio_file_path and new_episode.id:
-                    task = transcribe.apply_async(args=[audio_file_path,new_episode.id,True])
-                    task_id = task.id
-                    task_info_singleton = TaskInfoSingleton()
-                    task_info_singleton.set_task_info(task_id, 'transcription')
-                    logger.info("Transcription started asynchronously.")
-            except Exception as e:
-                logger.error(f"Failed to start transcription: {e}")
-
-            return redirect(url_for('views.episode',podcast_id=podcast_id))
+            if form.image_file.data:
+                image_path, unique_filename = spool_file(form.image_file.data)
+                ingestion.update(image_path=image_path, image_blob=f"images/{unique_filename}")
+
+            audio_path, unique_filename = spool_file(form.audio_file.data)
+            ingestion.update(audio_path=audio_path, audio_blob=f"audio/{unique_filename}")
+
+            ingestion_id = start_ingestion(ingest_episode, **ingestion)
+            logger.info(f"Episode ingestion {ingestion_id} queued")
+            flash('Episode received! It will appear once processing finishes.', 'success')
+            # the episode list polls /api/v1/ingestions/<ingestion_id> and reloads when it is done
+            return redirect(url_for('views.episode', podcast_id=ingestion['podcast_id'], ingestion_id=ingestion_id))
         except Exception as e:
-            db.session.rollback()
-            azure_storage_instance.delete_blob(container_name, blob_name)
-            logging.error(f"Error saving episode: {e}")
+            remove_spooled(ingestion.get('image_path'), ingestion.get('audio_path'))
+            logging.error(f"Error queueing episode: {e}")
             flash(f"Error saving episode: {e}", "error")
             return render_template('createepisodes.html', form=form, podcasts=podcasts,email_form=email_form)
 
@@ -451,9 +363,8 @@ def episode():
         episodes = pagination.items
 
         playlists = Playlist.query.filter_by(user_id=current_user.id).all()
-        favourite_counts = {i.id: len(i.favourites) for i in episodes}
-        favourite_state = {i.id: True if any(fav.user_id == current_user.id for fav in i.favourites) else False for i in
-                           episodes}
+        favourite_counts = {i.id: i.favourite_count for i in episodes}
+        favourite_state = favourite_state_cache.get(db.session, current_user.id, [i.id for i in episodes])
 
         return render_template(
             'episodeslist.html',
@@ -463,6 +374,7 @@ def episode():
             podcast_id=podcast_id,
             favourite_counts=favourite_counts,
             favourite_state=favourite_state,
+            ingestion_id=request.args.get('ingestion_id'),
             email_form=email_form
 
         )
@@ -1050,19 +962,13 @@ def open_playlist(playlist_id):
         playlist = Playlist.query.filter_by(id=playlist_id, user_id=current_user.id).first()
         if playlist:
             print(playlist.id)
-            playlist_playlist_item=PlaylistPlaylistitem.query.filter_by(playlist_id=playlist.id).all()
-            playlist_items_ids = [i.to_dict().get('playlist_item_id') for i in playlist_playlist_item]
-            for i in playlist_items_ids:
-                playlist_item = PlaylistItem.query.filter_by(id = i).first()
-                playlist_items.append(playlist_item)
-            if title_search:
-                print(title_search)
-                playlist_items = [a.episode for a in playlist_items if isinstance(a.episode.title, str) and SequenceMatcher(None, a.episode.title.upper(), title_search.upper()).ratio() > 0.5]
-            else:
-                playlist_items = [a.episode for a in playlist_items]
-            favourite_counts = {i.id:len(i.favourites) for i in playlist_items}
-            favourite_state = {i.id: True if any(fav.user_id == current_user.id for fav in i.favourites) else False for i in
-                           playlist_items}
+            # the playlist's episodes and favourite state in one query; a title search is matched
+            # by trigram similarity in the same query
+            where = get_search_backend().similar(Episode.title, title_search) if title_search else None
+            contents = load_playlist_contents(db.session, playlist.id, current_user.id, where=where)
+            playlist_items = [entry['episode'] for entry in contents if entry['episode']]
+            favourite_counts = {i.id: i.favourite_count for i in playlist_items}
+            favourite_state = {entry['episode'].id: entry['favourited'] for entry in contents if entry['episode']}
 
         if not playlist:
             flash('Playlist not found.', 'error')
@@ -1719,8 +1625,8 @@ def get_episode_favourites():
         return jsonify({'status': 'error', 'message': 'Episode ID is required', 'data': None}), 400
 
     try:
-        # Count favourites for the episode
-        favourite_count = Favourite.query.filter_by(episode_id=episode_id).count()
+        # Read the maintained counter instead of counting the favourites
+        favourite_count = db.session.query(Episode.favourite_count).filter_by(id=episode_id).scalar() or 0
 
         return jsonify({'status': 'success', 'message': 'Retrieved number of likes', 'data': favourite_count}), 200
     except SQLAlchemyError as e:
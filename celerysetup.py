@@ -1,3 +1,4 @@
+import os
 from celery import Celery
 from flask import Flask
 
@@ -8,6 +9,17 @@ def make_celery(app: Flask):
         backend=app.config['CELERY_RESULT_BACKEND']
     )
     celery.conf.update(app.config)
+    # app.config holds the old CELERY_* setting names, and celery refuses to mix old and new names
+    celery.conf.CELERYBEAT_SCHEDULE = {
+        'refresh-home-feed': {
+            'task': 'tasks.feedservice.refresh_home_feed',
+            'schedule': int(os.getenv('HOME_FEED_REFRESH_SECONDS', 300)),
+        },
+        'reconcile-counters': {
+            'task': 'tasks.counterservice.reconcile_counters',
+            'schedule': int(os.getenv('COUNTER_RECONCILE_SECONDS', 3600)),
+        },
+    }
 
 
     return celery
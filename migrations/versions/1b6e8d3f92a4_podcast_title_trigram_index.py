@@ -0,0 +1,31 @@
+"""podcast title trigram index
+
+Revision ID: 1b6e8d3f92a4
+Revises: f0c83a5d14b9
+Create Date: 2026-10-18 21:03:17.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b6e8d3f92a4'
+down_revision = 'f0c83a5d14b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lets the /podcasts ?title= filter (ILIKE '%term%') use an index; other databases scan
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_podcast_title_trgm', 'podcast', ['title'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_podcast_title_trgm', table_name='podcast')
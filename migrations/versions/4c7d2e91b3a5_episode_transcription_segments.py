@@ -0,0 +1,26 @@
+"""episode transcription segments
+
+Revision ID: 4c7d2e91b3a5
+Revises: aabeddf9981e
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c7d2e91b3a5'
+down_revision = 'aabeddf9981e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('episode', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('transcription_segments', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('episode', schema=None) as batch_op:
+        batch_op.drop_column('transcription_segments')
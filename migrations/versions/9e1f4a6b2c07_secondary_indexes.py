@@ -0,0 +1,47 @@
+"""secondary indexes
+
+Revision ID: 9e1f4a6b2c07
+Revises: 4c7d2e91b3a5
+Create Date: 2026-10-18 14:03:27.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1f4a6b2c07'
+down_revision = '4c7d2e91b3a5'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns). Composite primary keys already cover lookups on their first column.
+INDEXES = [
+    ('ix_podcast_user_id', 'podcast', ['user_id']),
+    ('ix_podcast_publish_date', 'podcast', ['publish_date']),
+    ('ix_podcast_category_publish_date', 'podcast', ['category', 'publish_date']),
+    ('ix_episode_podcast_id_publish_date', 'episode', ['podcast_id', 'publish_date']),
+    ('ix_episode_publish_date', 'episode', ['publish_date']),
+    ('ix_subscription_podcast_id_user_id', 'subscription', ['podcast_id', 'user_id']),
+    ('ix_favourite_episode_id_user_id', 'favourite', ['episode_id', 'user_id']),
+    ('ix_favourite_podcast_id', 'favourite', ['podcast_id']),
+    ('ix_rating_podcast_id', 'rating', ['podcast_id']),
+    ('ix_rating_episode_id', 'rating', ['episode_id']),
+    ('ix_download_podcast_id', 'download', ['podcast_id']),
+    ('ix_download_episode_id', 'download', ['episode_id']),
+    ('ix_playlist_user_id', 'playlist', ['user_id']),
+    ('ix_playlistitem_podcast_id', 'playlistitem', ['podcast_id']),
+    ('ix_playlistitem_episode_id', 'playlistitem', ['episode_id']),
+    ('ix_shared_playlist_playlist_id', 'shared_playlist', ['playlist_id']),
+    ('ix_playlist_playlistitem_playlist_item_id', 'playlist_playlistitem', ['playlist_item_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
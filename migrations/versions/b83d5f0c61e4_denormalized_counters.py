@@ -0,0 +1,52 @@
+"""denormalized counters
+
+Revision ID: b83d5f0c61e4
+Revises: 9e1f4a6b2c07
+Create Date: 2026-10-18 15:20:11.403127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83d5f0c61e4'
+down_revision = '9e1f4a6b2c07'
+branch_labels = None
+depends_on = None
+
+COUNTERS = {
+    'podcast': ['subscriber_count', 'favourite_count', 'rating_sum', 'rating_count'],
+    'episode': ['favourite_count', 'rating_sum', 'rating_count'],
+}
+
+
+def upgrade():
+    for table, columns in COUNTERS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.add_column(sa.Column(column, sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_episode_favourite_count', 'episode', ['favourite_count'], unique=False)
+
+    # backfill from the rows being counted
+    op.execute("""
+        UPDATE podcast SET
+            subscriber_count = (SELECT count(*) FROM subscription WHERE subscription.podcast_id = podcast.id),
+            favourite_count = (SELECT count(*) FROM favourite WHERE favourite.podcast_id = podcast.id),
+            rating_count = (SELECT count(*) FROM rating WHERE rating.podcast_id = podcast.id),
+            rating_sum = (SELECT coalesce(sum(rating.rating), 0) FROM rating WHERE rating.podcast_id = podcast.id)
+    """)
+    op.execute("""
+        UPDATE episode SET
+            favourite_count = (SELECT count(*) FROM favourite WHERE favourite.episode_id = episode.id),
+            rating_count = (SELECT count(*) FROM rating WHERE rating.episode_id = episode.id),
+            rating_sum = (SELECT coalesce(sum(rating.rating), 0) FROM rating WHERE rating.episode_id = episode.id)
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_episode_favourite_count', table_name='episode')
+    for table, columns in COUNTERS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in reversed(columns):
+                batch_op.drop_column(column)
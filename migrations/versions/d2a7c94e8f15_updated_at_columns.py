@@ -0,0 +1,31 @@
+"""updated_at columns
+
+Revision ID: d2a7c94e8f15
+Revises: b83d5f0c61e4
+Create Date: 2026-10-18 16:41:52.730964
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c94e8f15'
+down_revision = 'b83d5f0c61e4'
+branch_labels = None
+depends_on = None
+
+TABLES = ['podcast', 'episode', 'playlist']
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'),
+                                          nullable=False))
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
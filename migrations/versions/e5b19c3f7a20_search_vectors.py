@@ -0,0 +1,48 @@
+"""full-text search vectors
+
+Revision ID: e5b19c3f7a20
+Revises: d2a7c94e8f15
+Create Date: 2026-10-18 18:05:13.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b19c3f7a20'
+down_revision = 'd2a7c94e8f15'
+branch_labels = None
+depends_on = None
+
+# Generated columns, so Postgres recomputes them on every insert and update, including the
+# transcription written by update_transcription. Weights: title A, description B, transcription C.
+VECTORS = {
+    'podcast': """
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    """,
+    'episode': """
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(transcription, '')), 'C')
+    """,
+}
+
+
+def upgrade():
+    # Other databases use the in-process index in app/search.py
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, vector in VECTORS.items():
+        op.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED')
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in VECTORS:
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('search_vector')
@@ -0,0 +1,31 @@
+"""episode title trigram index
+
+Revision ID: f0c83a5d14b9
+Revises: e5b19c3f7a20
+Create Date: 2026-10-18 19:12:40.118377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f0c83a5d14b9'
+down_revision = 'e5b19c3f7a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Other databases compare trigrams in Python, see LocalSearchBackend.similar
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_episode_title_trgm', 'episode', ['title'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_episode_title_trgm', table_name='episode')
@@ -61,7 +61,7 @@ def task_success_handler(sender=None, result=None, task_id=None, **kwargs):
             transcription_text = result.get('text')
             print(episode_id,transcription_text)
             if transcription_text and episode_id:
-                update_transcription(int(episode_id),transcription_text)
+                update_transcription(int(episode_id),transcription_text,result.get('segments'))
 
 
         logging.info(f"Task {task_id} of type '{task_name}' succeeded.")
@@ -26,10 +26,10 @@ class TaskInfoSingleton:
         """Initialize the Redis client."""
         self._redis_client = redis.StrictRedis(host=host, port=port,password=redis_password, decode_responses=True)
         logger.info('redis initialized')
-    def set_value(self, key: str, value: Any):
-        """Set a key-value pair in Redis."""
+    def set_value(self, key: str, value: Any, ex: int = None):
+        """Set a key-value pair in Redis, optionally expiring after ex seconds."""
         if isinstance(value, (str, int, float, bytes)):
-            self._redis_client.set(key, value)
+            self._redis_client.set(key, value, ex=ex)
         else:
             raise TypeError("Value must be a str, int, float, or bytes.")
 
@@ -6,7 +6,7 @@ celery = make_celery(app)
 
 # Import all task modules to ensure tasks are registered
 
-from tasks import testlongtask,emailservice,transcriptionservice
+from tasks import testlongtask,emailservice,transcriptionservice,ingestservice,feedservice,counterservice
 import signals.task_signals
 
 '''
@@ -0,0 +1,208 @@
+import os
+import wave
+import struct
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# kbps, indexed by [mpeg version is 1][layer 3 bitrate index]
+MP3_BITRATES = {
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def probe_duration(path: str):
+    """
+    Return the duration of a wav, mp3 or ogg file in whole seconds, or None when the
+    format is not recognised. Only headers are read, never the whole file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == '.wav':
+            return wav_duration(path)
+        if extension == '.mp3':
+            return mp3_duration(path)
+        if extension == '.ogg':
+            return ogg_duration(path)
+    except (OSError, EOFError, ValueError, wave.Error, struct.error) as e:
+        logger.warning(f"Could not probe duration of {path}: {e}")
+    return None
+
+
+def wav_duration(path: str) -> int:
+    with wave.open(path, 'rb') as f:
+        return round(f.getnframes() / f.getframerate())
+
+
+def skip_id3(f) -> int:
+    """Move past an ID3v2 tag, if any, and return the offset of the first audio byte."""
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        offset = 10 + size + (10 if header[5] & 0x10 else 0)
+    else:
+        offset = 0
+    f.seek(offset)
+    return offset
+
+
+def parse_mp3_header(header: bytes):
+    """
+    Decode a 4 byte MPEG audio layer III frame header.
+    Returns (frame_length, samples_per_frame, sample_rate, bitrate_kbps) or None.
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer != 1 or sample_rate_index == 3 or bitrate_index in (0, 15):
+        return None
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[mpeg1][bitrate_index]
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if mpeg1 else 576
+    frame_length = (samples_per_frame // 8) * bitrate * 1000 // sample_rate + padding
+    return frame_length, samples_per_frame, sample_rate, bitrate
+
+
+def mp3_duration(path: str) -> int:
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        audio_start = skip_id3(f)
+        frame = f.read(4096)
+    header = parse_mp3_header(frame[:4])
+    if header is None:
+        raise ValueError('no mp3 frame at start of audio data')
+    _, samples_per_frame, sample_rate, bitrate = header
+
+    # VBR files carry the total frame count in a Xing/Info header inside the first frame
+    for tag in (b'Xing', b'Info'):
+        position = frame.find(tag, 4, 64)
+        if position != -1 and struct.unpack('>I', frame[position + 4:position + 8])[0] & 0x01:
+            frames = struct.unpack('>I', frame[position + 8:position + 12])[0]
+            return round(frames * samples_per_frame / sample_rate)
+
+    return round((size - audio_start) * 8 / (bitrate * 1000))
+
+
+def ogg_duration(path: str) -> int:
+    """Duration from the granule position of the last Ogg page and the codec sample rate."""
+    with open(path, 'rb') as f:
+        first_page = f.read(128)
+        if first_page[:4] != b'OggS':
+            raise ValueError('not an ogg file')
+        packet = first_page[28:]
+        if packet[:7] == b'\x01vorbis':
+            sample_rate = struct.unpack('<I', packet[12:16])[0]
+        elif packet[:8] == b'OpusHead':
+            sample_rate = 48000
+        else:
+            raise ValueError('unsupported ogg codec')
+
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    last_page = tail.rfind(b'OggS')
+    if last_page == -1:
+        raise ValueError('no ogg page found at end of file')
+    granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+    return round(granule / sample_rate)
+
+
+def wav_layout(header: bytes) -> dict:
+    """
+    Locate the fmt and data chunks in the first bytes of a wav file.
+    Returns the PCM parameters plus the offset and size of the sample data.
+    """
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        raise ValueError('not a wav file')
+    layout = {}
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id, chunk_size = header[offset:offset + 4], struct.unpack('<I', header[offset + 4:offset + 8])[0]
+        if chunk_id == b'fmt ':
+            _, channels, sample_rate, byte_rate, block_align, bits = struct.unpack(
+                '<HHIIHH', header[offset + 8:offset + 24])
+            layout.update(channels=channels, sample_rate=sample_rate, byte_rate=byte_rate,
+                          block_align=block_align, bits_per_sample=bits)
+        elif chunk_id == b'data':
+            if 'sample_rate' not in layout:
+                break
+            layout.update(data_offset=offset + 8, data_size=chunk_size)
+            return layout
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise ValueError('wav data chunk not found in header')
+
+
+def wav_header(channels: int, sample_rate: int, bits_per_sample: int, data_size: int) -> bytes:
+    """Canonical 44 byte PCM wav header for data_size bytes of samples."""
+    block_align = channels * bits_per_sample // 8
+    return b'RIFF' + struct.pack('<I', 36 + data_size) + b'WAVE' + \
+        b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate, sample_rate * block_align, block_align,
+                              bits_per_sample) + \
+        b'data' + struct.pack('<I', data_size)
+
+
+def mp3_second_marks(chunks):
+    """
+    Scan an mp3 stream frame by frame without holding more than one chunk in memory.
+    Returns (marks, end_offset, duration) where marks[i] is the byte offset of the first
+    frame starting at or after second i, so every cut falls on a frame boundary.
+    """
+    buffer = bytearray()
+    base = 0
+    position = None
+    elapsed = 0.0
+    marks = []
+    for chunk in chunks:
+        buffer.extend(chunk)
+        if position is None:
+            if len(buffer) < 10:
+                continue
+            position = 0
+            if buffer[:3] == b'ID3':
+                size = (buffer[6] << 21) | (buffer[7] << 14) | (buffer[8] << 7) | buffer[9]
+                position = 10 + size + (10 if buffer[5] & 0x10 else 0)
+        while position - base + 4 <= len(buffer):
+            relative = position - base
+            header = parse_mp3_header(bytes(buffer[relative:relative + 4]))
+            if header is None:
+                position += 1
+                continue
+            frame_length, samples_per_frame, sample_rate, _ = header
+            while len(marks) <= elapsed:
+                marks.append(position)
+            elapsed += samples_per_frame / sample_rate
+            position += frame_length
+        consumed = min(position - base, len(buffer))
+        del buffer[:consumed]
+        base += consumed
+    if not marks:
+        raise ValueError('no mp3 frames found')
+    return marks, min(position, base + len(buffer)), elapsed
+
+
+def plan_windows(offset_at, end_offset: int, duration: float, window: int, overlap: int) -> list:
+    """
+    Split audio into windows of `window` seconds that overlap by `overlap` seconds.
+    offset_at(second) maps a whole second to the byte offset where it starts.
+    Each window is {'index', 'start', 'end', 'start_byte', 'end_byte'} with inclusive byte ranges.
+    """
+    step = max(1, window - overlap)
+    windows = []
+    start = 0
+    while True:
+        stop = start + window
+        last = stop >= duration
+        end_byte = end_offset - 1 if last else offset_at(stop) - 1
+        windows.append({'index': len(windows), 'start': start, 'end': round(duration, 3) if last else stop,
+                        'start_byte': offset_at(start), 'end_byte': end_byte})
+        if last:
+            return windows
+        start += step
@@ -0,0 +1,25 @@
+from tasks import celery
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@celery.task
+def reconcile_counters():
+    """Repair drift in the denormalized counters; scheduled by celery beat every COUNTER_RECONCILE_SECONDS."""
+    from app import app
+    from app.models import db
+    from app.models import reconcile_counters as reconcile
+
+    with app.app_context():
+        try:
+            updated = reconcile(db.session)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    if updated:
+        logger.warning(f"Reconciled counters on {updated} rows")
+    else:
+        logger.info("Counters in sync")
@@ -0,0 +1,17 @@
+from tasks import celery
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@celery.task
+def refresh_home_feed():
+    """Rebuild the cached home feed; scheduled by celery beat every HOME_FEED_REFRESH_SECONDS."""
+    from app import app
+    from app.models import db
+    from app.views.feed import home_feed_cache
+
+    with app.app_context():
+        feed = home_feed_cache.refresh(db.session)
+    logger.info(f"Home feed refreshed: {len(feed['top_episodes'])} top, {len(feed['latest_episodes'])} latest")
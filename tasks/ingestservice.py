@@ -0,0 +1,209 @@
+import os
+import json
+import uuid
+import logging
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+
+from tasks import celery
+from tasks.audioutils import probe_duration
+from task_singleton import TaskInfoSingleton
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+container_name = os.getenv('AZURE_CONTAINER_NAME')
+
+# Must be a directory shared by the web and celery-worker containers.
+INGEST_SPOOL_DIR = os.getenv('INGEST_SPOOL_DIR', '/tmp/ingest')
+INGESTION_TTL = int(os.getenv('INGESTION_TTL', 24 * 3600))
+
+
+def ingestion_key(ingestion_id: str) -> str:
+    return f"ingestion:{ingestion_id}"
+
+
+def spool_file(file_storage) -> tuple:
+    """
+    Save an uploaded werkzeug FileStorage into the spool directory.
+    Returns (spool path, unique file name) so the name can be reused for the blob.
+    """
+    os.makedirs(INGEST_SPOOL_DIR, exist_ok=True)
+    unique_filename = f"{uuid.uuid4().hex}_{secure_filename(file_storage.filename)}"
+    path = os.path.join(INGEST_SPOOL_DIR, unique_filename)
+    file_storage.save(path)
+    return path, unique_filename
+
+
+def get_ingestion_state(ingestion_id: str):
+    raw = TaskInfoSingleton().get_value(ingestion_key(ingestion_id))
+    return json.loads(raw) if raw else None
+
+
+def set_ingestion_state(ingestion_id: str, **fields) -> dict:
+    """Merge fields into the stored ingestion record and return the updated record."""
+    state = get_ingestion_state(ingestion_id) or {}
+    state.update(fields)
+    state['updated_at'] = datetime.now().isoformat()
+    TaskInfoSingleton().set_value(ingestion_key(ingestion_id), json.dumps(state), ex=INGESTION_TTL)
+    return state
+
+
+def start_ingestion(task, **fields) -> str:
+    """Record a new ingestion, queue task for it and return the ingestion id."""
+    ingestion_id = uuid.uuid4().hex
+    set_ingestion_state(ingestion_id, status='queued', **fields)
+    result = task.apply_async(args=[ingestion_id])
+    TaskInfoSingleton().set_task_info(result.id, 'ingestion')
+    return ingestion_id
+
+
+def remove_spooled(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def upload_spooled_image(ingestion_id: str, state: dict) -> dict:
+    from app.api.azureops.azureapi import azure_storage_instance
+
+    if state.get('image_path') and not state.get('image_url'):
+        state = set_ingestion_state(ingestion_id, status='uploading')
+        image_url = azure_storage_instance.upload_blob(container_name, state['image_blob'], state['image_path'])
+        remove_spooled(state['image_path'])
+        state = set_ingestion_state(ingestion_id, image_url=image_url)
+    return state
+
+
+def blob_in_use(url: str) -> bool:
+    """True if a committed Episode or Podcast row points at url."""
+    from app import app
+    from app.models import db, Episode, Podcast
+
+    with app.app_context():
+        return any(db.session.scalar(select(column).where(column == url).limit(1)) is not None
+                   for column in (Episode.audio_url, Episode.image_url, Podcast.image_url))
+
+
+def fail_ingestion(ingestion_id: str, state: dict, error: Exception):
+    """
+    Mark an ingestion failed and remove everything it spooled or uploaded, except blobs a row
+    already points at: the state is written after the commit, so a failure in between leaves a
+    committed row that the state does not know about.
+    """
+    from app.api.azureops.azureapi import azure_storage_instance
+
+    for url_field, blob_field in (('image_url', 'image_blob'), ('audio_url', 'audio_blob')):
+        if state.get(url_field):
+            try:
+                if blob_in_use(state[url_field]):
+                    logger.info(f"Keeping {state[blob_field]} after failed ingestion, a row uses it")
+                    continue
+                azure_storage_instance.delete_blob(container_name, state[blob_field])
+            except Exception as e:
+                logger.error(f"Failed to delete {state[blob_field]} after failed ingestion: {e}")
+    remove_spooled(state.get('image_path'), state.get('audio_path'))
+    set_ingestion_state(ingestion_id, status='failed', error=str(error))
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=30)
+def ingest_episode(self, ingestion_id):
+    """
+    Upload a spooled episode to blob storage, probe its duration, create the Episode row and
+    start transcription. Every step records its result, so a retry resumes where it failed.
+    """
+    from app import app
+    from app.models import db, Episode
+    from app.api.azureops.azureapi import azure_storage_instance
+    from tasks.transcriptionservice import transcribe_episode
+
+    state = get_ingestion_state(ingestion_id)
+    if state is None:
+        logger.error(f"Ingestion {ingestion_id} not found")
+        return None
+    try:
+        state = upload_spooled_image(ingestion_id, state)
+
+        if not state.get('audio_url'):
+            state = set_ingestion_state(ingestion_id, status='uploading')
+            audio_url = azure_storage_instance.upload_blob(container_name, state['audio_blob'], state['audio_path'])
+            state = set_ingestion_state(ingestion_id, audio_url=audio_url)
+
+        if not state.get('probed'):
+            state = set_ingestion_state(ingestion_id, status='probing')
+            duration = probe_duration(state['audio_path']) or state.get('duration')
+            state = set_ingestion_state(ingestion_id, duration=duration, probed=True)
+
+        if not state.get('episode_id'):
+            state = set_ingestion_state(ingestion_id, status='saving')
+            with app.app_context():
+                # an earlier attempt may have committed the row and then failed to record it
+                new_episode = db.session.scalar(select(Episode).where(Episode.audio_url == state['audio_url'])) \
+                    if self.request.retries else None
+                if new_episode is None:
+                    new_episode = Episode(
+                        title=state['title'],
+                        description=state['description'],
+                        duration=state.get('duration'),
+                        image_url=state.get('image_url'),
+                        audio_url=state['audio_url'],
+                        podcast_id=state['podcast_id'],
+                        publish_date=datetime.fromisoformat(state['publish_date'])
+                    )
+                    db.session.add(new_episode)
+                    db.session.commit()
+                state = set_ingestion_state(ingestion_id, episode_id=new_episode.id)
+            logger.info(f"Episode {state['episode_id']} created by ingestion {ingestion_id}")
+
+        # Transcription reads the audio from blob storage, so the spooled copy is no longer needed
+        remove_spooled(state['audio_path'])
+    except Exception as e:
+        logger.error(f"Ingestion {ingestion_id} failed: {e}")
+        if self.request.retries >= self.max_retries:
+            fail_ingestion(ingestion_id, state, e)
+            raise
+        set_ingestion_state(ingestion_id, status='retrying', error=str(e))
+        raise self.retry(exc=e, countdown=self.default_retry_delay * 2 ** self.request.retries)
+
+    try:
+        audio = {'container': container_name, 'blob': state['audio_blob']}
+        task = transcribe_episode.apply_async(args=[audio, state['episode_id']])
+        TaskInfoSingleton().set_task_info(task.id, 'transcription_plan')
+        state = set_ingestion_state(ingestion_id, status='done', transcription_task_id=task.id)
+    except Exception as e:
+        logger.error(f"Failed to start transcription for ingestion {ingestion_id}: {e}")
+        state = set_ingestion_state(ingestion_id, status='done', error=f"transcription not started: {e}")
+    return {'ingestion_id': ingestion_id, 'episode_id': state['episode_id']}
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=30)
+def ingest_podcast_image(self, ingestion_id):
+    """Upload the spooled image of an already created podcast and store its url on the row."""
+    from app import app
+    from app.models import db, Podcast
+
+    state = get_ingestion_state(ingestion_id)
+    if state is None:
+        logger.error(f"Ingestion {ingestion_id} not found")
+        return None
+    try:
+        state = upload_spooled_image(ingestion_id, state)
+        with app.app_context():
+            podcast = db.session.get(Podcast, state['podcast_id'])
+            if podcast is not None:
+                podcast.image_url = state['image_url']
+                db.session.commit()
+        state = set_ingestion_state(ingestion_id, status='done')
+    except Exception as e:
+        logger.error(f"Ingestion {ingestion_id} failed: {e}")
+        if self.request.retries >= self.max_retries:
+            fail_ingestion(ingestion_id, state, e)
+            raise
+        set_ingestion_state(ingestion_id, status='retrying', error=str(e))
+        raise self.retry(exc=e, countdown=self.default_retry_delay * 2 ** self.request.retries)
+    return {'ingestion_id': ingestion_id, 'podcast_id': state['podcast_id']}
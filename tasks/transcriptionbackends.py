@@ -0,0 +1,171 @@
+import os
+import time
+import queue
+import random
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRANSCRIBE_BACKEND = os.getenv('TRANSCRIBE_BACKEND', 'http')
+API_URL = os.getenv('TRANSCRIBE_API_URL', "https://api-inference.huggingface.co/models/openai/whisper-small")
+TRANSCRIBE_HTTP_TIMEOUT = int(os.getenv('TRANSCRIBE_HTTP_TIMEOUT', 300))
+LOCAL_MODEL = os.getenv('TRANSCRIBE_LOCAL_MODEL', 'openai/whisper-small')
+# Requests arriving within TRANSCRIBE_BATCH_WAIT seconds of each other share one inference call
+TRANSCRIBE_BATCH_SIZE = int(os.getenv('TRANSCRIBE_BATCH_SIZE', 8))
+TRANSCRIBE_BATCH_WAIT = float(os.getenv('TRANSCRIBE_BATCH_WAIT', 0.5))
+TRANSCRIBE_RETRY_BASE = int(os.getenv('TRANSCRIBE_RETRY_BASE', 10))
+TRANSCRIBE_RETRY_MAX = int(os.getenv('TRANSCRIBE_RETRY_MAX', 600))
+
+
+class TranscriptionError(Exception):
+    pass
+
+
+def retry_countdown(retries: int) -> int:
+    """Exponential backoff with jitter: base, 2*base, 4*base, ... capped at TRANSCRIBE_RETRY_MAX."""
+    delay = min(TRANSCRIBE_RETRY_MAX, TRANSCRIBE_RETRY_BASE * 2 ** retries)
+    return int(delay / 2 + random.uniform(0, delay / 2))
+
+
+class TranscriptionBackend(ABC):
+    @abstractmethod
+    def transcribe(self, audio) -> dict:
+        """Transcribe audio bytes or a readable binary stream and return {'text': ...}."""
+        ...
+
+    def transcribe_batch(self, audios: list) -> list:
+        return [self.transcribe(audio) for audio in audios]
+
+
+class HttpTranscriptionBackend(TranscriptionBackend):
+    """Hosted inference endpoint (the Hugging Face API by default). Audio is streamed as the request body."""
+
+    def __init__(self, url: str = API_URL, token: str = None, timeout: int = TRANSCRIBE_HTTP_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {token or os.getenv('WHISPER_TOKEN')}"}
+        self.session = requests.Session()
+
+    def transcribe(self, audio) -> dict:
+        response = self.session.post(self.url, headers=self.headers, data=audio, timeout=self.timeout)
+        if response.status_code != 200:
+            raise TranscriptionError(f"Failed API request. Status code: {response.status_code}")
+        return response.json()
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Runs the whisper model on the worker's CPU. The model is loaded once per process on first use.
+    Requires the optional transformers and torch packages and ffmpeg for decoding.
+    """
+
+    def __init__(self, model_name: str = LOCAL_MODEL, batch_size: int = TRANSCRIBE_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    @property
+    def pipeline(self):
+        with self._lock:
+            if self._pipeline is None:
+                try:
+                    from transformers import pipeline
+                except ImportError as e:
+                    raise TranscriptionError('TRANSCRIBE_BACKEND=local needs the transformers and torch packages') from e
+                started = time.monotonic()
+                self._pipeline = pipeline('automatic-speech-recognition', model=self.model_name, device='cpu',
+                                          chunk_length_s=30)
+                logger.info(f"Loaded {self.model_name} in {time.monotonic() - started:.1f}s")
+            return self._pipeline
+
+    def transcribe(self, audio) -> dict:
+        return self.transcribe_batch([audio])[0]
+
+    def transcribe_batch(self, audios: list) -> list:
+        inputs = [audio if isinstance(audio, bytes) else audio.read() for audio in audios]
+        results = self.pipeline(inputs, batch_size=self.batch_size)
+        return [{'text': result['text']} for result in results]
+
+
+class BatchingTranscriber(TranscriptionBackend):
+    """
+    Collects transcription requests made concurrently in one worker process (celery -P threads)
+    and hands them to the backend together, up to batch_size at a time. A request waits at most
+    max_wait seconds for others to join its batch.
+    """
+
+    def __init__(self, backend: TranscriptionBackend, batch_size: int = TRANSCRIBE_BATCH_SIZE,
+                 max_wait: float = TRANSCRIBE_BATCH_WAIT):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio) -> dict:
+        future = Future()
+        self._queue.put((audio, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='transcription-batcher', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+            try:
+                results = self.backend.transcribe_batch([audio for audio, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            logger.info(f"Transcribed batch of {len(batch)} in {time.monotonic() - started:.1f}s")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The transcription backend selected by TRANSCRIBE_BACKEND, created once per worker process."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if TRANSCRIBE_BACKEND == 'local':
+                _backend = BatchingTranscriber(LocalWhisperBackend())
+            elif TRANSCRIBE_BACKEND == 'http':
+                _backend = HttpTranscriptionBackend()
+            else:
+                raise ValueError(f"Unknown TRANSCRIBE_BACKEND '{TRANSCRIBE_BACKEND}'")
+        return _backend
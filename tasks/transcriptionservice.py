@@ -1,7 +1,13 @@
+import re
+import time
 import requests
 from dotenv import load_dotenv
 import os
+from celery import chord
 from tasks import celery
+from tasks.audioutils import wav_layout, wav_header, mp3_second_marks, plan_windows
+from tasks.transcriptionbackends import get_backend, retry_countdown, TranscriptionError
+from task_singleton import TaskInfoSingleton
 import logging
 
 
@@ -10,43 +16,189 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
-API_URL = "https://api-inference.huggingface.co/models/openai/whisper-small"
-headers = {"Authorization": f"Bearer {os.getenv('WHISPER_TOKEN')}"}
+TRANSCRIBE_MAX_RETRIES = int(os.getenv('TRANSCRIBE_MAX_RETRIES', 5))
 
-@celery.task(bind=True, max_retries=3, default_retry_delay=60)
-def transcribe(self, filename,episode_id,delete_after=True):
+# Long episodes are cut into overlapping windows that are transcribed in parallel.
+# whisper works on 30 second windows, so longer ones gain nothing.
+TRANSCRIBE_WINDOW_SECONDS = int(os.getenv('TRANSCRIBE_WINDOW_SECONDS', 30))
+TRANSCRIBE_OVERLAP_SECONDS = int(os.getenv('TRANSCRIBE_OVERLAP_SECONDS', 2))
+# Longest run of words compared when removing text repeated in the overlap of two windows
+STITCH_MAX_OVERLAP_WORDS = int(os.getenv('STITCH_MAX_OVERLAP_WORDS', 20))
+WAV_HEADER_PROBE_SIZE = 64 * 1024
+
+def open_audio(source):
+    """
+    Open the audio to transcribe for streaming. source is either a blob reference
+    ({'container': ..., 'blob': ...}) or a path on a filesystem shared with the web containers.
+    """
+    if isinstance(source, dict):
+        from app.api.azureops.azureapi import azure_storage_instance
+        return azure_storage_instance.open_blob(source['container'], source['blob'])
+    return open(source, "rb")
+
+
+def describe_source(source) -> str:
+    return f"{source['container']}/{source['blob']}" if isinstance(source, dict) else source
+
+
+@celery.task(bind=True, max_retries=TRANSCRIBE_MAX_RETRIES)
+def transcribe(self, source, episode_id, delete_after=True):
+    """
+    Transcribe an episode with the configured backend (TRANSCRIBE_BACKEND). Blob audio is streamed
+    with a Content-Length, so only one chunk is held in memory at a time. delete_after removes a
+    spooled file once it is no longer needed; blob references are never deleted.
+    """
+    name = describe_source(source)
+    done = False
     try:
-        # Open the file and read the data
-        with open(filename, "rb") as f:
-            data = f.read()
-
-        logger.info(f"Sending request for file: {filename} (Size: {len(data)} bytes)")
-
-        # Send POST request to the Hugging Face API
-        response = requests.post(API_URL, headers=headers, data=data)
-
-        # Check if the request was successful
-        if response.status_code == 200:
-            logger.info(f"API response successful for file: {filename}")
-            data = response.json()
-            data['episode_id'] = episode_id
-            return data
-        else:
-            logger.error(f"API request failed with status code: {response.status_code}. Retrying...")
-            raise self.retry(exc=Exception(f"Failed API request. Status code: {response.status_code}"), countdown=60)
-
-    except requests.exceptions.RequestException as e:
-        # Handle network errors or request issues
-        logger.error(f"Network error occurred while sending the request: {str(e)}")
-        raise self.retry(exc=e, countdown=60)  # Retry after a delay
+        audio = open_audio(source)
+        try:
+            logger.info(f"Sending request for file: {name}")
+            started = time.monotonic()
+            data = get_backend().transcribe(audio)
+        finally:
+            if hasattr(audio, 'close'):
+                audio.close()
+
+        logger.info(f"Transcribed {name} in {time.monotonic() - started:.1f}s")
+        data['episode_id'] = episode_id
+        done = True
+        return data
+
+    except (requests.exceptions.RequestException, TranscriptionError) as e:
+        # Handle network errors, rate limits and failed requests
+        logger.error(f"Transcription request for {name} failed: {str(e)}")
+        raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
 
     except Exception as e:
         # Handle other unexpected errors
         logger.error(f"An unexpected error occurred: {str(e)}")
-        raise self.retry(exc=str(e), countdown=60)  # Retry after a delay
+        raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
 
     finally:
-        if delete_after and (self.request.retries >= self.max_retries):
-            if os.path.exists(filename):
-                os.remove(filename)
-                logger.info(f"File {filename} removed successfully.")
+        last_attempt = self.request.retries >= self.max_retries
+        if delete_after and not isinstance(source, dict) and (done or last_attempt):
+            if os.path.exists(source):
+                os.remove(source)
+                logger.info(f"File {source} removed successfully.")
+
+
+def plan_segments(storage, source: dict, window: int = TRANSCRIBE_WINDOW_SECONDS,
+                  overlap: int = TRANSCRIBE_OVERLAP_SECONDS) -> list:
+    """
+    Plan the windows of a wav or mp3 blob. Returns an empty list for formats that cannot be cut
+    without decoding, which are then transcribed in one request.
+    """
+    container, blob = source['container'], source['blob']
+    size = storage.get_blob_metadata(container, blob).get('size')
+    extension = os.path.splitext(blob)[1].lower()
+
+    if extension == '.wav':
+        header = b''.join(storage.stream_blob_chunks(container, blob, 0, min(size, WAV_HEADER_PROBE_SIZE) - 1))
+        layout = wav_layout(header)
+        data_end = min(layout['data_offset'] + layout['data_size'], size)
+        bytes_per_second = layout['sample_rate'] * layout['block_align']
+        duration = (data_end - layout['data_offset']) / bytes_per_second
+        windows = plan_windows(lambda second: min(layout['data_offset'] + second * bytes_per_second, data_end),
+                               data_end, duration, window, overlap)
+        wav = {key: layout[key] for key in ('channels', 'sample_rate', 'bits_per_sample')}
+        for item in windows:
+            item['wav'] = wav
+        return windows
+
+    if extension == '.mp3':
+        marks, end_offset, duration = mp3_second_marks(storage.stream_blob_chunks(container, blob))
+        return plan_windows(lambda second: marks[second] if second < len(marks) else end_offset,
+                            end_offset, duration, window, overlap)
+
+    return []
+
+
+def read_segment(storage, source: dict, segment: dict) -> bytes:
+    """Fetch the bytes of one window, adding a wav header when the window is cut from a wav file."""
+    data = b''.join(storage.stream_blob_chunks(source['container'], source['blob'],
+                                               segment['start_byte'], segment['end_byte']))
+    if 'wav' in segment:
+        wav = segment['wav']
+        data = wav_header(wav['channels'], wav['sample_rate'], wav['bits_per_sample'], len(data)) + data
+    return data
+
+
+def transcribe_window(storage, source: dict, segment: dict, backend=None) -> dict:
+    result = (backend or get_backend()).transcribe(read_segment(storage, source, segment))
+    return {'index': segment['index'], 'start': segment['start'], 'end': segment['end'],
+            'text': (result.get('text') or '').strip()}
+
+
+def normalise_word(word: str) -> str:
+    return re.sub(r'\W', '', word.lower())
+
+
+def stitch_segments(results: list, max_overlap_words: int = STITCH_MAX_OVERLAP_WORDS) -> dict:
+    """
+    Join window transcripts in order. Words at the start of a window that repeat the end of the
+    previous window (the overlap) are dropped, using the longest matching run of words.
+    Returns the full text and per-window {'start', 'end', 'text'} segments.
+    """
+    segments = []
+    previous = []
+    for result in sorted(results, key=lambda item: item['index']):
+        words = result['text'].split()
+        limit = min(len(previous), len(words), max_overlap_words)
+        for length in range(limit, 0, -1):
+            if [normalise_word(w) for w in previous[-length:]] == [normalise_word(w) for w in words[:length]]:
+                words = words[length:]
+                break
+        segments.append({'start': result['start'], 'end': result['end'], 'text': ' '.join(words)})
+        previous = result['text'].split()
+    text = ' '.join(segment['text'] for segment in segments if segment['text'])
+    return {'text': text, 'segments': segments}
+
+
+@celery.task(bind=True, max_retries=TRANSCRIBE_MAX_RETRIES)
+def transcribe_episode(self, source, episode_id):
+    """
+    Entry point for transcribing an episode. Blob audio longer than one window is split into
+    overlapping windows that run as a chord of transcribe_segment tasks and are joined by
+    stitch_transcription; anything else goes to transcribe as a single request.
+    """
+    from app.api.azureops.azureapi import azure_storage_instance
+
+    windows = []
+    if isinstance(source, dict):
+        try:
+            windows = plan_segments(azure_storage_instance, source)
+        except ValueError as e:
+            logger.warning(f"Cannot split {describe_source(source)}, transcribing in one request: {e}")
+        except Exception as e:
+            logger.error(f"Failed to plan transcription of {describe_source(source)}: {e}")
+            raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
+
+    if len(windows) > 1:
+        signature = chord([transcribe_segment.s(source, window) for window in windows],
+                          stitch_transcription.s(episode_id))
+    else:
+        signature = transcribe.s(source, episode_id)
+    # the success handler looks the task up by id, so the id is stored before the task can finish
+    TaskInfoSingleton().set_task_info(signature.freeze().id, 'transcription')
+    signature.apply_async()
+    logger.info(f"Transcription of episode {episode_id} started with {max(len(windows), 1)} segment(s)")
+    return {'segments': len(windows)}
+
+
+@celery.task(bind=True, max_retries=TRANSCRIBE_MAX_RETRIES)
+def transcribe_segment(self, source, segment):
+    from app.api.azureops.azureapi import azure_storage_instance
+
+    try:
+        return transcribe_window(azure_storage_instance, source, segment)
+    except Exception as e:
+        logger.error(f"Segment {segment['index']} of {describe_source(source)} failed: {e}")
+        raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
+
+
+@celery.task
+def stitch_transcription(results, episode_id):
+    data = stitch_segments(results)
+    data['episode_id'] = episode_id
+    return data